@@ -0,0 +1,288 @@
+import json
+import time
+import threading
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+
+from retry_policy import get_retry_policy
+from hedging import get_hedger
+from deadline import MIN_CALL_SECONDS, Deadline, get_deadline_stats
+
+
+# LLM calls one user message may make, counting retries; the last one must answer in text
+MAX_LLM_CALLS = 4
+
+# Wall-clock budget for the whole turn, and the cap on any single LLM call within it
+MAX_TURN_SECONDS = 60.0
+CALL_TIMEOUT = 45.0
+
+# Completed turns kept for the percentile metrics
+RECENT_TURNS = 500
+
+SUPPORT = "nailfec17@gmail.com"
+
+
+def fallback_for_error(error: Exception) -> str:
+    """User-facing message when the LLM could not be reached"""
+    text = str(error).lower()
+    if "timeout" in text or "connection" in text:
+        return f"AI service is responding slowly at the moment, please try again later. You can also email {SUPPORT} for human assistance."
+    if "api" in text or "key" in text:
+        return f"AI service configuration issue, please contact administrator. Email: {SUPPORT}"
+    return f"Sorry, I encountered a technical issue: {str(error)}. Please try again later or contact support team: {SUPPORT}"
+
+
+OUT_OF_TIME = f"Sorry, this is taking longer than expected, so I stopped before finishing. Please send your message again in a moment, or email {SUPPORT} for human assistance."
+
+UNAVAILABLE = f"The AI service is having problems right now, so I can't answer this at the moment. Please try again in a minute, or email {SUPPORT} for human assistance."
+
+
+class TurnStats:
+    """Process-wide metrics over completed agent turns"""
+
+    def __init__(self, recent: int = RECENT_TURNS):
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.outcomes = {}
+        self.totals = {"llm_calls": 0, "rounds": 0, "tool_calls": 0, "retries": 0,
+                       "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0}
+        self.recent = deque(maxlen=recent)
+
+    def record(self, turn: Dict):
+        with self.lock:
+            self.turns += 1
+            self.outcomes[turn["outcome"]] = self.outcomes.get(turn["outcome"], 0) + 1
+            for key in self.totals:
+                self.totals[key] += turn[key]
+            self.recent.append(turn)
+
+    def summary(self) -> Dict:
+        """Totals, outcome counts and p50/p95/max of calls, rounds and seconds per turn"""
+        with self.lock:
+            recent = list(self.recent)
+            summary = {"turns": self.turns, "outcomes": dict(self.outcomes), "totals": dict(self.totals)}
+        if recent:
+            for key in ("llm_calls", "rounds", "retries", "seconds"):
+                values = np.array([turn[key] for turn in recent], dtype=np.float64)
+                summary[key] = {
+                    "p50": round(float(np.percentile(values, 50)), 3),
+                    "p95": round(float(np.percentile(values, 95)), 3),
+                    "max": round(float(values.max()), 3)
+                }
+            summary["last_turn"] = recent[-1]
+        return summary
+
+
+class AgentLoop:
+    """
+    One bounded tool-use loop for a user turn
+    Calls the LLM, runs any tool calls it makes, feeds the results back and repeats
+    until the model answers in text. Retries and tool rounds share one budget of LLM
+    calls and one wall-clock budget; the last call allowed is made with tool_choice
+    "none" so the turn always ends with an answer.
+    Tool calls already started speculatively for this turn are served from that result.
+    Whether and when a failed call is retried is up to the shared retry policy, whose
+    circuit breaker can also refuse the call outright. A request deadline, when given,
+    caps the turn's wall-clock budget; no call or retry starts without time to finish.
+    Slow completions may be hedged with a duplicate request (see hedging.py).
+    """
+
+    def __init__(self, chatbot, max_llm_calls: int = MAX_LLM_CALLS, max_seconds: float = MAX_TURN_SECONDS,
+                 call_timeout: float = CALL_TIMEOUT, retry_policy=None, clock=time.monotonic,
+                 speculation=None, deadline: Deadline = None, hedger=None):
+        self.chatbot = chatbot
+        self.speculation = speculation
+        self.max_llm_calls = max_llm_calls
+        self.max_seconds = max_seconds
+        self.call_timeout = call_timeout
+        self.retry_policy = retry_policy or get_retry_policy()
+        self.clock = clock
+        self.deadline = deadline
+        self.hedger = hedger or get_hedger()
+        # Metrics of the last run (outcome, calls, rounds, tokens, seconds)
+        self.turn = None
+
+    def run(self, system_message: Dict) -> str:
+        """Run the turn and return the reply; the exchange is threaded into conversation_history"""
+        chatbot = self.chatbot
+        started = self.clock()
+        deadline = Deadline(self.max_seconds, self.clock)
+        if self.deadline is not None and self.deadline.expires_at < deadline.expires_at:
+            deadline = self.deadline
+        turn = self.turn = {"outcome": None, "llm_calls": 0, "rounds": 0, "tool_calls": 0, "retries": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0, "seconds": 0.0}
+        reply = None
+        last_error = None
+        retrying = False
+        rejected = False
+        should_clear_history = False
+
+        while turn["llm_calls"] < self.max_llm_calls:
+            if not deadline.allows_call():
+                print("Not enough time left for another LLM call")
+                get_deadline_stats().count("calls_skipped")
+                break
+            if not self.retry_policy.allow_call():
+                print("Circuit breaker open, not calling the LLM")
+                rejected = True
+                break
+            final_call = turn["llm_calls"] == self.max_llm_calls - 1
+            turn["llm_calls"] += 1
+            try:
+                print(f"Making API call {turn['llm_calls']}/{self.max_llm_calls} to the LLM...")
+                response = self.hedger.create(
+                    chatbot.backend.complete,
+                    hedge_create=chatbot.backend.hedge,
+                    messages=[system_message] + chatbot.conversation_history,
+                    tools=chatbot._tools_for_next_call(),
+                    tool_choice="none" if final_call else "auto",
+                    timeout=deadline.timeout(self.call_timeout)
+                )
+            except Exception as e:
+                print(f"AI API Error on call {turn['llm_calls']}: {str(e)}")
+                last_error = e
+                self.retry_policy.record(e, first_attempt=not retrying)
+                retrying = self._pause_before_retry(turn, deadline, e)
+                if not retrying:
+                    break
+                continue
+            self.retry_policy.record(first_attempt=not retrying)
+            retrying = False
+            self._count_tokens(turn, response)
+
+            message = response.choices[0].message
+            if message.tool_calls and not final_call:
+                turn["rounds"] += 1
+                results = self._run_tools(message)
+                turn["tool_calls"] += len(results)
+                should_clear_history = should_clear_history or any(
+                    isinstance(result, dict) and result.get("clear_history") for result in results)
+                # Confirmation summaries are shown as-is; no need for the model to re-type them
+                reply = chatbot._user_facing_markdown(results)
+                if reply:
+                    turn["outcome"] = "passthrough"
+                    break
+                continue
+
+            if message.content and message.content.strip():
+                reply = message.content
+                turn["outcome"] = "answered"
+                break
+
+            print(f"Empty response on call {turn['llm_calls']}")
+            retrying = self._pause_before_retry(turn, deadline)
+            if not retrying:
+                break
+
+        if reply is None:
+            turn["outcome"] = "timeout" if deadline.exceeded or deadline.expired() else "exhausted"
+            if rejected:
+                turn["outcome"] = "unavailable"
+            if turn["rounds"]:
+                reply = "I've processed your request successfully. If you need more information, please let me know!"
+            elif rejected:
+                reply = UNAVAILABLE
+            elif turn["outcome"] == "timeout":
+                reply = OUT_OF_TIME
+            elif last_error is not None:
+                turn["outcome"] = "error"
+                reply = fallback_for_error(last_error)
+            else:
+                reply = f"I apologize, but I'm having trouble generating a response right now. Please try asking your question again, or contact support at {SUPPORT} for assistance."
+
+        if turn["rounds"] or turn["outcome"] in ("answered", "passthrough"):
+            chatbot.conversation_history.append({"role": "assistant", "content": reply})
+        # Clear history if requested (after successful booking/cancellation)
+        if should_clear_history:
+            chatbot.clear_conversation_history()
+
+        if self.speculation is not None:
+            self.speculation.finish()
+
+        turn["seconds"] = round(self.clock() - started, 3)
+        get_turn_stats().record(turn)
+        print(f"Turn finished ({turn['outcome']}): {turn['llm_calls']} LLM calls, {turn['rounds']} tool rounds, "
+              f"{turn['retries']} retries, {turn['seconds']}s")
+        return reply
+
+    def _run_tools(self, message) -> List:
+        """Record the assistant's tool calls, execute them and thread their results into the history"""
+        chatbot = self.chatbot
+        # Always recorded, even with empty content, so every tool result has its call
+        chatbot.conversation_history.append({
+            "role": "assistant",
+            "content": message.content or "",
+            "tool_calls": [
+                {
+                    "id": tool_call.id,
+                    "type": "function",
+                    "function": {
+                        "name": tool_call.function.name,
+                        "arguments": tool_call.function.arguments
+                    }
+                } for tool_call in message.tool_calls
+            ]
+        })
+
+        results = []
+        for i, tool_call in enumerate(message.tool_calls):
+            function_name = tool_call.function.name
+            print(f"Executing function {i+1}/{len(message.tool_calls)}: {function_name}")
+            try:
+                parameters = json.loads(tool_call.function.arguments or "{}")
+                result = self.speculation.take(function_name, parameters) if self.speculation else None
+                if result is None:
+                    result = chatbot.execute_function(function_name, parameters)
+            except Exception as e:
+                print(f"Error in tool call {function_name}: {str(e)}")
+                result = {"error": str(e)}
+            results.append(result)
+            chatbot.conversation_history.append({
+                "role": "tool",
+                "tool_call_id": tool_call.id,
+                "content": json.dumps(result)
+            })
+        return results
+
+    def _pause_before_retry(self, turn: Dict, deadline: Deadline, error: Exception = None) -> bool:
+        """Wait out the policy's backoff; False when the call should not be retried"""
+        if turn["llm_calls"] >= self.max_llm_calls:
+            return False
+        if not deadline.allows_call():
+            get_deadline_stats().count("retries_skipped")
+            return False
+        delay = self.retry_policy.next_delay(turn["retries"] + 1, error)
+        if delay is None:
+            return False
+        turn["retries"] += 1
+        # The backoff never eats into the time the retry itself needs
+        delay = min(delay, max(deadline.remaining() - MIN_CALL_SECONDS, 0.0))
+        if delay > 0:
+            print(f"Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)
+        return True
+
+    @staticmethod
+    def _count_tokens(turn: Dict, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        turn["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+        turn["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        # DeepSeek reports prompt tokens served from its prefix cache
+        turn["cached_prompt_tokens"] += getattr(usage, "prompt_cache_hit_tokens", 0) or 0
+
+
+_turn_stats = None
+_turn_stats_lock = threading.Lock()
+
+
+def get_turn_stats() -> TurnStats:
+    """Process-wide turn metrics (shared so they cover every session)"""
+    global _turn_stats
+    with _turn_stats_lock:
+        if _turn_stats is None:
+            _turn_stats = TurnStats()
+        return _turn_stats
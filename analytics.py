@@ -0,0 +1,438 @@
+import sys
+import json
+import time
+import argparse
+import datetime
+import itertools
+import threading
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from booking_store import BookingStore, get_store, to_epoch
+
+
+BUCKET_SECONDS = {
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+}
+
+# Refuse aggregations that would produce more buckets than this
+MAX_BUCKETS = 2000
+
+# Statuses that occupy a GPU (cancelled bookings never ran)
+OCCUPYING_STATUSES = ("scheduled", "active", "completed")
+
+
+# Categorical columns: attribute prefix -> function extracting the value from a booking
+CATEGORICAL_COLUMNS = {
+    "model": lambda b: b["gpu_model"],
+    "gpu": lambda b: b["gpu_id"],
+    "status": lambda b: b["status"],
+    "user": lambda b: b.get("user_email", ""),
+    "domain": lambda b: b.get("user_email", "").rsplit("@", 1)[-1],
+}
+
+
+class BookingColumns:
+    """
+    Columnar (NumPy) view of bookings
+    Times are int64 epoch seconds, costs float64, and model, GPU instance, status,
+    user and user domain are int32 categorical codes into small category lists.
+    Rows are consumed from an iterable one at a time into compact typed arrays, so the
+    booking dicts themselves never need to be held in memory together.
+    """
+
+    def __init__(self, bookings: Iterable[Dict]):
+        starts, ends, created = array('q'), array('q'), array('q')
+        total_cost, overtime_cost = array('d'), array('d')
+        codes = {name: array('i') for name in CATEGORICAL_COLUMNS}
+        lookups = {name: {} for name in CATEGORICAL_COLUMNS}
+
+        # Booking times fall on a small set of slot boundaries, so parse each string once
+        epochs = {}
+
+        def epoch(value) -> int:
+            try:
+                return epochs[value]
+            except KeyError:
+                seconds = epochs[value] = int(to_epoch(value))
+                return seconds
+
+        extractors = [(extract, lookups[name], codes[name]) for name, extract in CATEGORICAL_COLUMNS.items()]
+        for booking in bookings:
+            starts.append(epoch(booking["start_time"]))
+            ends.append(epoch(booking["end_time"]))
+            created.append(epoch(booking.get("created_at") or booking["start_time"]))
+            total_cost.append(booking["total_cost"])
+            overtime_cost.append(booking.get("overtime_cost", 0))
+            for extract, lookup, column in extractors:
+                value = extract(booking)
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup)
+                column.append(code)
+
+        self.start = np.frombuffer(starts, dtype=np.int64) if starts else np.zeros(0, dtype=np.int64)
+        self.end = np.frombuffer(ends, dtype=np.int64) if ends else np.zeros(0, dtype=np.int64)
+        self.created = np.frombuffer(created, dtype=np.int64) if created else np.zeros(0, dtype=np.int64)
+        self.total_cost = np.frombuffer(total_cost, dtype=np.float64) if total_cost else np.zeros(0)
+        self.overtime_cost = np.frombuffer(overtime_cost, dtype=np.float64) if overtime_cost else np.zeros(0)
+
+        # Category lists (in first-seen order) and code arrays, e.g. self.models / self.model_code
+        self.categories = {name: list(lookups[name]) for name in CATEGORICAL_COLUMNS}
+        self.codes = {name: np.frombuffer(codes[name], dtype=np.int32) if codes[name] else np.zeros(0, dtype=np.int32)
+                      for name in CATEGORICAL_COLUMNS}
+        self.models, self.model_code = self.categories["model"], self.codes["model"]
+        self.gpu_ids, self.gpu_code = self.categories["gpu"], self.codes["gpu"]
+        self.statuses, self.status_code = self.categories["status"], self.codes["status"]
+
+    @classmethod
+    def from_store(cls, store: BookingStore, include_archive: bool = True) -> "BookingColumns":
+        """Columns for the whole booking history, streaming cold partitions one month at a time"""
+        with store.lock:
+            hot = list(store.bookings)
+        archived = store.iter_archived() if include_archive else iter(())
+        return cls(itertools.chain(hot, archived))
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def duration_hours(self) -> np.ndarray:
+        return (self.end - self.start) / 3600.0
+
+    @property
+    def revenue(self) -> np.ndarray:
+        return self.total_cost + self.overtime_cost
+
+    def mask_statuses(self, statuses) -> np.ndarray:
+        """Boolean row mask for bookings in any of the given statuses"""
+        codes = [self.statuses.index(s) for s in statuses if s in self.statuses]
+        return np.isin(self.status_code, codes)
+
+
+def _cumulative(starts: np.ndarray, ends: np.ndarray, weights: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Weighted booked time before each point: sum of weight * overlap([start, end), (-inf, t))
+    Computed with sorted endpoints and prefix sums, so cost is O((n + m) log n)
+    """
+    order_s = np.argsort(starts)
+    order_e = np.argsort(ends)
+    s_sorted, ws = starts[order_s].astype(np.float64), weights[order_s]
+    e_sorted, we = ends[order_e].astype(np.float64), weights[order_e]
+
+    # Prefix sums of weight and weight * time for starts and ends
+    ws_cum = np.concatenate(([0.0], np.cumsum(ws)))
+    wst_cum = np.concatenate(([0.0], np.cumsum(ws * s_sorted)))
+    we_cum = np.concatenate(([0.0], np.cumsum(we)))
+    wet_cum = np.concatenate(([0.0], np.cumsum(we * e_sorted)))
+
+    t = points.astype(np.float64)
+    i = np.searchsorted(s_sorted, t, side='left')
+    j = np.searchsorted(e_sorted, t, side='left')
+    return (t * ws_cum[i] - wst_cum[i]) - (t * we_cum[j] - wet_cum[j])
+
+
+def bucket_edges(start_time, end_time, bucket: str) -> np.ndarray:
+    """Bucket boundaries (epoch seconds) covering a window, aligned to UTC hours/days/Mondays"""
+    if bucket not in BUCKET_SECONDS:
+        raise ValueError(f"Unknown bucket '{bucket}' (use hour, day or week)")
+    size = BUCKET_SECONDS[bucket]
+    start = int(to_epoch(start_time))
+    end = int(to_epoch(end_time))
+    if end <= start:
+        raise ValueError("end must be after start")
+
+    # 1970-01-01 was a Thursday; shift so weeks start on Monday
+    offset = 3 * 86400 if bucket == "week" else 0
+    first = (start + offset) // size * size - offset
+    count = -(-(end - first) // size)
+    if count > MAX_BUCKETS:
+        raise ValueError(f"Window covers {count} {bucket} buckets (max {MAX_BUCKETS})")
+    return first + size * np.arange(count + 1, dtype=np.int64)
+
+
+def _group_series(columns: BookingColumns, rows: np.ndarray, edges: np.ndarray, capacity: int) -> Dict:
+    """Occupancy, booked GPU-hours and revenue per bucket for a subset of bookings"""
+    starts = columns.start[rows]
+    ends = columns.end[rows]
+    durations = np.maximum(ends - starts, 1).astype(np.float64)
+    revenue_rate = (columns.total_cost[rows] + columns.overtime_cost[rows]) / durations
+
+    booked = np.diff(_cumulative(starts, ends, np.ones(len(starts)), edges))
+    revenue = np.diff(_cumulative(starts, ends, revenue_rate, edges))
+    bucket_capacity = np.diff(edges).astype(np.float64) * max(capacity, 1)
+
+    return {
+        "occupancy_pct": np.round(booked / bucket_capacity * 100, 2).tolist(),
+        "booked_gpu_hours": np.round(booked / 3600, 2).tolist(),
+        "revenue": np.round(revenue, 2).tolist(),
+        "totals": {
+            "instances": capacity,
+            "occupancy_pct": round(float(booked.sum() / bucket_capacity.sum() * 100), 2),
+            "booked_gpu_hours": round(float(booked.sum() / 3600), 2),
+            "revenue": round(float(revenue.sum()), 2)
+        }
+    }
+
+
+def utilization(columns: BookingColumns, gpu_data: Dict, start_time, end_time,
+                bucket: str = "day", include_instances: bool = True) -> Dict:
+    """Per-model (and per-instance) occupancy %, booked GPU-hours and revenue per time bucket"""
+    edges = bucket_edges(start_time, end_time, bucket)
+    occupying = columns.mask_statuses(OCCUPYING_STATUSES)
+
+    result = {
+        "bucket": bucket,
+        "buckets": [datetime.datetime.fromtimestamp(int(t), datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+                    for t in edges[:-1]],
+        "models": {},
+        "instances": {}
+    }
+
+    total_instances = 0
+    for model, info in gpu_data["gpu_models"].items():
+        instance_ids = [instance["id"] for instance in info["instances"]]
+        total_instances += len(instance_ids)
+        model_rows = occupying.copy()
+        if model in columns.models:
+            model_rows &= columns.model_code == columns.models.index(model)
+        else:
+            model_rows[:] = False
+        result["models"][model] = _group_series(columns, model_rows, edges, len(instance_ids))
+
+        if include_instances:
+            for gpu_id in instance_ids:
+                gpu_rows = occupying.copy()
+                if gpu_id in columns.gpu_ids:
+                    gpu_rows &= columns.gpu_code == columns.gpu_ids.index(gpu_id)
+                else:
+                    gpu_rows[:] = False
+                series = _group_series(columns, gpu_rows, edges, 1)
+                series["model"] = model
+                result["instances"][gpu_id] = series
+
+    overall = _group_series(columns, occupying, edges, total_instances)
+    overall["totals"]["active_bookings"] = int(columns.mask_statuses(["active"]).sum())
+    overall["totals"]["bookings"] = int(occupying.sum())
+    result["overall"] = overall
+    return result
+
+
+_columns_cache = {}
+_columns_lock = threading.Lock()
+
+
+def columns_for_window(store: BookingStore, start_time, end_time) -> BookingColumns:
+    """Columnar view of the bookings overlapping a window, cached per store version"""
+    key = (store.version_tag(), str(start_time), str(end_time))
+    with _columns_lock:
+        if key in _columns_cache:
+            return _columns_cache[key]
+
+    columns = BookingColumns(store.query(start_time=start_time, end_time=end_time))
+
+    with _columns_lock:
+        # Entries from older store versions can never be hit again
+        for stale in [k for k in _columns_cache if k[0] != key[0]]:
+            del _columns_cache[stale]
+        _columns_cache[key] = columns
+        # Bound the number of windows kept for the current version
+        while len(_columns_cache) > 16:
+            del _columns_cache[next(iter(_columns_cache))]
+    return columns
+
+
+# Dimensions a report can group by: categorical columns plus calendar buckets of start_time
+TIME_DIMENSIONS = ("hour", "day", "week", "month")
+DIMENSIONS = tuple(CATEGORICAL_COLUMNS) + TIME_DIMENSIONS
+
+METRICS = ("revenue", "cost", "overtime", "duration_hours", "bookings")
+AGGREGATIONS = ("sum", "count", "mean", "min", "max", "p50", "p90", "p95", "p99")
+
+
+def time_bucket(epochs: np.ndarray, bucket: str) -> np.ndarray:
+    """Start (epoch seconds) of the UTC hour/day/week/month each timestamp falls in"""
+    if bucket == "month":
+        months = epochs.astype('datetime64[s]').astype('datetime64[M]')
+        return months.astype('datetime64[s]').astype(np.int64)
+    if bucket not in BUCKET_SECONDS:
+        raise ValueError(f"Unknown bucket '{bucket}' (use {', '.join(TIME_DIMENSIONS)})")
+    size = BUCKET_SECONDS[bucket]
+    offset = 3 * 86400 if bucket == "week" else 0
+    return (epochs + offset) // size * size - offset
+
+
+def _format_bucket(epoch: int, bucket: str) -> str:
+    dt = datetime.datetime.fromtimestamp(int(epoch), datetime.timezone.utc)
+    if bucket == "hour":
+        return dt.strftime('%Y-%m-%dT%H:00Z')
+    if bucket == "month":
+        return dt.strftime('%Y-%m')
+    return dt.strftime('%Y-%m-%d')
+
+
+def _dimension_codes(columns: BookingColumns, dimension: str, rows: np.ndarray):
+    """(int64 code per selected row, label per code) for one group-by dimension"""
+    if dimension in CATEGORICAL_COLUMNS:
+        return columns.codes[dimension][rows].astype(np.int64), columns.categories[dimension]
+    if dimension in TIME_DIMENSIONS:
+        keys, codes = np.unique(time_bucket(columns.start[rows], dimension), return_inverse=True)
+        return codes.astype(np.int64), [_format_bucket(k, dimension) for k in keys]
+    raise ValueError(f"Unknown dimension '{dimension}' (use {', '.join(DIMENSIONS)})")
+
+
+def group_by(columns: BookingColumns, by: List[str], rows: np.ndarray = None) -> Tuple[np.ndarray, List[Tuple]]:
+    """
+    Assign every selected row a group number for the combination of its dimension values
+    Returns (group number per row, label tuple per group) with groups in label-code order
+    """
+    if rows is None:
+        rows = np.ones(len(columns), dtype=bool)
+    if not by:
+        return np.zeros(int(rows.sum()), dtype=np.int64), [()]
+
+    codes, labels, sizes = [], [], []
+    for dimension in by:
+        dimension_codes, dimension_labels = _dimension_codes(columns, dimension, rows)
+        codes.append(dimension_codes)
+        labels.append(dimension_labels)
+        sizes.append(max(len(dimension_labels), 1))
+
+    # Collapse the per-dimension codes into one key, then keep only combinations that occur
+    combined = np.ravel_multi_index(codes, sizes)
+    keys, groups = np.unique(combined, return_inverse=True)
+    unravelled = np.unravel_index(keys, sizes)
+    group_labels = [tuple(labels[d][unravelled[d][g]] for d in range(len(by))) for g in range(len(keys))]
+    return groups.astype(np.int64), group_labels
+
+
+def aggregate(values: np.ndarray, groups: np.ndarray, group_count: int, agg: str) -> np.ndarray:
+    """Vectorised per-group aggregation of values (groups numbered 0..group_count-1)"""
+    counts = np.bincount(groups, minlength=group_count)
+    if agg == "count":
+        return counts.astype(np.float64)
+    if agg in ("sum", "mean"):
+        sums = np.bincount(groups, weights=values, minlength=group_count)
+        return sums if agg == "sum" else sums / np.maximum(counts, 1)
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{agg}' (use {', '.join(AGGREGATIONS)})")
+
+    # Order statistics: sort by (group, value), then index into each group's run
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    last = first + np.maximum(counts, 1) - 1
+    if agg == "min":
+        return ordered[first]
+    if agg == "max":
+        return ordered[last]
+
+    # Percentiles with linear interpolation, matching numpy's default method
+    position = first + (counts - 1).clip(min=0) * (int(agg[1:]) / 100.0)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, last)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _metric_values(columns: BookingColumns, metric: str) -> np.ndarray:
+    if metric == "revenue":
+        return columns.revenue
+    if metric == "cost":
+        return columns.total_cost
+    if metric == "overtime":
+        return columns.overtime_cost
+    if metric == "duration_hours":
+        return columns.duration_hours
+    if metric == "bookings":
+        return np.ones(len(columns))
+    raise ValueError(f"Unknown metric '{metric}' (use {', '.join(METRICS)})")
+
+
+def report(columns: BookingColumns, by: List[str], metric: str = "revenue", agg: str = "sum",
+           statuses: List[str] = None, start_time=None, end_time=None) -> List[Dict]:
+    """
+    Grouped report rows, e.g. revenue by model per week or p95 duration by user domain
+    Rows are filtered by status and by start_time within [start_time, end_time)
+    """
+    if metric == "bookings":
+        agg = "count"
+    rows = np.ones(len(columns), dtype=bool)
+    if statuses:
+        rows &= columns.mask_statuses(statuses)
+    if start_time is not None:
+        rows &= columns.start >= int(to_epoch(start_time))
+    if end_time is not None:
+        rows &= columns.start < int(to_epoch(end_time))
+
+    groups, labels = group_by(columns, by, rows)
+    if not len(groups):
+        return []
+    values = aggregate(_metric_values(columns, metric)[rows], groups, len(labels), agg)
+    counts = np.bincount(groups, minlength=len(labels))
+
+    column_name = "bookings" if metric == "bookings" else f"{metric}_{agg}"
+    result = []
+    for label, value, count in zip(labels, values.tolist(), counts.tolist()):
+        row = dict(zip(by, label))
+        row[column_name] = round(value, 2)
+        if metric != "bookings":
+            row["bookings"] = count
+        result.append(row)
+    return result
+
+
+def format_table(rows: List[Dict]) -> str:
+    """Plain-text table for report rows"""
+    if not rows:
+        return "No bookings matched"
+    headers = list(rows[0])
+    cells = [[str(row[h]) for h in headers] for row in rows]
+    widths = [max(len(h), *(len(c[i]) for c in cells)) for i, h in enumerate(headers)]
+    lines = ["  ".join(h.ljust(w) for h, w in zip(headers, widths)),
+             "  ".join("-" * w for w in widths)]
+    lines += ["  ".join(c.ljust(w) for c, w in zip(line, widths)) for line in cells]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking analytics reports")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subcommands.add_parser("report", help="Aggregate a metric grouped by dimensions")
+    report_parser.add_argument("--by", default="model",
+                               help=f"Comma-separated dimensions: {', '.join(DIMENSIONS)}")
+    report_parser.add_argument("--metric", default="revenue", choices=METRICS)
+    report_parser.add_argument("--agg", default="sum", choices=AGGREGATIONS)
+    report_parser.add_argument("--status", help="Comma-separated statuses to include")
+    report_parser.add_argument("--start", help="Only bookings starting at or after this ISO time")
+    report_parser.add_argument("--end", help="Only bookings starting before this ISO time")
+    report_parser.add_argument("--hot-only", action="store_true", help="Skip archived bookings")
+    report_parser.add_argument("--format", default="table", choices=("table", "json"))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    columns = BookingColumns.from_store(get_store(), include_archive=not args.hot_only)
+    loaded = time.perf_counter()
+    try:
+        rows = report(columns, [d for d in args.by.split(",") if d], args.metric, args.agg,
+                      statuses=args.status.split(",") if args.status else None,
+                      start_time=args.start, end_time=args.end)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(2)
+    finished = time.perf_counter()
+
+    if args.format == "json":
+        print(json.dumps(rows, indent=2))
+    else:
+        print(format_table(rows))
+        print(f"\n{len(columns)} bookings loaded in {loaded - started:.2f}s, "
+              f"aggregated in {finished - loaded:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,37 @@
-from flask import Flask, request, jsonify, session, send_from_directory, send_file
+from flask import Flask, request, jsonify, session, send_from_directory, send_file, Response, stream_with_context
 from hpc_chatbot import HPC_ChatBot
+from booking_store import get_store, parse_time, to_epoch
+from booking_scheduler import BookingScheduler
+from booking_events import BookingEventBroadcaster
+from analytics import columns_for_window, utilization
+from forecasting import forecast_demand
+from fast_path import get_router
+from tool_registry import get_tool_registry
+from agent_loop import get_turn_stats
+from speculation import get_speculator
+from tool_cache import get_tool_cache
+from faq_cache import get_faq_cache
+from llm_backend import get_backend
+from retry_policy import get_retry_policy
+from hedging import get_hedger
+from deadline import CHAT_REQUEST_SECONDS, Deadline, get_deadline_stats
+from collections import OrderedDict
 import secrets
 import redis
 import pickle
 from threading import Lock
+import hashlib
+import base64
+import datetime
+import gzip
 import json
 import os
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
 
@@ -23,6 +48,77 @@ except:
 lock = Lock()
 memory_sessions = {}
 
+# Move bookings scheduled -> active -> completed as their times pass (started in __main__)
+booking_scheduler = BookingScheduler(get_store())
+
+# Pushes booking deltas to dashboards over server-sent events
+booking_events = BookingEventBroadcaster(get_store())
+
+# Serialized (and compressed) response bodies keyed on (ETag, encoding)
+response_cache = OrderedDict()
+response_cache_lock = Lock()
+RESPONSE_CACHE_SIZE = 64
+MIN_COMPRESS_BYTES = 1024
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+def conditional_json(etag, build_payload):
+    """JSON response with ETag/If-None-Match (304) support and gzip/brotli compression"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        requested = 'br'
+    elif accepted['gzip']:
+        requested = 'gzip'
+    else:
+        requested = None
+
+    # Keyed by what the client accepts; the value holds the encoding actually used,
+    # which is None for bodies too small to be worth compressing
+    key = (etag, requested)
+    with response_cache_lock:
+        cached = response_cache.get(key)
+        if cached is not None:
+            response_cache.move_to_end(key)
+
+    if cached is None:
+        body = json.dumps(build_payload()).encode('utf-8')
+        encoding = requested if len(body) >= MIN_COMPRESS_BYTES else None
+        if encoding == 'br':
+            body = brotli.compress(body)
+        elif encoding == 'gzip':
+            body = gzip.compress(body, compresslevel=6)
+        cached = (body, encoding)
+        with response_cache_lock:
+            response_cache[key] = cached
+            while len(response_cache) > RESPONSE_CACHE_SIZE:
+                response_cache.popitem(last=False)
+
+    body, encoding = cached
+    response = Response(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Always revalidate so browsers send If-None-Match instead of reusing stale data
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(etag, weak=True)
+    return response
+
+def encode_cursor(booking):
+    """Opaque pagination cursor pointing just after a booking"""
+    key = [to_epoch(booking["start_time"]), booking["booking_id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor):
+    """Sort key encoded in a pagination cursor"""
+    start_epoch, booking_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return (float(start_epoch), str(booking_id))
+
 def get_or_create_chatbot(session_id):
     """Get or create new chatbot instance"""
     if USE_REDIS:
@@ -71,6 +167,8 @@ def favicon():
 @app.route('/api/chat', methods=['POST'])
 def chat_with_session():
     """Chat API with session management"""
+    # Covers session loading too; the reply must be back before the client gives up
+    deadline = Deadline(CHAT_REQUEST_SECONDS)
     try:
         if 'session_id' not in session:
             session['session_id'] = secrets.token_hex(16)
@@ -82,7 +180,7 @@ def chat_with_session():
             return jsonify({'error': 'No message provided'}), 400
         
         chatbot = get_or_create_chatbot(session_id)
-        response = chatbot.send_message_to_ai(data['message'])
+        response = chatbot.send_message_to_ai(data['message'], deadline)
         save_chatbot(session_id, chatbot)
         return jsonify({'response': response})
     except Exception as e:
@@ -90,6 +188,9 @@ def chat_with_session():
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
+    finally:
+        # Failed requests count too
+        get_deadline_stats().record_request(deadline)
 
 @app.route('/api/direct/chat', methods=['POST'])
 def direct_chat():
@@ -98,12 +199,15 @@ def direct_chat():
     if not data or 'message' not in data:
         return jsonify({'error': 'No message provided'}), 400
     
+    deadline = Deadline(CHAT_REQUEST_SECONDS)
     try:
         chatbot = HPC_ChatBot()
-        response = chatbot.send_message_to_ai(data['message'])
+        response = chatbot.send_message_to_ai(data['message'], deadline)
         return jsonify({'response': response})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        get_deadline_stats().record_request(deadline)
 
 @app.route('/api/search_gpus')
 def search_gpus():
@@ -132,29 +236,183 @@ def get_recommendations():
         result = chatbot.get_gpu_recommendations(
             use_case=use_case,
             budget_per_hour=request.args.get('budget_per_hour', type=float),
+            memory_requirement=request.args.get('memory_requirement', type=float),
+            start_time=request.args.get('start_time'),
+            end_time=request.args.get('end_time')
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recommend_availability')
+def recommend_availability():
+    """Recommended GPU models with free instances and a quote for a window, in one call"""
+    use_case = request.args.get('use_case', '')
+    start_time = request.args.get('start_time')
+    end_time = request.args.get('end_time')
+    if not use_case or not start_time or not end_time:
+        return jsonify({'error': 'use_case, start_time and end_time are required'}), 400
+    
+    try:
+        chatbot = HPC_ChatBot()
+        result = chatbot.recommend_and_check_availability(
+            use_case=use_case,
+            start_time=start_time,
+            end_time=end_time,
+            budget_per_hour=request.args.get('budget_per_hour', type=float),
             memory_requirement=request.args.get('memory_requirement', type=float)
         )
+        if not result.get('success'):
+            return jsonify({'error': result['message']}), 400
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/gpu_inventory')
 def get_gpu_inventory():
-    """Get GPU inventory"""
+    """Get GPU inventory (conditional on the file's modification time)"""
     try:
-        with open('gpu_inventory.json', 'r') as f:
-            return jsonify(json.load(f))
+        stat = os.stat('gpu_inventory.json')
+        etag = f"inv-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+        def load_inventory():
+            with open('gpu_inventory.json', 'r') as f:
+                return json.load(f)
+
+        return conditional_json(etag, load_inventory)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/bookings')
 def get_bookings():
-    """Get booking data"""
+    """
+    Get booking data
+    Without parameters returns the hot booking list. With any of start, end, model,
+    status (comma-separated), limit or cursor returns one page of matching bookings:
+    {"bookings": [...], "next_cursor": ..., "version": ...}
+    """
+    store = get_store()
+    params = ('start', 'end', 'model', 'status', 'limit', 'cursor')
+    windowed = any(name in request.args for name in params)
+    etag = hashlib.md5(f"{store.version_tag()}|{request.query_string.decode()}".encode()).hexdigest()
+
+    if not windowed:
+        return conditional_json(etag, lambda: list(store.bookings))
+
     try:
-        with open('bookings.json', 'r') as f:
-            return jsonify(json.load(f))
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+        models = [m for m in request.args.get('model', '').split(',') if m and m != 'all']
+        statuses = [s for s in request.args.get('status', '').split(',') if s and s != 'all']
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        start = request.args.get('start')
+        end = request.args.get('end')
+        # Validate the window before doing any work
+        for value in (start, end):
+            if value:
+                parse_time(value)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+
+    def build_page():
+        # Fetch one extra row to know whether another page follows
+        page = store.query(start_time=start, end_time=end, models=models, statuses=statuses,
+                           after=after, limit=limit + 1)
+        has_more = len(page) > limit
+        page = page[:limit]
+        return {
+            'bookings': page,
+            'next_cursor': encode_cursor(page[-1]) if has_more else None,
+            'version': store.version_tag()
+        }
+
+    return conditional_json(etag, build_page)
+
+@app.route('/api/bookings/events')
+def booking_event_stream():
+    """
+    Server-sent event stream of booking changes
+    Sends a 'snapshot' event with the store version, then 'created', 'cancelled' and
+    'status_changed' deltas. Reconnecting clients resume from Last-Event-ID when possible.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        stream_with_context(booking_events.stream(last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/utilization')
+def get_utilization():
+    """
+    Server-side utilization aggregation for the dashboard
+    Occupancy %, booked GPU-hours and revenue per model and instance in hour/day/week
+    buckets over [start, end) (default: the last and next 7 days)
+    """
+    store = get_store()
+    now = datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    start = request.args.get('start') or (now - datetime.timedelta(days=7)).isoformat()
+    end = request.args.get('end') or (now + datetime.timedelta(days=7)).isoformat()
+    bucket = request.args.get('bucket', 'day')
+    include_instances = request.args.get('instances', 'true').lower() != 'false'
+
+    try:
+        parse_time(start)
+        parse_time(end)
+        inventory_mtime = os.stat('gpu_inventory.json').st_mtime_ns
+    except (ValueError, OSError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    etag = hashlib.md5(f"{store.version_tag()}|{inventory_mtime}|{start}|{end}|{bucket}|{include_instances}".encode()).hexdigest()
+
+    def build_report():
+        with open('gpu_inventory.json', 'r') as f:
+            gpu_data = json.load(f)
+        columns = columns_for_window(store, start, end)
+        report = utilization(columns, gpu_data, start, end, bucket, include_instances)
+        report.update({'start': start, 'end': end, 'version': store.version_tag()})
+        return report
+
+    try:
+        return conditional_json(etag, build_report)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/forecast')
+def get_forecast():
+    """
+    Predicted occupancy per GPU model over [start, end) (default: the next 7 days)
+    in hour or day buckets, from hour-of-week seasonality plus trend
+    """
+    store = get_store()
+    model = request.args.get('model')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    bucket = request.args.get('bucket', 'day')
+
+    try:
+        for value in (start, end):
+            if value:
+                parse_time(value)
+        inventory_mtime = os.stat('gpu_inventory.json').st_mtime_ns
+    except (ValueError, OSError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Forecasts are refitted hourly, so the hour is part of the ETag
+    hour = int(datetime.datetime.now(datetime.timezone.utc).timestamp()) // 3600
+    etag = hashlib.md5(f"{store.version_tag()}|{inventory_mtime}|{hour}|{request.query_string.decode()}".encode()).hexdigest()
+
+    def build_forecast():
+        with open('gpu_inventory.json', 'r') as f:
+            gpu_data = json.load(f)
+        forecast = forecast_demand(store, gpu_data, model=model, start_time=start, end_time=end, bucket=bucket)
+        forecast['version'] = store.version_tag()
+        return forecast
+
+    try:
+        return conditional_json(etag, build_forecast)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @app.route('/api/current_datetime')
 def get_current_datetime():
@@ -212,6 +470,31 @@ def debug_sessions():
             'count': len(memory_sessions)
         })
 
+@app.route('/debug/scheduler')
+def debug_scheduler():
+    """View booking lifecycle scheduler and event stream state"""
+    return jsonify({
+        'scheduler': booking_scheduler.get_stats(),
+        'booking_events': booking_events.get_stats()
+    })
+
+@app.route('/debug/metrics')
+def debug_metrics():
+    """Chat pipeline metrics"""
+    registry = get_tool_registry()
+    return jsonify({
+        'fast_path': get_router().get_stats(),
+        'tools': registry.report() if registry else None,
+        'turns': get_turn_stats().summary(),
+        'speculation': get_speculator().get_stats(),
+        'tool_cache': get_tool_cache().get_stats(),
+        'faq_cache': get_faq_cache().get_stats(),
+        'llm_backend': get_backend().get_stats(),
+        'retries': get_retry_policy().get_stats(),
+        'deadlines': get_deadline_stats().get_stats(),
+        'hedging': get_hedger().get_stats()
+    })
+
 @app.route('/api/')
 def api_docs():
     """API documentation"""
@@ -225,13 +508,19 @@ def api_docs():
             "/api/direct/chat": "POST - Chat without session",
             "/api/search_gpus": "GET - Search GPUs",
             "/api/recommendations": "GET - GPU recommendations",
+            "/api/recommend_availability": "GET - Recommendations with free instances and a quote (use_case, start_time, end_time, budget_per_hour, memory_requirement)",
             "/api/gpu_inventory": "GET - GPU inventory",
-            "/api/bookings": "GET - Booking data",
+            "/api/bookings": "GET - Booking data (optional start, end, model, status, limit, cursor; ETag aware)",
+            "/api/bookings/events": "GET - Server-sent booking deltas",
+            "/api/utilization": "GET - Occupancy, GPU-hours and revenue per model/instance (start, end, bucket=hour|day|week)",
+            "/api/forecast": "GET - Predicted occupancy per model (model, start, end, bucket=hour|day)",
             "/api/current_datetime": "GET - Current time"
         },
         "debug_apis": {
             "/debug/history": "GET - View conversation history",
-            "/debug/sessions": "GET - View active sessions"
+            "/debug/sessions": "GET - View active sessions",
+            "/debug/scheduler": "GET - View booking scheduler state",
+            "/debug/metrics": "GET - Chat pipeline metrics (fast path, tool tokens per state, LLM calls/rounds/tokens per turn, speculative tool hits, tool result cache, FAQ cache)"
         },
         "pages": {
             "/": "Chat interface",
@@ -250,5 +539,11 @@ if __name__ == '__main__':
     print("   - API docs: http://localhost:5000/api/")
     print("   - Debug interface: http://localhost:5000/debug/history")
     print("=" * 60)
-    
-    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
+
+    debug = True
+    # The debug reloader runs this file in a watching parent too; a scheduler there would
+    # save its stale copy of the store over bookings.json, so only the serving child starts one
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        booking_scheduler.start()
+
+    app.run(debug=debug, host='0.0.0.0', port=5000, threaded=True)
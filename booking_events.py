@@ -0,0 +1,137 @@
+import json
+import queue
+import threading
+from collections import deque
+from typing import Dict, Iterator, Optional
+
+from booking_store import BookingStore, get_store
+
+
+# Booking fields the dashboard needs to draw and describe a booking
+DELTA_FIELDS = ("booking_id", "user_name", "gpu_model", "gpu_id", "start_time", "end_time",
+                "status", "total_cost", "overtime_cost")
+
+# Recent deltas kept so reconnecting clients can catch up without a full reload
+HISTORY_SIZE = 1000
+
+# Queued deltas per client before a slow client is told to resync
+CLIENT_QUEUE_SIZE = 256
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT_SECONDS = 15
+
+
+def _format_sse(event: str, data: Dict, event_id: str = None) -> str:
+    """Format one server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class BookingEventBroadcaster:
+    """
+    Fans booking store changes out to server-sent event streams
+    Each client gets the current store version, then only booking deltas
+    """
+
+    def __init__(self, store: BookingStore = None):
+        self.store = store or get_store()
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.stats = {"deltas": 0, "clients_connected": 0, "clients_resynced": 0}
+        self.store.subscribe(self._on_store_event)
+
+    def _on_store_event(self, event: Dict):
+        """Turn a store change into a delta and queue it for every client"""
+        if event["type"] == "created":
+            kind = "created"
+        elif event["type"] == "status_changed":
+            kind = "cancelled" if event["new_status"] == "cancelled" else "status_changed"
+        else:
+            # Overtime updates and archival do not change what the timeline shows
+            return
+
+        booking = event["booking"]
+        delta = {
+            "id": self.store.version_tag(),
+            "version": event["version"],
+            "event": kind,
+            "data": {
+                "version": self.store.version_tag(),
+                "booking": {field: booking.get(field) for field in DELTA_FIELDS}
+            }
+        }
+        if kind != "created":
+            delta["data"]["old_status"] = event["old_status"]
+
+        with self.lock:
+            self.history.append(delta)
+            self.stats["deltas"] += 1
+            for client in list(self.clients):
+                try:
+                    client.put_nowait(delta)
+                except queue.Full:
+                    # Slow consumer: drop its backlog and tell it to reload instead
+                    self._drain(client)
+                    client.put_nowait(None)
+
+    @staticmethod
+    def _drain(client: queue.Queue):
+        while True:
+            try:
+                client.get_nowait()
+            except queue.Empty:
+                return
+
+    def _replay_since(self, last_event_id: str) -> Optional[list]:
+        """Deltas after a client's last seen event, or None if they are no longer buffered"""
+        generation, _, version = (last_event_id or '').partition('.')
+        # A different generation means the server restarted since the client connected
+        if generation != self.store.generation or not version.isdigit():
+            return None
+        last = int(version)
+        # Version numbers also move for changes that are not deltas, so a gap before the
+        # oldest buffered delta may hide dropped deltas; make the client reload then
+        if not self.history or self.history[0]["version"] > last + 1:
+            return None
+        return [delta for delta in self.history if delta["version"] > last]
+
+    def stream(self, last_event_id: str = None) -> Iterator[str]:
+        """Generate the SSE stream for one client"""
+        client = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        with self.lock:
+            replay = self._replay_since(last_event_id) if last_event_id else None
+            self.clients.add(client)
+            self.stats["clients_connected"] += 1
+
+        try:
+            if replay is not None:
+                for delta in replay:
+                    yield _format_sse(delta["event"], delta["data"], delta["id"])
+            else:
+                yield _format_sse("snapshot", {"version": self.store.version_tag()}, self.store.version_tag())
+
+            while True:
+                try:
+                    delta = client.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if delta is None:
+                    self.stats["clients_resynced"] += 1
+                    yield _format_sse("resync", {"version": self.store.version_tag()}, self.store.version_tag())
+                    continue
+                yield _format_sse(delta["event"], delta["data"], delta["id"])
+        finally:
+            with self.lock:
+                self.clients.discard(client)
+
+    def get_stats(self) -> Dict:
+        """Broadcaster counters"""
+        with self.lock:
+            return dict(self.stats, clients=len(self.clients), buffered_deltas=len(self.history))
@@ -0,0 +1,145 @@
+import heapq
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+from booking_store import BookingStore, get_store, to_epoch
+
+
+# Status a booking moves to next, and which of its timestamps triggers the move
+TRANSITIONS = {
+    "scheduled": ("active", "start_time"),
+    "active": ("completed", "end_time"),
+}
+
+
+class BookingScheduler:
+    """
+    Background scheduler for booking lifecycle transitions
+    Moves bookings to 'active' at start_time and 'completed' at end_time using a
+    min-heap keyed on each booking's next transition time
+    """
+
+    def __init__(self, store: BookingStore = None, clock: Callable[[], float] = time.time,
+                 archive_interval: Optional[float] = 3600):
+        self.store = store or get_store()
+        self.clock = clock
+        # How often finished bookings are moved to the cold archive (None disables)
+        self.archive_interval = archive_interval
+        self.last_archive = None
+        self.heap = []
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.transitions_applied = 0
+
+        with self.store.lock:
+            for booking in self.store.bookings:
+                self.schedule(booking)
+            self.store.subscribe(self._on_store_event)
+
+    def schedule(self, booking: Dict):
+        """Queue the next lifecycle transition for a booking, if it has one"""
+        transition = TRANSITIONS.get(booking["status"])
+        if transition is None:
+            return
+        new_status, time_field = transition
+        entry = (to_epoch(booking[time_field]), booking["booking_hash"], booking["status"], new_status)
+        with self.condition:
+            heapq.heappush(self.heap, entry)
+            # Wake the worker if this transition is now the earliest one
+            if self.heap[0] is entry:
+                self.condition.notify()
+
+    def _on_store_event(self, event: Dict):
+        """Pick up newly created bookings (and reactivated ones) from the store"""
+        if event["type"] == "created" or (event["type"] == "status_changed"
+                                          and event["new_status"] in TRANSITIONS):
+            self.schedule(event["booking"])
+
+    def next_due(self) -> Optional[float]:
+        """Epoch time of the earliest queued transition"""
+        with self.condition:
+            return self.heap[0][0] if self.heap else None
+
+    def run_due(self, now: float = None) -> List[Dict]:
+        """Apply every transition due at or before now; returns the applied changes"""
+        now = self.clock() if now is None else now
+        applied = []
+
+        while True:
+            with self.condition:
+                if not self.heap or self.heap[0][0] > now:
+                    break
+                _, booking_hash, expected_status, new_status = heapq.heappop(self.heap)
+
+            with self.store.lock:
+                booking = self.store.get(booking_hash)
+                # Entries are never removed from the heap; skip ones made stale by
+                # cancellations or earlier transitions
+                if booking is None or booking["status"] != expected_status:
+                    continue
+                self.store.update_booking(booking_hash, status=new_status)
+
+            applied.append({"booking_hash": booking_hash, "old_status": expected_status,
+                            "new_status": new_status})
+
+        if applied:
+            self.store.save()
+            self.transitions_applied += len(applied)
+            print(f"Booking scheduler applied {len(applied)} status transitions")
+        return applied
+
+    def _maybe_archive(self):
+        """Periodically move old finished bookings out of the hot partition"""
+        if self.archive_interval is None:
+            return
+        now = self.clock()
+        if self.last_archive is None or now - self.last_archive >= self.archive_interval:
+            self.last_archive = now
+            self.store.archive_finished(now)
+
+    def _loop(self):
+        """Worker loop: sleep until the next transition is due, then apply it"""
+        while self.running:
+            try:
+                self.run_due()
+                self._maybe_archive()
+            except Exception as e:
+                print(f"Booking scheduler error: {str(e)}")
+
+            with self.condition:
+                if not self.running:
+                    break
+                delay = self.heap[0][0] - self.clock() if self.heap else None
+                if delay is None or delay > 0:
+                    # Cap the wait so wall-clock jumps are noticed
+                    self.condition.wait(timeout=min(delay, 60) if delay is not None else 60)
+
+    def start(self):
+        """Start the background worker thread"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="booking-scheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background worker thread"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.store.unsubscribe(self._on_store_event)
+
+    def get_stats(self) -> Dict:
+        """Scheduler counters"""
+        with self.condition:
+            queued = len(self.heap)
+        return {
+            "queued_transitions": queued,
+            "next_due": self.next_due(),
+            "transitions_applied": self.transitions_applied,
+            "running": self.running
+        }
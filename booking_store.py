@@ -0,0 +1,398 @@
+import os
+import re
+import gzip
+import json
+import uuid
+import datetime
+import threading
+import itertools
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Dict, Optional
+
+
+# Bookings in these statuses still hold their GPU instance
+LIVE_STATUSES = ("active", "scheduled")
+
+# Bookings in these statuses can be moved to the cold archive
+FINISHED_STATUSES = ("completed", "cancelled")
+
+# Finished bookings stay in the hot partition this long after they end
+ARCHIVE_RETENTION_DAYS = 30
+
+# Number of decompressed cold partitions kept in memory
+PARTITION_CACHE_SIZE = 4
+
+
+def parse_time(value: str) -> datetime.datetime:
+    """Parse an ISO timestamp (with optional 'Z' suffix) into an aware UTC datetime"""
+    dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt
+
+
+def _booking_number(booking_id: str) -> int:
+    """Numeric part of a booking ID like 'book_042'"""
+    match = re.search(r'(\d+)$', booking_id or '')
+    return int(match.group(1)) if match else 0
+
+
+def _month_before(dt: datetime.datetime) -> str:
+    """'YYYY-MM' of the month before a date"""
+    first_of_month = dt.replace(day=1)
+    return (first_of_month - datetime.timedelta(days=1)).strftime('%Y-%m')
+
+
+def to_epoch(value) -> float:
+    """Convert an ISO string, datetime or number into epoch seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.timestamp()
+    return parse_time(value).timestamp()
+
+
+class BookingStore:
+    """
+    Shared, thread-safe view of bookings.json
+    Keeps a per-GPU index of live bookings so lookups do not scan the whole list,
+    and notifies subscribers of every change
+
+    bookings.json is the hot partition (live and recently finished bookings).
+    Older finished bookings move to one gzip file per start month in the archive
+    directory; a manifest records which users appear in each month so queries
+    only open the cold partitions they need.
+    """
+
+    def __init__(self, path: str = 'bookings.json', archive_dir: str = None):
+        self.path = path
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(path), 'booking_archive')
+        self.lock = threading.RLock()
+        self.version = 0
+        # Distinguishes versions across restarts (version restarts at 0)
+        self.generation = uuid.uuid4().hex[:8]
+        self.listeners = []
+
+        with open(path, 'r') as f:
+            self.bookings = json.load(f)
+
+        self.manifest = self._load_manifest()
+        self._partition_cache = OrderedDict()
+
+        self._by_hash = {}
+        self._live_index = {}
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Rebuild the hash lookup and the per-GPU live booking index"""
+        self._by_hash = {b["booking_hash"]: b for b in self.bookings}
+        self._live_index = {}
+        for booking in self.bookings:
+            if booking["status"] in LIVE_STATUSES:
+                self._index_add(booking)
+
+    def _index_add(self, booking: Dict):
+        """Insert a booking into the live index, keeping each GPU's list sorted by start time"""
+        entries = self._live_index.setdefault(booking["gpu_id"], [])
+        entry = (to_epoch(booking["start_time"]), to_epoch(booking["end_time"]), booking["booking_hash"])
+        entries.insert(bisect_right(entries, entry), entry)
+
+    def _index_remove(self, booking: Dict):
+        """Drop a booking from the live index"""
+        entries = self._live_index.get(booking["gpu_id"], [])
+        entries[:] = [e for e in entries if e[2] != booking["booking_hash"]]
+        if not entries:
+            self._live_index.pop(booking["gpu_id"], None)
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        """Register a callback receiving change events ('created', 'status_changed', 'updated')"""
+        with self.lock:
+            self.listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        """Remove a previously registered callback"""
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def _emit(self, event: Dict):
+        """Deliver a change event to every subscriber"""
+        event["version"] = self.version
+        for callback in list(self.listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Booking store listener error: {str(e)}")
+
+    def version_tag(self) -> str:
+        """Opaque identifier of the current store contents, for cache keys and ETags"""
+        return f"{self.generation}.{self.version}"
+
+    def get(self, booking_hash: str) -> Optional[Dict]:
+        """Look up a booking by hash"""
+        return self._by_hash.get(booking_hash)
+
+    def live_bookings(self, gpu_id: str) -> List[Dict]:
+        """Live bookings on a GPU instance, ordered by start time"""
+        with self.lock:
+            return [self._by_hash[e[2]] for e in self._live_index.get(gpu_id, [])]
+
+    def find_live_booking(self, gpu_id: str, timestamp) -> Optional[Dict]:
+        """Find the live booking on a GPU instance whose window contains the timestamp"""
+        ts = to_epoch(timestamp)
+        with self.lock:
+            entries = self._live_index.get(gpu_id, [])
+            # Live bookings on one instance never overlap, so only the last one
+            # starting at or before the timestamp can contain it
+            i = bisect_right(entries, (ts, float('inf'), ''))
+            if i > 0:
+                start, end, booking_hash = entries[i - 1]
+                if start <= ts < end:
+                    return self._by_hash[booking_hash]
+            return None
+
+    def has_conflict(self, gpu_id: str, start_time, end_time) -> bool:
+        """Check whether a time window overlaps any live booking on a GPU instance"""
+        request_start = to_epoch(start_time)
+        request_end = to_epoch(end_time)
+        with self.lock:
+            entries = self._live_index.get(gpu_id, [])
+            # Only bookings starting before the requested end can overlap
+            candidates = entries[:bisect_left(entries, (request_end,))]
+            return any(end > request_start for _, end, _ in candidates)
+
+    def next_booking_id(self) -> str:
+        """Next sequential booking ID, counting archived bookings too"""
+        with self.lock:
+            highest = max([_booking_number(b["booking_id"]) for b in self.bookings] +
+                          [self.manifest["max_booking_number"]])
+            return f"book_{highest + 1:03d}"
+
+    def add_booking(self, booking: Dict) -> Dict:
+        """Append a new booking, index it and persist the store"""
+        with self.lock:
+            self.bookings.append(booking)
+            self._by_hash[booking["booking_hash"]] = booking
+            if booking["status"] in LIVE_STATUSES:
+                self._index_add(booking)
+            self.version += 1
+            self.save()
+            self._emit({"type": "created", "booking": booking})
+            return booking
+
+    def add_booking_if_free(self, booking: Dict) -> Optional[Dict]:
+        """Add a booking unless its GPU instance is already taken for that window (None then)"""
+        with self.lock:
+            if self.has_conflict(booking["gpu_id"], booking["start_time"], booking["end_time"]):
+                return None
+            return self.add_booking(booking)
+
+    def update_booking(self, booking_hash: str, **fields) -> Optional[Dict]:
+        """Update fields of a booking in memory and bump the store version"""
+        with self.lock:
+            booking = self._by_hash.get(booking_hash)
+            if booking is None:
+                return None
+            old_status = booking["status"]
+            booking.update(fields)
+            was_live = old_status in LIVE_STATUSES
+            is_live = booking["status"] in LIVE_STATUSES
+            if was_live and not is_live:
+                self._index_remove(booking)
+            elif is_live and not was_live:
+                self._index_add(booking)
+            self.version += 1
+
+            if booking["status"] != old_status:
+                self._emit({"type": "status_changed", "booking": booking,
+                            "old_status": old_status, "new_status": booking["status"]})
+            else:
+                self._emit({"type": "updated", "booking": booking, "fields": sorted(fields)})
+            return booking
+
+    def save(self):
+        """Write the hot partition back to disk"""
+        with self.lock:
+            with open(self.path, 'w') as f:
+                json.dump(self.bookings, f, indent=2)
+
+    # ----- Cold archive -----
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.archive_dir, 'manifest.json')
+
+    def _partition_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f'bookings-{month}.json.gz')
+
+    def _load_manifest(self) -> Dict:
+        """Load the archive manifest, or an empty one if nothing is archived yet"""
+        try:
+            with open(self._manifest_path(), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"max_booking_number": 0, "partitions": {}}
+
+    def load_partition(self, month: str) -> List[Dict]:
+        """Read one monthly cold partition, keeping a few recently used ones decompressed"""
+        with self.lock:
+            if month in self._partition_cache:
+                self._partition_cache.move_to_end(month)
+                return self._partition_cache[month]
+            try:
+                with gzip.open(self._partition_path(month), 'rt', encoding='utf-8') as f:
+                    bookings = json.load(f)
+            except FileNotFoundError:
+                bookings = []
+            self._partition_cache[month] = bookings
+            if len(self._partition_cache) > PARTITION_CACHE_SIZE:
+                self._partition_cache.popitem(last=False)
+            return bookings
+
+    def _write_partition(self, month: str, bookings: List[Dict]):
+        """Atomically rewrite one monthly cold partition"""
+        path = self._partition_path(month)
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f:
+            json.dump(bookings, f)
+        os.replace(path + '.tmp', path)
+        self._partition_cache.pop(month, None)
+
+    def cold_partitions(self, user_email: str = None, created_from=None, created_to=None) -> List[str]:
+        """Months whose cold partition may hold bookings matching the filters, newest first"""
+        created_from = to_epoch(created_from) if created_from else None
+        created_to = to_epoch(created_to) if created_to else None
+        months = []
+        for month, info in self.manifest["partitions"].items():
+            if user_email and user_email not in info["emails"]:
+                continue
+            if created_from is not None and info["created_to"] < created_from:
+                continue
+            if created_to is not None and info["created_from"] > created_to:
+                continue
+            months.append(month)
+        return sorted(months, reverse=True)
+
+    def iter_archived(self, months: List[str] = None) -> Iterator[Dict]:
+        """Iterate bookings from the given cold partitions (all of them by default)"""
+        if months is None:
+            months = sorted(self.manifest["partitions"], reverse=True)
+        for month in months:
+            yield from self.load_partition(month)
+
+    def query(self, start_time=None, end_time=None, models: List[str] = None,
+              statuses: List[str] = None, after: tuple = None, limit: int = None) -> List[Dict]:
+        """
+        Bookings overlapping a time window, filtered by model and status, ordered by
+        (start_time, booking_id). Cold partitions are read only for the months the
+        window touches; without a window only the hot partition is searched.
+        after is the sort key of the last booking of the previous page.
+        """
+        window_start = to_epoch(start_time) if start_time else None
+        window_end = to_epoch(end_time) if end_time else None
+
+        months = []
+        if window_start is not None or window_end is not None:
+            # Bookings are archived by start month; include the month before the window
+            # for bookings that started earlier and run into it
+            first = _month_before(parse_time(start_time)) if start_time else None
+            last = parse_time(end_time).strftime('%Y-%m') if end_time else None
+            months = [m for m in self.manifest["partitions"]
+                      if (first is None or m >= first) and (last is None or m <= last)]
+
+        with self.lock:
+            results = []
+            for booking in itertools.chain(self.bookings, self.iter_archived(months)):
+                if models and booking["gpu_model"] not in models:
+                    continue
+                if statuses and booking["status"] not in statuses:
+                    continue
+                booking_start = to_epoch(booking["start_time"])
+                if window_end is not None and booking_start >= window_end:
+                    continue
+                if window_start is not None and to_epoch(booking["end_time"]) <= window_start:
+                    continue
+                key = (booking_start, booking["booking_id"])
+                if after is not None and key <= tuple(after):
+                    continue
+                results.append((key, booking))
+
+        results.sort(key=lambda item: item[0])
+        if limit is not None:
+            results = results[:limit]
+        return [booking for _, booking in results]
+
+    def find_archived(self, booking_hash: str = None, booking_id: str = None) -> Optional[Dict]:
+        """Look up a single archived booking by hash or ID"""
+        if not booking_hash and not booking_id:
+            return None
+        for booking in self.iter_archived():
+            if booking_hash and booking["booking_hash"] == booking_hash:
+                return booking
+            if booking_id and booking["booking_id"] == booking_id:
+                return booking
+        return None
+
+    def archive_finished(self, now: float = None, retention_days: int = ARCHIVE_RETENTION_DAYS) -> int:
+        """Move finished bookings that ended before the retention window into cold partitions"""
+        now = datetime.datetime.now(datetime.timezone.utc).timestamp() if now is None else now
+        cutoff = now - retention_days * 86400
+
+        with self.lock:
+            by_month = {}
+            hot = []
+            for booking in self.bookings:
+                if booking["status"] in FINISHED_STATUSES and to_epoch(booking["end_time"]) < cutoff:
+                    month = parse_time(booking["start_time"]).strftime('%Y-%m')
+                    by_month.setdefault(month, []).append(booking)
+                else:
+                    hot.append(booking)
+
+            if not by_month:
+                return 0
+
+            os.makedirs(self.archive_dir, exist_ok=True)
+            for month, bookings in by_month.items():
+                partition = self.load_partition(month) + bookings
+                self._write_partition(month, partition)
+
+                created = [to_epoch(b["created_at"]) for b in partition]
+                self.manifest["partitions"][month] = {
+                    "count": len(partition),
+                    "emails": sorted({b["user_email"] for b in partition}),
+                    "created_from": min(created),
+                    "created_to": max(created)
+                }
+                self.manifest["max_booking_number"] = max(
+                    [self.manifest["max_booking_number"]] + [_booking_number(b["booking_id"]) for b in bookings])
+
+            with open(self._manifest_path() + '.tmp', 'w') as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(self._manifest_path() + '.tmp', self._manifest_path())
+
+            archived = len(self.bookings) - len(hot)
+            self.bookings = hot
+            self._rebuild_index()
+            self.version += 1
+            self.save()
+            self._emit({"type": "archived", "count": archived, "months": sorted(by_month)})
+            print(f"Archived {archived} finished bookings into {len(by_month)} monthly partitions")
+            return archived
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: str = 'bookings.json') -> BookingStore:
+    """Get the process-wide store for a bookings file"""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = BookingStore(path)
+        return _stores[path]
+
+
+if __name__ == "__main__":
+    # Move old finished bookings out of bookings.json into the cold archive
+    print(f"{get_store().archive_finished()} bookings archived")
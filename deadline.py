@@ -0,0 +1,78 @@
+import time
+import threading
+from typing import Dict
+
+
+# Time a chat request may take end to end, kept below common browser and load-balancer timeouts
+CHAT_REQUEST_SECONDS = 25.0
+
+# An LLM call (or retry) is not started with less time than this left; it would only time out
+MIN_CALL_SECONDS = 2.0
+
+
+class Deadline:
+    """Point in time (on the given monotonic clock) by which a request must be answered"""
+
+    def __init__(self, seconds: float, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+        # Set when work was skipped or cut short to stay within the deadline
+        self.exceeded = False
+
+    def remaining(self) -> float:
+        return max(self.expires_at - self.clock(), 0.0)
+
+    def expired(self) -> bool:
+        return self.clock() >= self.expires_at
+
+    def timeout(self, cap: float) -> float:
+        """Timeout for one call: what is left of the deadline, at most `cap`"""
+        return min(cap, self.remaining())
+
+    def allows_call(self) -> bool:
+        """Enough time left for an LLM call to have a chance of finishing"""
+        if self.remaining() < MIN_CALL_SECONDS:
+            self.exceeded = True
+            return False
+        return True
+
+
+class DeadlineStats:
+    """Process-wide counts of requests that ran out of time, answered late or cut short"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "exceeded": 0, "late": 0, "retries_skipped": 0, "calls_skipped": 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def record_request(self, deadline: Deadline):
+        """Count a finished request, and whether its deadline cut it short or it answered late"""
+        late = deadline.expired()
+        with self.lock:
+            self.stats["requests"] += 1
+            if late or deadline.exceeded:
+                self.stats["exceeded"] += 1
+            if late:
+                self.stats["late"] += 1
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.stats, request_seconds=CHAT_REQUEST_SECONDS)
+        stats["exceeded_rate"] = round(stats["exceeded"] / stats["requests"], 3) if stats["requests"] else 0.0
+        return stats
+
+
+_deadline_stats = None
+_deadline_stats_lock = threading.Lock()
+
+
+def get_deadline_stats() -> DeadlineStats:
+    """Process-wide deadline metrics (shared by every request)"""
+    global _deadline_stats
+    with _deadline_stats_lock:
+        if _deadline_stats is None:
+            _deadline_stats = DeadlineStats()
+        return _deadline_stats
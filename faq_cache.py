@@ -0,0 +1,215 @@
+import re
+import json
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from fast_path import EMAIL_PATTERN, HASH_PATTERN, INTENT_PATTERNS, extract_window, model_aliases
+
+
+# Cosine similarity of character n-gram TF-IDF vectors needed to reuse an answer
+SIMILARITY_THRESHOLD = 0.82
+
+# Cached answers per inventory version
+FAQ_CACHE_SIZE = 512
+
+# Character n-gram lengths (within word boundaries)
+NGRAM_RANGE = (3, 5)
+
+# Messages longer than this are rarely repeated word for word
+MAX_QUESTION_LENGTH = 200
+
+# Answers that depend on the user, the conversation or the current bookings
+PERSONAL_PATTERN = re.compile(
+    r"\b(my|mine|me|i'm|i've|we|our|booked|booking for|reservation|cancel it|status|now|currently|"
+    r"it|that|this one|those|them|same|again|instead|also)\b", re.IGNORECASE)
+
+# A negation flips the answer but barely moves the n-gram similarity
+NEGATION_PATTERN = re.compile(r"\b(not|no|never|without|cannot|nor)\b")
+
+CONTRACTIONS = {"what's": "what is", "how's": "how is", "where's": "where is", "who's": "who is",
+                "it's": "it is", "there's": "there is", "can't": "cannot", "don't": "do not",
+                "doesn't": "does not", "isn't": "is not", "aren't": "are not"}
+
+
+def inventory_version(gpu_data: Dict) -> str:
+    """Content hash of the GPU inventory; cached answers are only valid for the inventory they saw"""
+    return hashlib.md5(json.dumps(gpu_data, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def normalize(text: str) -> str:
+    """Lowercase, expand contractions, drop punctuation and extra whitespace"""
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"\b(" + "|".join(re.escape(c) for c in CONTRACTIONS) + r")",
+                  lambda m: CONTRACTIONS[m.group(1)], text)
+    text = re.sub(r"[^\w\s-]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def ngrams(text: str) -> Dict[str, int]:
+    """Character n-gram counts of each padded word"""
+    counts = {}
+    for word in text.split():
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(max(len(padded) - n + 1, 1)):
+                gram = padded[i:i + n]
+                counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def faq_cacheable(text: str, models: List[str], now: datetime.datetime = None) -> bool:
+    """True for generic questions whose answer depends only on the inventory"""
+    text = text.strip()
+    if not text or text.startswith('/') or len(text) > MAX_QUESTION_LENGTH:
+        return False
+    if EMAIL_PATTERN.search(text) or HASH_PATTERN.search(text):
+        return False
+    if PERSONAL_PATTERN.search(text) or INTENT_PATTERNS["availability"].search(text):
+        return False
+    window, understood = extract_window(text, now or datetime.datetime.now(datetime.timezone.utc))
+    return window is None and understood
+
+
+class FAQCache:
+    """
+    Answers to generic, tool-free questions, reused for the same or similar questions
+    Similar means: same GPU models and numbers mentioned, and a TF-IDF cosine of character
+    n-grams above the threshold. Entries are kept per inventory version; when the inventory
+    changes every older answer is dropped.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, size: int = FAQ_CACHE_SIZE):
+        self.threshold = threshold
+        self.size = size
+        self.lock = threading.Lock()
+        self.version = None
+        self.entries = OrderedDict()
+        self._matrix = None
+        self._aliases = {}
+        self.stats = {"lookups": 0, "exact_hits": 0, "similar_hits": 0, "misses": 0, "stores": 0,
+                      "invalidations": 0, "seconds_saved": 0.0, "similarity_sum": 0.0}
+
+    def _signature(self, text: str, models: List[str]) -> tuple:
+        """Models, numbers and negations in a question; answers are only shared between equal signatures"""
+        key = tuple(models)
+        aliases = self._aliases.get(key)
+        if aliases is None:
+            aliases = self._aliases[key] = model_aliases(models)
+        # In the order they are mentioned: "A100 vs H100" and "H100 vs A100" are different questions
+        found = ((pattern.search(text), model) for model, pattern in aliases.items())
+        mentioned = tuple(model for match, model in sorted((m.start(), model) for m, model in found if m))
+        numbers = tuple(sorted(set(re.findall(r"\d+(?:\.\d+)?", text))))
+        negations = tuple(NEGATION_PATTERN.findall(text))
+        return mentioned, numbers, negations
+
+    def _observe_version(self, version: str):
+        if version != self.version:
+            if self.entries:
+                self.stats["invalidations"] += 1
+            self.entries.clear()
+            self._matrix = None
+            self.version = version
+
+    def _build_matrix(self):
+        """L2-normalised TF-IDF rows for every cached question"""
+        questions = list(self.entries)
+        vocabulary = {}
+        for question in questions:
+            for gram in self.entries[question]["ngrams"]:
+                vocabulary.setdefault(gram, len(vocabulary))
+        counts = np.zeros((len(questions), len(vocabulary)))
+        for row, question in enumerate(questions):
+            for gram, count in self.entries[question]["ngrams"].items():
+                counts[row, vocabulary[gram]] = count
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = np.log((1 + len(questions)) / (1 + document_frequency)) + 1
+        weights = counts * idf
+        weights /= np.maximum(np.linalg.norm(weights, axis=1, keepdims=True), 1e-12)
+        self._matrix = (questions, vocabulary, idf, weights)
+
+    def lookup(self, text: str, models: List[str], version: str) -> Optional[Dict]:
+        """{"answer", "similarity", "question"} for a cached match, else None"""
+        question = normalize(text)
+        with self.lock:
+            self._observe_version(version)
+            self.stats["lookups"] += 1
+            entry = self.entries.get(question)
+            exact = entry is not None
+            similarity = 1.0
+            if entry is None and self.entries:
+                if self._matrix is None:
+                    self._build_matrix()
+                questions, vocabulary, idf, weights = self._matrix
+                vector = np.zeros(len(vocabulary))
+                # N-grams no cached question has still count towards the query's length,
+                # weighted like a term in no document, so extra words lower the similarity
+                unseen_idf = np.log(1 + len(questions)) + 1
+                unseen = 0.0
+                for gram, count in ngrams(question).items():
+                    if gram in vocabulary:
+                        vector[vocabulary[gram]] = count
+                    else:
+                        unseen += (count * unseen_idf) ** 2
+                vector *= idf
+                norm = np.sqrt(np.dot(vector, vector) + unseen)
+                if norm > 0:
+                    scores = weights @ (vector / norm)
+                    signature = self._signature(question, models)
+                    for i in np.argsort(-scores):
+                        if scores[i] < self.threshold:
+                            break
+                        if self.entries[questions[i]]["signature"] == signature:
+                            entry, similarity = self.entries[questions[i]], float(scores[i])
+                            break
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(entry["question"])
+            self.stats["exact_hits" if exact else "similar_hits"] += 1
+            self.stats["similarity_sum"] += similarity
+            self.stats["seconds_saved"] += entry["seconds"]
+            return {"answer": entry["answer"], "similarity": round(similarity, 3), "question": entry["question"]}
+
+    def store(self, text: str, answer: str, models: List[str], version: str, seconds: float = 0.0):
+        """Remember the LLM's answer to a generic question"""
+        question = normalize(text)
+        if not question:
+            return
+        with self.lock:
+            self._observe_version(version)
+            self.entries[question] = {"question": question, "answer": answer, "seconds": seconds,
+                                      "ngrams": ngrams(question), "signature": self._signature(question, models)}
+            self.entries.move_to_end(question)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+            self._matrix = None
+            self.stats["stores"] += 1
+
+    def get_stats(self) -> Dict:
+        """Exact and similar hits, misses, entries and estimated LLM time saved"""
+        with self.lock:
+            stats = dict(self.stats, entries=len(self.entries), inventory_version=self.version,
+                         threshold=self.threshold)
+        hits = stats["exact_hits"] + stats["similar_hits"]
+        stats["hit_rate"] = round(hits / stats["lookups"], 3) if stats["lookups"] else 0.0
+        stats["avg_hit_similarity"] = round(stats.pop("similarity_sum") / hits, 3) if hits else 0.0
+        stats["seconds_saved"] = round(stats["seconds_saved"], 1)
+        return stats
+
+
+_faq_cache = None
+_faq_cache_lock = threading.Lock()
+
+
+def get_faq_cache() -> FAQCache:
+    """Process-wide FAQ cache (shared by every session)"""
+    global _faq_cache
+    with _faq_cache_lock:
+        if _faq_cache is None:
+            _faq_cache = FAQCache()
+        return _faq_cache
@@ -0,0 +1,523 @@
+import re
+import time
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+# Assumed duration of an LLM turn until real turns have been timed
+DEFAULT_LLM_TURN_SECONDS = 4.0
+
+# Longer messages usually carry more than one request; leave them to the LLM
+MAX_MESSAGE_LENGTH = 240
+
+# Booking rows shown in a templated answer before "and N more"
+MAX_ROWS = 10
+
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+HASH_PATTERN = re.compile(r'\b[0-9a-f]{32}\b', re.IGNORECASE)
+
+# Anything that needs judgement, a multi-step flow or a write goes to the LLM
+EXCLUDE_PATTERN = re.compile(
+    r"\b(book|booking for me|reserve|rent|cancel|recommend|suggest|should|which|best|compare|vs|versus|"
+    r"forecast|busy|will|why|explain|help me|need|want|train|training|inference|render|gaming)\b",
+    re.IGNORECASE)
+
+INTENT_PATTERNS = {
+    "current_datetime": re.compile(
+        r"\b(what(?:'s| is) (?:the )?(?:time|date|day)(?: today| now)?|what (?:time|day) is (?:it|today)|"
+        r"current (?:time|date)|today's date)\b", re.IGNORECASE),
+    "billing": re.compile(r"\b(bill|billing|invoice|charges|charged|spent|spend|owe)\b", re.IGNORECASE),
+    "booking_lookup": re.compile(
+        r"\b(show|list|find|check|look ?up|view|see|get|status|details?|info|what are)\b.*\b(bookings?|reservations?)\b|"
+        r"\b(bookings?|reservations?)\b.*\b(for|of|under|status|details?|info)\b", re.IGNORECASE),
+    "availability": re.compile(
+        r"\b(how many|available|availability|free|in stock|any left|are there)\b", re.IGNORECASE),
+    "price": re.compile(r"\b(price|pricing|prices|cost|costs|rate|rates|how much)\b", re.IGNORECASE),
+}
+
+# Whole-message replies to a pending booking/cancellation confirmation. "cancel" is left
+# out on purpose: it could mean either answer while a cancellation is pending.
+AFFIRM_PATTERN = re.compile(
+    r"(?:yes|y|yeah|yep|yup|sure|ok|okay|confirm|confirmed|correct|proceed|go ahead|do it|please do|"
+    r"sounds good|looks good|yes please|yes,? confirm|confirm it|yes,? go ahead|yes,? proceed)", re.IGNORECASE)
+DECLINE_PATTERN = re.compile(
+    r"(?:no|n|nope|nah|no thanks|no thank you|don'?t|do not|stop|abort|never ?mind|keep it|"
+    r"keep the booking|not now|no,? don'?t)", re.IGNORECASE)
+
+MONTHS = {name: i + 1 for i, name in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july", "august",
+     "september", "october", "november", "december"])}
+MONTHS.update({name[:3]: number for name, number in list(MONTHS.items())})
+MONTHS["sept"] = 9
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+MONTH_RE = r'(?P<month>' + '|'.join(sorted(MONTHS, key=len, reverse=True)) + r')\.?'
+DAY_RE = r'(?P<day>\d{1,2})(?:st|nd|rd|th)?'
+YEAR_RE = r'(?:,?\s*(?P<year>20\d\d))?'
+TIME_RE = r'(?P<h{n}>\d{{1,2}})(?::(?P<m{n}>\d{{2}}))?\s*(?P<ampm{n}>am|pm)?'
+
+ISO_RANGE = re.compile(r'\b(?P<y1>20\d\d)-(?P<mo1>\d\d)-(?P<d1>\d\d)'
+                       r'(?:\s*(?:-|to|until|through)\s*(?P<y2>20\d\d)-(?P<mo2>\d\d)-(?P<d2>\d\d))?\b')
+MONTH_DAY_RANGE = re.compile(r'\b' + MONTH_RE + r'\s+' + DAY_RE +
+                             r'(?:\s*(?:-|–|to|until|through)\s*(?:(?P<month2>[a-z]{3,9})\.?\s+)?(?P<day2>\d{1,2})(?:st|nd|rd|th)?)?'
+                             + YEAR_RE + r'\b', re.IGNORECASE)
+DAY_MONTH = re.compile(r'\b' + DAY_RE + r'\s+(?:of\s+)?' + MONTH_RE + YEAR_RE + r'\b', re.IGNORECASE)
+RELATIVE_DAY = re.compile(r'\b(day after tomorrow|today|tonight|tomorrow|this weekend|next weekend|'
+                          r'this week|next week|(?:this |next |on )?(?:' + '|'.join(WEEKDAYS) + r'))\b',
+                          re.IGNORECASE)
+TIME_RANGE = re.compile(r'\b(?:from\s+|between\s+)?' + TIME_RE.format(n=1) +
+                        r'\s*(?:-|–|to|until|till|and)\s*' + TIME_RE.format(n=2) + r'\b', re.IGNORECASE)
+
+# Date or time words left over after parsing mean the window was not fully understood
+DATEISH = re.compile(r'\b(' + '|'.join(sorted(MONTHS, key=len, reverse=True)) + '|' + '|'.join(WEEKDAYS) +
+                     r'|today|tonight|tomorrow|yesterday|week|weekend|month|morning|afternoon|evening|noon|'
+                     r'midnight|hour|hours|am|pm|\d{1,2}\s*(?:am|pm)|\d{1,2}:\d\d|\d{1,2}/\d{1,2})\b', re.IGNORECASE)
+
+
+def _utc(year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> datetime.datetime:
+    return datetime.datetime(year, month, day, hour, minute, tzinfo=datetime.timezone.utc)
+
+
+def _to_24h(hour: int, minute: int, ampm: Optional[str]) -> Tuple[int, int]:
+    if ampm:
+        ampm = ampm.lower()
+        if ampm == "pm" and hour < 12:
+            hour += 12
+        elif ampm == "am" and hour == 12:
+            hour = 0
+    return hour, minute
+
+
+def _parse_time_range(match) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """(start, end) hour/minute pairs from a TIME_RANGE match, reading '9-5' as 09:00-17:00"""
+    h1, m1 = int(match.group('h1')), int(match.group('m1') or 0)
+    h2, m2 = int(match.group('h2')), int(match.group('m2') or 0)
+    ampm1, ampm2 = match.group('ampm1'), match.group('ampm2')
+    start = _to_24h(h1, m1, ampm1)
+    end = _to_24h(h2, m2, ampm2)
+    # "2-5pm" means 14:00-17:00, but "9-5pm" means 09:00-17:00
+    if ampm2 and not ampm1 and _to_24h(h1, m1, ampm2) < end:
+        start = _to_24h(h1, m1, ampm2)
+    if not ampm1 and not ampm2 and end <= start and end[0] < 12:
+        end = (end[0] + 12, end[1])
+    if not (0 <= start[0] < 24 and 0 <= end[0] <= 24 and start[1] < 60 and end[1] < 60) or end <= start:
+        return None
+    return start, end
+
+
+def extract_window(text: str, now: datetime.datetime) -> Tuple[Optional[Tuple[datetime.datetime, datetime.datetime]], bool]:
+    """
+    Find a booking window in a message
+    Returns ((start, end) or None, understood). understood is False when the message
+    mentions dates or times the parser could not turn into a window.
+    """
+    lowered = text.lower()
+    today = _utc(now.year, now.month, now.day)
+    first_day, last_day = None, None
+    consumed = []
+
+    match = ISO_RANGE.search(lowered)
+    if match:
+        try:
+            first_day = _utc(int(match.group('y1')), int(match.group('mo1')), int(match.group('d1')))
+            last_day = (_utc(int(match.group('y2')), int(match.group('mo2')), int(match.group('d2')))
+                        if match.group('y2') else first_day)
+        except ValueError:
+            return None, False
+        consumed.append(match.span())
+
+    if first_day is None:
+        match = MONTH_DAY_RANGE.search(lowered) or DAY_MONTH.search(lowered)
+        if match:
+            groups = match.groupdict()
+            month = MONTHS.get(groups['month'].lower().rstrip('.'))
+            year = int(groups['year']) if groups.get('year') else now.year
+            try:
+                first_day = _utc(year, month, int(groups['day']))
+                last_day = first_day
+                if groups.get('day2'):
+                    month2 = MONTHS.get((groups.get('month2') or '').lower(), month)
+                    last_day = _utc(year, month2, int(groups['day2']))
+            except (ValueError, TypeError):
+                return None, False
+            consumed.append(match.span())
+
+    if first_day is None:
+        match = RELATIVE_DAY.search(lowered)
+        if match:
+            phrase = match.group(1)
+            consumed.append(match.span())
+            if phrase in ("today", "tonight"):
+                first_day = last_day = today
+            elif phrase == "tomorrow":
+                first_day = last_day = today + datetime.timedelta(days=1)
+            elif phrase == "day after tomorrow":
+                first_day = last_day = today + datetime.timedelta(days=2)
+            elif phrase in ("this week", "next week"):
+                monday = today - datetime.timedelta(days=today.weekday())
+                if phrase == "next week":
+                    monday += datetime.timedelta(days=7)
+                first_day = max(monday, today)
+                last_day = monday + datetime.timedelta(days=6)
+            elif phrase in ("this weekend", "next weekend"):
+                saturday = today + datetime.timedelta(days=5 - today.weekday())
+                if phrase == "next weekend":
+                    saturday += datetime.timedelta(days=7)
+                first_day = max(saturday, today)
+                last_day = saturday + datetime.timedelta(days=1)
+            else:
+                weekday = WEEKDAYS.index(phrase.split()[-1])
+                ahead = (weekday - today.weekday()) % 7
+                if phrase.startswith("next") and ahead == 0:
+                    ahead = 7
+                first_day = last_day = today + datetime.timedelta(days=ahead)
+
+    times = TIME_RANGE.search(lowered)
+    if times:
+        # Bare numbers like "2025-07-22" or "22-25" are dates, not times
+        if any(start <= times.start() < end for start, end in consumed):
+            times = None
+    hours = _parse_time_range(times) if times else None
+    if times:
+        if hours is None:
+            return None, False
+        consumed.append(times.span())
+
+    residual = lowered
+    for start, end in sorted(consumed, reverse=True):
+        residual = residual[:start] + ' ' + residual[end:]
+    residual = EMAIL_PATTERN.sub(' ', HASH_PATTERN.sub(' ', residual))
+    if DATEISH.search(residual):
+        return None, False
+
+    if first_day is None and hours is None:
+        return None, True
+    if first_day is None:
+        first_day = last_day = today
+    if last_day < first_day:
+        return None, False
+
+    if hours:
+        (h1, m1), (h2, m2) = hours
+        start = first_day + datetime.timedelta(hours=h1, minutes=m1)
+        end = last_day + datetime.timedelta(hours=h2, minutes=m2)
+    else:
+        start = first_day
+        end = last_day + datetime.timedelta(days=1)
+    return (start, end), True
+
+
+def confirmation_reply(text: str) -> Optional[bool]:
+    """True for an unambiguous yes, False for an unambiguous no, None for anything else"""
+    text = re.sub(r'\s+', ' ', text.strip().lower())
+    text = re.sub(r'^(?:please )|(?: please)?[\s.!]*$', '', text)
+    if AFFIRM_PATTERN.fullmatch(text):
+        return True
+    if DECLINE_PATTERN.fullmatch(text):
+        return False
+    return None
+
+
+def model_aliases(models: List[str]) -> Dict[str, re.Pattern]:
+    """Regexes for the ways users name each model: 'RTX-4090', 'rtx 4090', '4090', 'h100'"""
+    aliases = {}
+    for model in models:
+        parts = re.split(r'[-\s]+', model.lower())
+        pattern = r'[-\s]*'.join(re.escape(part) for part in parts)
+        if len(parts) > 1 and parts[-1].isdigit():
+            pattern = f'(?:{pattern}|{re.escape(parts[-1])})'
+        aliases[model] = re.compile(r'(?<![\w-])' + pattern + r's?(?![\w])', re.IGNORECASE)
+    return aliases
+
+
+def _format_window(window) -> str:
+    start, end = window
+    if start.hour == start.minute == 0 and end.hour == end.minute == 0:
+        last = end - datetime.timedelta(days=1)
+        if last.date() == start.date():
+            return start.strftime('%a %b %d')
+        return f"{start.strftime('%a %b %d')} – {last.strftime('%a %b %d')}"
+    if start.date() == end.date():
+        return f"{start.strftime('%a %b %d, %H:%M')}–{end.strftime('%H:%M')} UTC"
+    return f"{start.strftime('%a %b %d %H:%M')} – {end.strftime('%a %b %d %H:%M')} UTC"
+
+
+def _iso(dt: datetime.datetime) -> str:
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class FastPathRouter:
+    """
+    Deterministic pre-router in front of the LLM
+    Recognises a few high-confidence intents (availability, booking lookup, billing,
+    prices, current date), fills their slots from the message, calls the chatbot's tool
+    functions directly and renders a templated Markdown answer. Anything else returns
+    None and goes to the LLM as before.
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or (lambda: datetime.datetime.now(datetime.timezone.utc))
+        self.lock = threading.Lock()
+        self._aliases = {}
+        self.stats = {
+            "messages": 0,
+            "hits": 0,
+            "misses": 0,
+            "by_intent": {},
+            "fast_path_seconds": 0.0,
+            "llm_turns": 0,
+            "llm_seconds": 0.0
+        }
+
+    def _model_aliases(self, models: List[str]) -> Dict[str, re.Pattern]:
+        key = tuple(models)
+        aliases = self._aliases.get(key)
+        if aliases is None:
+            aliases = self._aliases[key] = model_aliases(models)
+        return aliases
+
+    def match(self, text: str, models: List[str]) -> Optional[Dict]:
+        """Intent and slots for a message, or None when it should go to the LLM"""
+        text = text.strip()
+        if not text or text.startswith('/') or len(text) > MAX_MESSAGE_LENGTH or text.count('?') > 1:
+            return None
+        if EXCLUDE_PATTERN.search(text):
+            return None
+
+        mentioned = [model for model, pattern in self._model_aliases(models).items() if pattern.search(text)]
+        emails = EMAIL_PATTERN.findall(text)
+        hashes = HASH_PATTERN.findall(text)
+        if len(mentioned) > 1 or len(set(emails)) > 1 or len(set(hashes)) > 1:
+            return None
+        window, understood = extract_window(text, self.clock())
+        if not understood:
+            return None
+
+        slots = {
+            "model": mentioned[0] if mentioned else None,
+            "email": emails[0].lower() if emails else None,
+            "booking_hash": hashes[0].lower() if hashes else None,
+            "window": window
+        }
+
+        if INTENT_PATTERNS["current_datetime"].search(text):
+            return {"intent": "current_datetime", "slots": slots}
+        if INTENT_PATTERNS["billing"].search(text) and slots["email"]:
+            return {"intent": "billing", "slots": slots}
+        if (INTENT_PATTERNS["booking_lookup"].search(text) or slots["booking_hash"]) and \
+                (slots["email"] or slots["booking_hash"]):
+            return {"intent": "booking_lookup", "slots": slots}
+        if slots["email"] or slots["booking_hash"]:
+            return None
+        if INTENT_PATTERNS["availability"].search(text) and (slots["model"] or re.search(r'\bgpus?\b', text, re.I)):
+            return {"intent": "availability", "slots": slots}
+        if INTENT_PATTERNS["price"].search(text) and slots["model"]:
+            return {"intent": "price", "slots": slots}
+        return None
+
+    def route(self, chatbot, text: str) -> Optional[Dict]:
+        """
+        Answer a message without the LLM if possible
+        Returns {"intent", "tool", "parameters", "result", "markdown"} or None
+        """
+        started = time.perf_counter()
+        matched = self.match(text, list(chatbot.gpu_data["gpu_models"]))
+        answer = None
+        if matched is not None:
+            try:
+                answer = getattr(self, f"_answer_{matched['intent']}")(chatbot, matched["slots"])
+            except Exception as e:
+                print(f"Fast path {matched['intent']} failed, falling back to the LLM: {str(e)}")
+                answer = None
+
+        with self.lock:
+            self.stats["messages"] += 1
+            if answer is None:
+                self.stats["misses"] += 1
+            else:
+                answer["intent"] = matched["intent"]
+                self.stats["hits"] += 1
+                self.stats["by_intent"][matched["intent"]] = self.stats["by_intent"].get(matched["intent"], 0) + 1
+                self.stats["fast_path_seconds"] += time.perf_counter() - started
+        return answer
+
+    def record_llm_turn(self, seconds: float):
+        """Time of a turn that went to the LLM, used to estimate the latency the fast path saves"""
+        with self.lock:
+            self.stats["llm_turns"] += 1
+            self.stats["llm_seconds"] += seconds
+
+    def get_stats(self) -> Dict:
+        """Hit rate, per-intent hits and estimated latency saved"""
+        with self.lock:
+            stats = dict(self.stats, by_intent=dict(self.stats["by_intent"]))
+        llm_turn = stats["llm_seconds"] / stats["llm_turns"] if stats["llm_turns"] else DEFAULT_LLM_TURN_SECONDS
+        fast_turn = stats["fast_path_seconds"] / stats["hits"] if stats["hits"] else 0.0
+        stats["hit_rate"] = round(stats["hits"] / stats["messages"], 3) if stats["messages"] else 0.0
+        stats["avg_fast_path_ms"] = round(fast_turn * 1000, 2)
+        stats["avg_llm_turn_seconds"] = round(llm_turn, 2)
+        stats["estimated_seconds_saved"] = round(stats["hits"] * max(llm_turn - fast_turn, 0.0), 1)
+        stats["fast_path_seconds"] = round(stats["fast_path_seconds"], 4)
+        stats["llm_seconds"] = round(stats["llm_seconds"], 2)
+        return stats
+
+    # Templated answers; each returns None to fall back to the LLM
+
+    def _answer_current_datetime(self, chatbot, slots: Dict) -> Dict:
+        result = chatbot.get_current_datetime()
+        markdown = f"It's **{result['day_of_week']}, {result['current_date']}** at **{result['current_time'][:5]}** (server local time)."
+        return {"tool": "get_current_datetime", "parameters": {}, "result": result, "markdown": markdown}
+
+    def _answer_availability(self, chatbot, slots: Dict) -> Dict:
+        window = slots["window"]
+        if window is None:
+            # "Right now": anything overlapping the next minute
+            now = self.clock().replace(second=0, microsecond=0)
+            window = (now, now + datetime.timedelta(minutes=1))
+            label = "right now"
+        else:
+            label = _format_window(window)
+        parameters = {"model": slots["model"], "start_time": _iso(window[0]), "end_time": _iso(window[1])}
+        result = chatbot.search_available_gpus(**parameters)
+
+        free = {}
+        for gpu in result["available_gpus"]:
+            free[gpu["model"]] = free.get(gpu["model"], 0) + 1
+        models = [slots["model"]] if slots["model"] else list(chatbot.gpu_specs["by_model"])
+
+        lines = [f"### 🖥️ **GPU availability — {label}**", "",
+                 "| Model | Free | Memory | Price / hour |", "|---|---|---|---|"]
+        for model in models:
+            spec = chatbot.gpu_specs["by_model"][model]
+            lines.append(f"| **{model}** | {free.get(model, 0)} of {len(spec['instance_ids'])} | "
+                         f"{spec['memory']} | ${spec['price_per_hour']:.2f} |")
+        lines.append("")
+        if slots["model"] and not free:
+            lines.append(f"> No **{slots['model']}** is free then. Try another time or ask me for alternatives.")
+        else:
+            lines.append("Would you like to book one?")
+        return {"tool": "search_available_gpus", "parameters": parameters, "result": result,
+                "markdown": "\n".join(lines)}
+
+    def _answer_booking_lookup(self, chatbot, slots: Dict) -> Dict:
+        parameters = {"booking_hash": slots["booking_hash"]} if slots["booking_hash"] else {"user_email": slots["email"]}
+        result = chatbot.query_booking_info(**parameters)
+        bookings = result["bookings"]
+        if slots["booking_hash"] and slots["email"]:
+            bookings = [b for b in bookings if b["user_email"] == slots["email"]]
+        subject = f"`{slots['booking_hash']}`" if slots["booking_hash"] else slots["email"]
+
+        if not bookings:
+            markdown = f"I couldn't find any bookings for {subject}. Please double-check the details."
+            return {"tool": "query_booking_info", "parameters": parameters, "result": result, "markdown": markdown}
+
+        bookings = sorted(bookings, key=lambda b: b["start_time"], reverse=True)
+        lines = [f"### 📋 **Bookings for {subject}**", "",
+                 "| Booking | GPU | Start | End | Status | Cost |", "|---|---|---|---|---|---|"]
+        for booking in bookings[:MAX_ROWS]:
+            cost = booking["total_cost"] + booking.get("overtime_cost", 0)
+            lines.append(f"| `{booking['booking_id']}` | **{booking['gpu_model']}** `{booking['gpu_id']}` | "
+                         f"{booking['start_time'][:16].replace('T', ' ')} | {booking['end_time'][:16].replace('T', ' ')} | "
+                         f"{booking['status']} | ${cost:.2f} |")
+        if len(bookings) > MAX_ROWS:
+            lines += ["", f"…and {len(bookings) - MAX_ROWS} more."]
+        return {"tool": "query_booking_info", "parameters": parameters, "result": result,
+                "markdown": "\n".join(lines)}
+
+    def _answer_billing(self, chatbot, slots: Dict) -> Dict:
+        parameters = {"user_email": slots["email"]}
+        if slots["window"]:
+            parameters.update(start_date=_iso(slots["window"][0]), end_date=_iso(slots["window"][1]))
+        result = chatbot.calculate_billing(**parameters)
+        period = f" ({_format_window(slots['window'])})" if slots["window"] else ""
+        if not result["booking_count"]:
+            markdown = f"There are no charges for {slots['email']}{period}."
+        else:
+            markdown = "\n".join([
+                f"### 💰 **Billing for {slots['email']}{period}**", "",
+                f"- **Bookings:** {result['booking_count']}",
+                f"- **Booking charges:** ${result['total_cost']:.2f}",
+                f"- **Overtime:** ${result['total_overtime_cost']:.2f}",
+                f"- **Total:** **${result['grand_total']:.2f}**"
+            ])
+        return {"tool": "calculate_billing", "parameters": parameters, "result": result, "markdown": markdown}
+
+    def _answer_price(self, chatbot, slots: Dict) -> Dict:
+        model = slots["model"]
+        spec = chatbot.gpu_specs["by_model"][model]
+        markdown = (f"**{model}** ({spec['name']}, `{spec['memory']}`) costs **${spec['price_per_30min']:.2f} per 30 minutes** "
+                    f"(${spec['price_per_hour']:.2f}/hour), billed in {spec['time_unit']}-minute units with a "
+                    f"{spec['min_booking_time']}-minute minimum.")
+        result = {"model": model, "price_per_30min": spec["price_per_30min"], "price_per_hour": spec["price_per_hour"]}
+        parameters = {"model": model}
+        if slots["window"]:
+            quote = chatbot.pricing.quote(model, slots["window"][0], slots["window"][1])
+            result["quote"] = quote
+            parameters.update(start_time=_iso(slots["window"][0]), end_time=_iso(slots["window"][1]))
+            markdown += f" For {_format_window(slots['window'])} that comes to **${quote['total_cost']:.2f}**."
+        return {"tool": "price_lookup", "parameters": parameters, "result": result, "markdown": markdown}
+
+    def route_confirmation(self, chatbot, text: str) -> Optional[Dict]:
+        """
+        Execute a pending booking/cancellation on a plain yes/no reply
+        Returns the same shape as route(), or None when the reply needs the LLM
+        """
+        started = time.perf_counter()
+        confirmed = confirmation_reply(text) if chatbot.pending_operation else None
+        if confirmed is None:
+            return None
+
+        operation = chatbot.pending_operation
+        data = dict(chatbot.pending_data)
+        parameters = {"confirmed": confirmed}
+        result = chatbot.confirm_operation(**parameters)
+        intent = "confirm" if confirmed else "decline"
+
+        if not result.get("success"):
+            markdown = f"> ⚠️ {result.get('message', 'The operation could not be completed.')}"
+        elif not confirmed:
+            markdown = ("No problem, the booking was not made. Let me know if you'd like a different GPU or time."
+                        if operation == "booking" else
+                        "No problem, your booking has been kept.")
+        elif operation == "booking":
+            booking = result["booking"]
+            markdown = "\n".join([
+                "### ✅ **Booking Confirmed**", "",
+                f"- **Booking ID:** {booking['booking_id']}",
+                f"- **Booking Hash:** `{booking['booking_hash']}`",
+                f"- **GPU:** **{booking['gpu_model']}** `{booking['gpu_id']}`",
+                f"- **Start Time:** {booking['start_time']}",
+                f"- **End Time:** {booking['end_time']}",
+                f"- **Total Cost:** **${booking['total_cost']:.2f}**", "",
+                "> Keep your booking hash; you'll need it with your email to look up or cancel this booking.",
+                "", result["message"]
+            ])
+        else:
+            markdown = "\n".join([
+                "### ✅ **Booking Cancelled**", "",
+                f"- **Booking Hash:** `{data['booking_hash']}`",
+                f"- **GPU:** **{data['booking']['gpu_model']}** `{data['booking']['gpu_id']}`", "",
+                result["message"]
+            ])
+
+        with self.lock:
+            self.stats["messages"] += 1
+            self.stats["hits"] += 1
+            self.stats["by_intent"][intent] = self.stats["by_intent"].get(intent, 0) + 1
+            self.stats["fast_path_seconds"] += time.perf_counter() - started
+        return {"intent": intent, "tool": "confirm_operation", "parameters": parameters, "result": result,
+                "markdown": markdown}
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> FastPathRouter:
+    """Process-wide fast-path router (shared so its metrics cover every session)"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = FastPathRouter()
+        return _router
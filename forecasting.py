@@ -0,0 +1,203 @@
+import json
+import time
+import datetime
+import argparse
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analytics import OCCUPYING_STATUSES, _cumulative, columns_for_window
+from booking_store import BookingStore, get_store, to_epoch
+
+
+HOURS_PER_WEEK = 168
+
+# Weeks of booking history each demand curve is fitted on
+HISTORY_DAYS = 56
+
+# Longest window a forecast may cover
+MAX_FORECAST_DAYS = 28
+
+# Predicted occupancy at or above this is reported as a capacity warning
+BUSY_THRESHOLD = 0.85
+
+
+def _iso(epoch: int) -> str:
+    return datetime.datetime.fromtimestamp(int(epoch), datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _hour_floor(epoch: float) -> int:
+    return int(epoch) // 3600 * 3600
+
+
+def hourly_occupancy(store: BookingStore, gpu_data: Dict, start: int, end: int) -> np.ndarray:
+    """
+    Fraction of each model's instances booked in every hour of [start, end)
+    Returns an (hours x models) array with models in gpu_data order
+    """
+    edges = np.arange(start, end + 1, 3600, dtype=np.int64)
+    columns = columns_for_window(store, _iso(start), _iso(end))
+    occupying = columns.mask_statuses(OCCUPYING_STATUSES)
+
+    occupancy = np.zeros((len(edges) - 1, len(gpu_data["gpu_models"])))
+    for m, (model, info) in enumerate(gpu_data["gpu_models"].items()):
+        if model not in columns.models:
+            continue
+        rows = occupying & (columns.model_code == columns.models.index(model))
+        booked = np.diff(_cumulative(columns.start[rows], columns.end[rows], np.ones(int(rows.sum())), edges))
+        occupancy[:, m] = booked / 3600.0 / max(len(info["instances"]), 1)
+    return occupancy
+
+
+def _design(hours: np.ndarray, origin: int) -> np.ndarray:
+    """Regression features per hour: one-hot hour of week plus a linear trend in weeks"""
+    # 1970-01-01 was a Thursday; shift so hour 0 of the week is Monday 00:00 UTC
+    hour_of_week = ((hours + 3 * 86400) // 3600) % HOURS_PER_WEEK
+    features = np.zeros((len(hours), HOURS_PER_WEEK + 1))
+    features[np.arange(len(hours)), hour_of_week] = 1.0
+    features[:, HOURS_PER_WEEK] = (hours - origin) / (HOURS_PER_WEEK * 3600.0)
+    return features
+
+
+class DemandModel:
+    """
+    Per-model demand curves fitted by least squares on hourly occupancy history
+    occupancy(hour) = seasonal[hour_of_week] + trend * weeks_since_fit
+    """
+
+    def __init__(self, store: BookingStore, gpu_data: Dict, now: float = None,
+                 history_days: int = HISTORY_DAYS):
+        self.store = store
+        self.gpu_data = gpu_data
+        self.models = list(gpu_data["gpu_models"])
+        self.capacity = np.array([len(info["instances"]) for info in gpu_data["gpu_models"].values()])
+        self.fitted_at = _hour_floor(time.time() if now is None else now)
+        self.history_start = self.fitted_at - history_days * 86400
+
+        hours = np.arange(self.history_start, self.fitted_at, 3600, dtype=np.int64)
+        history = hourly_occupancy(store, gpu_data, self.history_start, self.fitted_at)
+        # One least-squares solve fits every model at once (one column of history each)
+        self.coefficients, _, _, _ = np.linalg.lstsq(_design(hours, self.fitted_at), history, rcond=None)
+        self.mean_occupancy = history.mean(axis=0) if len(history) else np.zeros(len(self.models))
+
+    def predict(self, start: int, end: int) -> Dict:
+        """Hourly predicted and already-booked occupancy fractions over [start, end)"""
+        hours = np.arange(_hour_floor(start), end, 3600, dtype=np.int64)
+        predicted = np.clip(_design(hours, self.fitted_at) @ self.coefficients, 0.0, 1.0)
+        # Bookings already on the calendar are a floor under the statistical forecast
+        booked = hourly_occupancy(self.store, self.gpu_data, int(hours[0]), int(hours[-1]) + 3600)
+        return {"hours": hours, "predicted": np.maximum(predicted, np.clip(booked, 0.0, 1.0)), "booked": booked}
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_demand_model(store: BookingStore = None, gpu_data: Dict = None, now: float = None) -> DemandModel:
+    """Demand model for the current hour, refitted when bookings or the inventory change"""
+    store = store or get_store()
+    if gpu_data is None:
+        with open('gpu_inventory.json', 'r') as f:
+            gpu_data = json.load(f)
+    inventory = tuple((model, len(info["instances"])) for model, info in gpu_data["gpu_models"].items())
+    key = (store.version_tag(), inventory, _hour_floor(time.time() if now is None else now))
+
+    with _models_lock:
+        model = _models.get(key)
+    if model is None:
+        model = DemandModel(store, gpu_data, now)
+        with _models_lock:
+            _models.clear()
+            _models[key] = model
+    return model
+
+
+def forecast_demand(store: BookingStore = None, gpu_data: Dict = None, model: str = None,
+                    start_time=None, end_time=None, bucket: str = "day", now: float = None) -> Dict:
+    """
+    Predicted occupancy per GPU model over a window (default: the next 7 days)
+    Reports hourly or daily predicted occupancy %, expected free instances, the busiest
+    and quietest hours and whether the model is likely to run short of capacity
+    """
+    demand = get_demand_model(store, gpu_data, now)
+    now = time.time() if now is None else now
+    start = to_epoch(start_time) if start_time else now
+    end = to_epoch(end_time) if end_time else start + 7 * 86400
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    if end - start > MAX_FORECAST_DAYS * 86400:
+        raise ValueError(f"Forecast window is limited to {MAX_FORECAST_DAYS} days")
+    if bucket not in ("hour", "day"):
+        raise ValueError("bucket must be 'hour' or 'day'")
+
+    prediction = demand.predict(start, end)
+    hours = prediction["hours"]
+    if bucket == "day":
+        days = hours // 86400
+        boundaries = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        bucket_starts = days[boundaries] * 86400
+        sizes = np.diff(np.r_[boundaries, len(hours)])
+    else:
+        boundaries = np.arange(len(hours))
+        bucket_starts = hours
+        sizes = np.ones(len(hours))
+
+    result = {"start_time": _iso(start), "end_time": _iso(end), "bucket": bucket,
+              "buckets": [_iso(t) for t in bucket_starts], "models": {}}
+    for m, name in enumerate(demand.models):
+        if model and model.lower() not in name.lower():
+            continue
+        series = prediction["predicted"][:, m]
+        per_bucket = np.add.reduceat(series, boundaries) / sizes
+        capacity = int(demand.capacity[m])
+        busiest, quietest = int(np.argmax(series)), int(np.argmin(series))
+        result["models"][name] = {
+            "instances": capacity,
+            "predicted_occupancy_pct": np.round(per_bucket * 100, 1).tolist(),
+            "mean_occupancy_pct": round(float(series.mean() * 100), 1),
+            "peak_occupancy_pct": round(float(series[busiest] * 100), 1),
+            "peak_hour": _iso(hours[busiest]),
+            "quietest_hour": _iso(hours[quietest]),
+            "already_booked_pct": round(float(prediction["booked"][:, m].mean() * 100), 1),
+            "expected_free_instances": round(float(capacity * (1 - series.mean())), 1),
+            "capacity_warning": bool(series.max() >= BUSY_THRESHOLD)
+        }
+    return result
+
+
+def quietest_window(demand: DemandModel, model: str, duration_hours: int, start: float,
+                    horizon_days: int = 7) -> Optional[Dict]:
+    """Start hour of the lowest predicted-occupancy block of duration_hours within the horizon"""
+    if model not in demand.models:
+        return None
+    duration_hours = max(1, int(duration_hours))
+    prediction = demand.predict(start, start + horizon_days * 86400)
+    series = prediction["predicted"][:, demand.models.index(model)]
+    if len(series) < duration_hours:
+        return None
+    # Rolling mean over every candidate start hour via a cumulative sum
+    sums = np.cumsum(np.r_[0.0, series])
+    rolling = (sums[duration_hours:] - sums[:-duration_hours]) / duration_hours
+    best = int(np.argmin(rolling))
+    return {
+        "start_time": _iso(prediction["hours"][best]),
+        "end_time": _iso(prediction["hours"][best] + duration_hours * 3600),
+        "predicted_occupancy_pct": round(float(rolling[best] * 100), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast GPU demand per model")
+    parser.add_argument("--model", help="Only forecast models matching this name")
+    parser.add_argument("--start", help="Window start (ISO, default now)")
+    parser.add_argument("--end", help="Window end (ISO, default start + 7 days)")
+    parser.add_argument("--bucket", default="day", choices=("hour", "day"))
+    args = parser.parse_args()
+
+    print(json.dumps(forecast_demand(model=args.model, start_time=args.start, end_time=args.end,
+                                     bucket=args.bucket), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Workload requirements catalog. Each entry is matched by keywords in the use case and
+# gives the minimum VRAM per GPU, whether a datacenter GPU is preferred, and how much the
+# score weighs compute (CUDA cores), price and VRAM headroom. LLM entries estimate VRAM
+# from the parameter count in the use case instead ("LLaMA 13B" -> 13e9 parameters).
+WORKLOAD_CATALOG = [
+    {
+        "workload": "llm_full_training",
+        "keywords": ("pretrain", "pre-train", "full fine-tun", "full finetun", "from scratch"),
+        "llm": True,
+        # Weights, gradients and Adam state in mixed precision
+        "bytes_per_param": 16.0,
+        "default_params_b": 7,
+        "min_vram_gb": 40,
+        "datacenter": True,
+        "weights": {"compute": 0.6, "price": 0.2, "headroom": 0.2}
+    },
+    {
+        "workload": "llm_training",
+        "keywords": ("train", "fine-tun", "finetun", "fine tun", "lora"),
+        "llm": True,
+        # fp16 weights plus adapter/activation overhead
+        "bytes_per_param": 2.4,
+        "default_params_b": 7,
+        "min_vram_gb": 16,
+        "datacenter": False,
+        "weights": {"compute": 0.5, "price": 0.3, "headroom": 0.2}
+    },
+    {
+        "workload": "llm_inference",
+        "keywords": (),
+        "llm": True,
+        # fp16 weights plus KV cache
+        "bytes_per_param": 2.4,
+        "default_params_b": 7,
+        "min_vram_gb": 12,
+        "datacenter": False,
+        "weights": {"compute": 0.3, "price": 0.5, "headroom": 0.2}
+    },
+    {
+        "workload": "image_generation",
+        "keywords": ("stable diffusion", "diffusion", "sdxl", "image generation", "midjourney"),
+        "min_vram_gb": 12,
+        "datacenter": False,
+        "weights": {"compute": 0.4, "price": 0.5, "headroom": 0.1}
+    },
+    {
+        "workload": "gaming",
+        "keywords": ("gaming", "game", "1440p", "4k gaming"),
+        "min_vram_gb": 8,
+        "datacenter": False,
+        "consumer_only": True,
+        "weights": {"compute": 0.4, "price": 0.6, "headroom": 0.0}
+    },
+    {
+        "workload": "rendering",
+        "keywords": ("render", "3d", "blender", "video", "vfx", "content creation"),
+        "min_vram_gb": 16,
+        "datacenter": False,
+        "weights": {"compute": 0.6, "price": 0.3, "headroom": 0.1}
+    },
+    {
+        "workload": "scientific_computing",
+        "keywords": ("scientific", "simulation", "hpc", "molecular", "cfd", "fp64"),
+        "min_vram_gb": 24,
+        "datacenter": True,
+        "weights": {"compute": 0.5, "price": 0.3, "headroom": 0.2}
+    },
+    {
+        "workload": "deep_learning",
+        "keywords": ("training", "deep learning", "neural", "ai", "ml", "machine learning", "cnn", "transformer"),
+        "min_vram_gb": 24,
+        "datacenter": True,
+        "weights": {"compute": 0.5, "price": 0.3, "headroom": 0.2}
+    },
+    {
+        "workload": "general",
+        "keywords": (),
+        "min_vram_gb": 8,
+        "datacenter": False,
+        "weights": {"compute": 0.3, "price": 0.7, "headroom": 0.0}
+    },
+]
+
+LLM_KEYWORDS = ("llama", "llm", "language model", "mistral", "qwen", "gpt", "deepseek", "gemma", "falcon")
+
+# "8B", "13b", "1.5B parameters", "70 billion"
+PARAMS_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:b\b|bn\b|billion)', re.IGNORECASE)
+
+
+def parse_vram_gb(memory: str) -> float:
+    """VRAM in GB from an inventory memory string like '24GB GDDR6X'"""
+    match = re.match(r'\s*(\d+(?:\.\d+)?)\s*GB', memory, re.IGNORECASE)
+    return float(match.group(1)) if match else 0.0
+
+
+def build_spec_table(gpu_data: Dict) -> Dict:
+    """
+    Parse the inventory once into a spec table
+    Returns {"models": [...], "by_model": {model: spec}} plus NumPy columns (vram_gb,
+    price_per_hour, cuda_cores, datacenter) aligned with "models" for vectorised scoring
+    """
+    by_model = {}
+    for model, info in gpu_data["gpu_models"].items():
+        by_model[model] = {
+            "model": model,
+            "name": info["name"],
+            "memory": info["memory"],
+            "description": info["description"],
+            "vram_gb": parse_vram_gb(info["memory"]),
+            "price_per_30min": info["price_per_30min"],
+            "price_per_hour": info["price_per_30min"] * 2,
+            "cuda_cores": info["cuda_cores"],
+            "datacenter": "geforce" not in info["name"].lower(),
+            "instance_ids": [instance["id"] for instance in info["instances"]],
+            "min_booking_time": info.get("min_booking_time", 30),
+            "time_unit": info.get("time_unit", 30)
+        }
+
+    models = list(by_model)
+    return {
+        "models": models,
+        "by_model": by_model,
+        "vram_gb": np.array([by_model[m]["vram_gb"] for m in models]),
+        "price_per_hour": np.array([by_model[m]["price_per_hour"] for m in models], dtype=np.float64),
+        "cuda_cores": np.array([by_model[m]["cuda_cores"] for m in models], dtype=np.float64),
+        "datacenter": np.array([by_model[m]["datacenter"] for m in models], dtype=bool)
+    }
+
+
+def _mentions(text: str, keyword: str) -> bool:
+    """Keyword match at a word start, so 'ai' does not match 'email' but 'fine-tun' matches 'fine-tuning'"""
+    return re.search(r'(?<![a-z0-9])' + re.escape(keyword), text) is not None
+
+
+def estimate_requirements(use_case: str, memory_requirement: float = None) -> Dict:
+    """Match a use case against the workload catalog and estimate the VRAM it needs"""
+    text = use_case.lower()
+    is_llm = any(_mentions(text, keyword) for keyword in LLM_KEYWORDS)
+    params = PARAMS_PATTERN.search(text)
+    is_llm = is_llm or params is not None
+
+    workload = None
+    for entry in WORKLOAD_CATALOG:
+        if entry.get("llm", False) != is_llm:
+            continue
+        if not entry["keywords"] or any(_mentions(text, keyword) for keyword in entry["keywords"]):
+            workload = entry
+            break
+
+    required_vram = workload["min_vram_gb"]
+    params_b = None
+    if workload.get("llm"):
+        params_b = float(params.group(1)) if params else workload["default_params_b"]
+        required_vram = max(required_vram, round(params_b * workload["bytes_per_param"], 1))
+    if memory_requirement:
+        # An explicit requirement wins for LLMs, since quantised models need far less than the estimate
+        required_vram = memory_requirement if workload.get("llm") else max(required_vram, memory_requirement)
+
+    return {
+        "workload": workload["workload"],
+        "model_params_b": params_b,
+        "required_vram_gb": required_vram,
+        "prefer_datacenter": workload["datacenter"],
+        "consumer_only": workload.get("consumer_only", False),
+        "weights": workload["weights"]
+    }
+
+
+def score_models(specs: Dict, requirements: Dict, budget_per_hour: float = None,
+                 max_instances: Dict = None) -> List[Dict]:
+    """
+    Score every model in the spec table for a workload, best first
+    A requirement larger than one GPU's VRAM is split across instances_needed GPUs;
+    models over budget, without enough instances, or unsuitable for the workload are dropped
+    """
+    vram = specs["vram_gb"]
+    price = specs["price_per_hour"]
+    cores = specs["cuda_cores"]
+    required = requirements["required_vram_gb"]
+
+    instances_needed = np.maximum(1, np.ceil(required / np.maximum(vram, 1e-9))).astype(int)
+    total_price = price * instances_needed
+    total_instances = np.array([len(specs["by_model"][m]["instance_ids"]) for m in specs["models"]])
+    if max_instances:
+        total_instances = np.array([max_instances.get(m, n) for m, n in zip(specs["models"], total_instances)])
+
+    eligible = instances_needed <= total_instances
+    if budget_per_hour:
+        eligible &= total_price <= budget_per_hour
+    if requirements["consumer_only"]:
+        eligible &= ~specs["datacenter"]
+
+    # Each term is in [0, 1]: relative compute, relative cheapness and how snugly the
+    # requirement fills the VRAM that would be booked (less idle VRAM is better)
+    weights = requirements["weights"]
+    compute = cores * instances_needed / max(float((cores * instances_needed).max()), 1.0)
+    cheapness = float(total_price.min()) / total_price
+    headroom = np.minimum(required / (vram * instances_needed), 1.0)
+    score = weights["compute"] * compute + weights["price"] * cheapness + weights["headroom"] * headroom
+    if requirements["prefer_datacenter"]:
+        score += 0.1 * specs["datacenter"]
+    # Splitting a job across GPUs is a last resort
+    score -= 0.35 * (instances_needed - 1)
+
+    ranked = []
+    for i in np.argsort(-score, kind="stable"):
+        if not eligible[i]:
+            continue
+        ranked.append({
+            "model": specs["models"][i],
+            "score": round(float(score[i]), 3),
+            "instances_needed": int(instances_needed[i]),
+            "price_per_hour": float(total_price[i])
+        })
+    return ranked
+
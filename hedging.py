@@ -0,0 +1,162 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict
+
+import numpy as np
+
+
+# Hedging can be switched off entirely; the rate cap below bounds its extra cost otherwise
+HEDGING_ENABLED = True
+
+# A duplicate request is sent once a completion has taken longer than this percentile
+# of recent completion latencies (never sooner than MIN_HEDGE_DELAY)
+HEDGE_PERCENTILE = 90
+MIN_HEDGE_DELAY = 1.0
+
+# Latencies kept, and needed before the threshold is trusted
+LATENCY_SAMPLES = 200
+MIN_SAMPLES = 20
+
+# Share of recent calls that may be hedged
+MAX_HEDGE_RATE = 0.1
+
+
+class Hedger:
+    """
+    Runs LLM completions with an optional hedge
+    If a completion has not returned by the adaptive threshold, an identical request is
+    sent (through `hedge_create` when given, e.g. to another endpoint) and whichever
+    succeeds first is used. Each request gets its own thread, so the threshold measures
+    the call and never time spent queueing; the loser cannot be interrupted, so its
+    result is discarded.
+    """
+
+    def __init__(self, enabled: bool = HEDGING_ENABLED, percentile: float = HEDGE_PERCENTILE,
+                 min_delay: float = MIN_HEDGE_DELAY, min_samples: int = MIN_SAMPLES,
+                 max_hedge_rate: float = MAX_HEDGE_RATE, samples: int = LATENCY_SAMPLES):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_hedge_rate = max_hedge_rate
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=samples)
+        # Whether each recent call was hedged, for the rate cap
+        self.recent = deque(maxlen=samples)
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "primary_wins": 0, "capped": 0,
+                      "abandoned": 0}
+
+    def threshold(self):
+        """Seconds after which a completion is hedged, or None until enough latencies are known"""
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            latencies = np.array(self.latencies, dtype=np.float64)
+        return max(float(np.percentile(latencies, self.percentile)), self.min_delay)
+
+    def _timed(self, create: Callable, request: Dict):
+        started = time.monotonic()
+        response = create(**request)
+        with self.lock:
+            self.latencies.append(time.monotonic() - started)
+        return response
+
+    def _start(self, create: Callable, request: Dict) -> Future:
+        """Run one request on a thread of its own, started now"""
+        future = Future()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(self._timed(create, request))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+        return future
+
+    def _allow_hedge(self) -> bool:
+        with self.lock:
+            if sum(self.recent) + 1 > self.max_hedge_rate * (len(self.recent) + 1):
+                self.stats["capped"] += 1
+                return False
+            return True
+
+    def _finish(self, hedged: bool, key: str = None):
+        with self.lock:
+            self.stats["calls"] += 1
+            self.recent.append(hedged)
+            if hedged:
+                self.stats["hedged"] += 1
+            if key:
+                self.stats[key] += 1
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def create(self, create: Callable, hedge_create: Callable = None, **request):
+        """create(**request), hedged with hedge_create(**request) (default: create) if slower than the threshold"""
+        delay = self.threshold() if self.enabled else None
+        timeout = request.get("timeout")
+        if delay is None or (timeout is not None and timeout - delay < self.min_delay):
+            self._finish(False)
+            return self._timed(create, request)
+
+        started = time.monotonic()
+        primary = self._start(create, request)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._allow_hedge():
+            self._finish(False)
+            return primary.result()
+
+        hedge_request = dict(request)
+        if timeout is not None:
+            hedge_request["timeout"] = max(timeout - (time.monotonic() - started), self.min_delay)
+        print(f"LLM call slower than {delay:.1f}s, sending a hedged duplicate")
+        hedge = self._start(hedge_create or create, hedge_request)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    # The other request may still succeed
+                    error = error or e
+                    continue
+                for _ in pending:
+                    self._count("abandoned")
+                self._finish(True, "hedge_wins" if future is hedge else "primary_wins")
+                return response
+        self._finish(True)
+        raise error
+
+    def get_stats(self) -> Dict:
+        """Hedge rate, which request won, and the current threshold"""
+        threshold = self.threshold()
+        with self.lock:
+            stats = dict(self.stats, enabled=self.enabled, max_hedge_rate=self.max_hedge_rate)
+            latencies = np.array(self.latencies, dtype=np.float64)
+        stats["threshold_seconds"] = round(threshold, 3) if threshold is not None else None
+        stats["hedge_rate"] = round(stats["hedged"] / stats["calls"], 3) if stats["calls"] else 0.0
+        if latencies.size:
+            stats["latency_p50"] = round(float(np.percentile(latencies, 50)), 3)
+            stats["latency_p90"] = round(float(np.percentile(latencies, 90)), 3)
+        return stats
+
+
+_hedger = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    """Process-wide hedger (its latency history and rate cap cover every session)"""
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger()
+        return _hedger
@@ -7,10 +7,26 @@ import os
 import markdown
 import re
 import time
+import itertools
 import traceback
+import uuid
 from typing import List, Dict, Optional, Any
-from openai import OpenAI
-import nailfec
+from booking_store import get_store, to_epoch
+from forecasting import forecast_demand, get_demand_model, quietest_window, BUSY_THRESHOLD
+from gpu_specs import build_spec_table, estimate_requirements, score_models
+from pricing import PricingEngine
+from fast_path import get_router
+from tool_registry import conversation_state, get_tool_registry
+from agent_loop import AgentLoop
+from speculation import get_speculator
+from tool_cache import CACHEABLE_TOOLS, get_tool_cache
+from faq_cache import faq_cacheable, get_faq_cache, inventory_version
+from llm_backend import CompletionBackend, get_backend
+from deadline import Deadline, get_deadline_stats
+
+
+# Timeout for the booking card request; without an answer the card is laid out manually
+CARD_TIMEOUT = 10.0
 
 
 class HPC_ChatBot:
@@ -19,20 +35,21 @@ class HPC_ChatBot:
     Provides AI-powered assistance for GPU booking, querying, and management
     """
     
-    def __init__(self, session_id=None):
-        """Initialize the chatbot with API client and load data"""
-        self.client = OpenAI(
-            api_key=nailfec.api_key,
-            base_url="https://api.deepseek.com",
-            timeout=30.0  # Adding 30 seconds timeout
-        )
-        
-        # Load GPU inventory and bookings data
+    def __init__(self, session_id=None, backend: CompletionBackend = None):
+        """Initialize the chatbot and load data; the LLM backend is only resolved when first used"""
+        self._backend = backend
+        # Deadline of the message being answered, for LLM calls made from inside tools
+        self._deadline = None
+        
+        # Load GPU inventory; bookings live in the process-wide booking store
         with open('gpu_inventory.json', 'r') as f:
             self.gpu_data = json.load(f)
+        # Parsed VRAM, hourly price and instance IDs per model
+        self.gpu_specs = build_spec_table(self.gpu_data)
+        self.pricing = PricingEngine(self.gpu_data)
+        self.inventory_version = inventory_version(self.gpu_data)
         
-        with open('bookings.json', 'r') as f:
-            self.bookings = json.load(f)
+        self.store = get_store()
         
         # Session-specific conversation history
         self.session_id = session_id or hashlib.md5(str(datetime.datetime.now()).encode()).hexdigest()
@@ -80,7 +97,7 @@ class HPC_ChatBot:
                 "type": "function",
                 "function": {
                     "name": "get_gpu_recommendations",
-                    "description": "Get GPU recommendations based on user's use case and requirements",
+                    "description": "Get ranked GPU recommendations for the user's use case, budget and memory needs. Estimates the VRAM the workload needs (e.g. from the model size for LLMs) and, when start_time and end_time are given, reports free instances in that window so the results are directly bookable.",
                     "parameters": {
                         "type": "object",
                         "properties": {
@@ -95,12 +112,83 @@ class HPC_ChatBot:
                             "memory_requirement": {
                                 "type": "number",
                                 "description": "Required GPU memory in GB"
+                            },
+                            "start_time": {
+                                "type": "string",
+                                "description": "Planned start time in ISO format, if known"
+                            },
+                            "end_time": {
+                                "type": "string",
+                                "description": "Planned end time in ISO format, if known"
                             }
                         },
                         "required": ["use_case"]
                     }
                 }
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "recommend_and_check_availability",
+                    "description": "PREFERRED when the user describes what they want to run AND when: in one call, ranks suitable GPU models, counts free instances in the window and quotes the price for the window. Use instead of calling get_gpu_recommendations and then search_available_gpus.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "use_case": {
+                                "type": "string",
+                                "description": "Description of the intended use case (e.g., 'LLaMA 8B training', 'gaming', 'video rendering')"
+                            },
+                            "start_time": {
+                                "type": "string",
+                                "description": "Start time in ISO format (e.g., '2025-07-23T10:00:00Z')"
+                            },
+                            "end_time": {
+                                "type": "string",
+                                "description": "End time in ISO format (e.g., '2025-07-23T18:00:00Z')"
+                            },
+                            "budget_per_hour": {
+                                "type": "number",
+                                "description": "Maximum budget per hour in USD"
+                            },
+                            "memory_requirement": {
+                                "type": "number",
+                                "description": "Required GPU memory in GB"
+                            }
+                        },
+                        "required": ["use_case", "start_time", "end_time"]
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "forecast_gpu_demand",
+                    "description": "Forecast how busy each GPU model will be (predicted occupancy %, expected free instances, busiest and quietest hours). Use when users ask whether GPUs will be available, when is a good time to book, or how busy a model will be.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "model": {
+                                "type": "string",
+                                "description": "GPU model to forecast (e.g., 'H100'). If not specified, forecast all models."
+                            },
+                            "start_time": {
+                                "type": "string",
+                                "description": "Forecast window start in ISO format (default: now)"
+                            },
+                            "end_time": {
+                                "type": "string",
+                                "description": "Forecast window end in ISO format (default: 7 days after start)"
+                            },
+                            "bucket": {
+                                "type": "string",
+                                "enum": ["hour", "day"],
+                                "description": "Report occupancy per hour or per day (default: day)"
+                            }
+                        },
+                        "required": []
+                    }
+                }
+            },
             {
                 "type": "function",
                 "function": {
@@ -302,49 +390,72 @@ class HPC_ChatBot:
             }
         ]
 
+    @property
+    def bookings(self) -> List[Dict]:
+        """All bookings from the shared booking store"""
+        return self.store.bookings
+
+    @property
+    def backend(self) -> CompletionBackend:
+        """The injected completion backend, else the process-wide one"""
+        return self._backend or get_backend()
+
+    def __getstate__(self):
+        """Pickle session state only; the shared booking store is re-attached on load"""
+        state = self.__dict__.copy()
+        state.pop("store", None)
+        # Restored sessions use the process-wide backend
+        state.pop("_backend", None)
+        state.pop("_deadline", None)
+        return state
+
+    def __setstate__(self, state):
+        """Restore session state and re-attach the shared booking store"""
+        self.__dict__.update(state)
+        self.store = get_store()
+        self._backend = None
+        self._deadline = None
+        # Sessions pickled before the spec table and pricing engine existed
+        if "gpu_specs" not in state:
+            self.gpu_specs = build_spec_table(self.gpu_data)
+        if "pricing" not in state:
+            self.pricing = PricingEngine(self.gpu_data)
+        if "inventory_version" not in state:
+            self.inventory_version = inventory_version(self.gpu_data)
+
     def search_available_gpus(self, model: str = None, start_time: str = None, 
                             end_time: str = None, min_memory: float = None) -> Dict:
         """Search for available GPU instances"""
         available_gpus = []
         
-        for gpu_model, gpu_info in self.gpu_data["gpu_models"].items():
+        for gpu_model, spec in self.gpu_specs["by_model"].items():
             if model and model.lower() not in gpu_model.lower():
                 continue
                 
-            if min_memory and float(gpu_info["memory"].split("GB")[0]) < min_memory:
+            if min_memory and spec["vram_gb"] < min_memory:
                 continue
             
-            # Check availability for each instance
-            for instance in gpu_info["instances"]:
-                is_available = True
-                
-                if start_time and end_time:
-                    # Check for conflicts with existing bookings
-                    for booking in self.bookings:
-                        if (booking["gpu_id"] == instance["id"] and 
-                            booking["status"] in ["active", "scheduled"]):
-                            booking_start = datetime.datetime.fromisoformat(booking["start_time"].replace('Z', '+00:00'))
-                            booking_end = datetime.datetime.fromisoformat(booking["end_time"].replace('Z', '+00:00'))
-                            request_start = datetime.datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                            request_end = datetime.datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-                            
-                            if (request_start < booking_end and request_end > booking_start):
-                                is_available = False
-                                break
-                
-                if is_available:
-                    available_gpus.append({
-                        "model": gpu_model,
-                        "id": instance["id"],
-                        "name": gpu_info["name"],
-                        "memory": gpu_info["memory"],
-                        "description": gpu_info["description"],
-                        "price_per_30min": gpu_info["price_per_30min"],
-                        "cuda_cores": gpu_info["cuda_cores"]
-                    })
+            for instance_id in self.free_instances(gpu_model, start_time, end_time):
+                available_gpus.append({
+                    "model": gpu_model,
+                    "id": instance_id,
+                    "name": spec["name"],
+                    "memory": spec["memory"],
+                    "description": spec["description"],
+                    "price_per_30min": spec["price_per_30min"],
+                    "cuda_cores": spec["cuda_cores"]
+                })
         
         return {"available_gpus": available_gpus}
 
+    def free_instances(self, gpu_model: str, start_time: str = None, end_time: str = None) -> List[str]:
+        """Instance IDs of a model with no live booking overlapping the window (all of them without one)"""
+        instance_ids = self.gpu_specs["by_model"][gpu_model]["instance_ids"]
+        if not (start_time and end_time):
+            return list(instance_ids)
+        return [instance_id for instance_id in instance_ids
+                if not self.store.has_conflict(instance_id, start_time, end_time)]
+
     def get_available_gpu_id(self, gpu_model: str, start_time: str, end_time: str) -> str:
         """Get the first available GPU ID for a given model and time period"""
         if gpu_model not in self.gpu_data["gpu_models"]:
@@ -353,76 +464,154 @@ class HPC_ChatBot:
         gpu_info = self.gpu_data["gpu_models"][gpu_model]
         
         for instance in gpu_info["instances"]:
-            is_available = True
-            
-            # Check for conflicts with existing bookings
-            for booking in self.bookings:
-                if (booking["gpu_id"] == instance["id"] and 
-                    booking["status"] in ["active", "scheduled"]):
-                    booking_start = datetime.datetime.fromisoformat(booking["start_time"].replace('Z', '+00:00'))
-                    booking_end = datetime.datetime.fromisoformat(booking["end_time"].replace('Z', '+00:00'))
-                    request_start = datetime.datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                    request_end = datetime.datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-                    
-                    if (request_start < booking_end and request_end > booking_start):
-                        is_available = False
-                        break
-            
-            if is_available:
+            # Check for conflicts with live bookings on this instance
+            if not self.store.has_conflict(instance["id"], start_time, end_time):
                 return instance["id"]
         
         return None
 
     def get_gpu_recommendations(self, use_case: str, budget_per_hour: float = None, 
-                              memory_requirement: float = None) -> Dict:
-        """Get GPU recommendations based on use case"""
+                              memory_requirement: float = None, start_time: str = None,
+                              end_time: str = None, limit: int = 4) -> Dict:
+        """
+        Rank GPU models for a use case from the spec table and workload catalog, joined
+        with free instances in the requested window and steered towards spare capacity
+        """
+        requirements = estimate_requirements(use_case, memory_requirement)
         recommendations = []
-        use_case_lower = use_case.lower()
-        
-        # Define use case patterns and recommendations
-        if "llama" in use_case_lower or "llm" in use_case_lower or "language model" in use_case_lower:
-            if "8b" in use_case_lower or "7b" in use_case_lower:
-                # 8B models need ~16GB VRAM
-                recommended_models = ["RTX-4090", "RTX-3090", "A100", "H100"]
-            elif "13b" in use_case_lower:
-                # 13B models need ~26GB VRAM
-                recommended_models = ["A100", "H100"]
-            elif "70b" in use_case_lower or "65b" in use_case_lower:
-                # Large models need 80GB VRAM
-                recommended_models = ["H100"]
-            else:
-                recommended_models = ["RTX-4090", "A100", "H100"]
-        elif "gaming" in use_case_lower:
-            recommended_models = ["RTX-4090", "RTX-4080", "RTX-4070", "RTX-3080"]
-        elif "rendering" in use_case_lower or "3d" in use_case_lower:
-            recommended_models = ["RTX-4090", "RTX-4080", "RTX-3090"]
-        elif "training" in use_case_lower or "ai" in use_case_lower:
-            recommended_models = ["H100", "A100", "RTX-4090"]
-        else:
-            recommended_models = ["RTX-4070", "RTX-4080", "RTX-4090"]
+        ranked_models = score_models(self.gpu_specs, requirements, budget_per_hour)
+        
+        # Price every candidate for the window in one call
+        quotes = None
+        if start_time and end_time and ranked_models:
+            quotes = self.pricing.quote_many([r["model"] for r in ranked_models],
+                                             [start_time] * len(ranked_models), [end_time] * len(ranked_models),
+                                             [r["instances_needed"] for r in ranked_models])["total_cost"]
+        
+        for i, ranked in enumerate(ranked_models):
+            spec = self.gpu_specs["by_model"][ranked["model"]]
+            available_instances = len(self.free_instances(ranked["model"], start_time, end_time))
+            recommendations.append({
+                "model": ranked["model"],
+                "name": spec["name"],
+                "memory": spec["memory"],
+                "description": spec["description"],
+                "price_per_hour": spec["price_per_hour"],
+                "cuda_cores": spec["cuda_cores"],
+                "available_instances": available_instances,
+                "instances_needed": ranked["instances_needed"],
+                "total_price_per_hour": ranked["price_per_hour"],
+                "bookable": available_instances >= ranked["instances_needed"],
+                "score": ranked["score"]
+            })
+            if quotes is not None:
+                recommendations[-1]["quote"] = float(quotes[i])
+        
+        self._add_demand_forecast(recommendations, start_time, end_time)
+        return {
+            "workload": requirements["workload"],
+            "required_vram_gb": requirements["required_vram_gb"],
+            "recommendations": recommendations[:limit]
+        }
+
+    def _add_demand_forecast(self, recommendations: List[Dict], start_time: str = None, end_time: str = None):
+        """
+        Annotate recommendations with predicted occupancy and move models likely to be
+        full (or without enough free instances in the requested window) to the end of the list
+        """
+        if not recommendations:
+            return
+        try:
+            now = time.time()
+            start = to_epoch(start_time) if start_time else now
+            end = to_epoch(end_time) if end_time else start + 86400
+            forecast = forecast_demand(self.store, self.gpu_data, start_time=start, end_time=end)
+            demand = get_demand_model(self.store, self.gpu_data)
+        except Exception as e:
+            print(f"Demand forecast unavailable: {str(e)}")
+            return
+
+        duration_hours = max(1, round((end - start) / 3600))
+        suggested = []
+        for recommendation in recommendations:
+            predicted = forecast["models"].get(recommendation["model"])
+            if predicted is None:
+                continue
+            recommendation["predicted_occupancy_pct"] = predicted["peak_occupancy_pct"]
+            recommendation["capacity_warning"] = predicted["capacity_warning"]
+            if predicted["capacity_warning"] or not recommendation["bookable"]:
+                recommendation["suggested_window"] = quietest_window(
+                    demand, recommendation["model"], min(duration_hours, 72), now)
+                if recommendation["suggested_window"]:
+                    suggested.append(recommendation)
+        
+        if suggested:
+            quotes = self.pricing.quote_many(
+                [r["model"] for r in suggested],
+                [r["suggested_window"]["start_time"] for r in suggested],
+                [r["suggested_window"]["end_time"] for r in suggested],
+                [r.get("instances_needed", 1) for r in suggested])["total_cost"]
+            for recommendation, cost in zip(suggested, quotes.tolist()):
+                recommendation["suggested_window"]["quote"] = cost
+
+        # Stable sort keeps the use-case preference order within each group
+        recommendations.sort(key=lambda r: (not r["bookable"],
+                                            r.get("predicted_occupancy_pct", 0) >= BUSY_THRESHOLD * 100))
+
+    def recommend_and_check_availability(self, use_case: str, start_time: str, end_time: str,
+                                         budget_per_hour: float = None, memory_requirement: float = None,
+                                         limit: int = 4) -> Dict:
+        """Ranked models for a use case with free instances and a price quote for the window"""
+        try:
+            start_dt = datetime.datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+            end_dt = datetime.datetime.fromisoformat(end_time.replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            return {"success": False, "message": "Invalid time format. Please use ISO format (e.g., '2025-07-23T10:00:00Z')"}
+        if start_dt >= end_dt:
+            return {"success": False, "message": "End time must be after start time"}
         
-        for model in recommended_models:
-            if model in self.gpu_data["gpu_models"]:
-                gpu_info = self.gpu_data["gpu_models"][model]
-                price_per_hour = gpu_info["price_per_30min"] * 2
-                
-                # Apply filters
-                if budget_per_hour and price_per_hour > budget_per_hour:
-                    continue
-                if memory_requirement and float(gpu_info["memory"].split("GB")[0]) < memory_requirement:
-                    continue
-                
-                recommendations.append({
-                    "model": model,
-                    "name": gpu_info["name"],
-                    "memory": gpu_info["memory"],
-                    "description": gpu_info["description"],
-                    "price_per_hour": price_per_hour,
-                    "cuda_cores": gpu_info["cuda_cores"],
-                    "available_instances": len(gpu_info["instances"])
-                })
+        result = self.get_gpu_recommendations(use_case, budget_per_hour, memory_requirement,
+                                              start_time, end_time, limit)
+        duration_hours = (end_dt - start_dt).total_seconds() / 3600
         
-        return {"recommendations": recommendations}
+        options = []
+        for recommendation in result["recommendations"]:
+            instances = recommendation["instances_needed"]
+            option = {
+                "model": recommendation["model"],
+                "name": recommendation["name"],
+                "memory": recommendation["memory"],
+                "price_per_hour": recommendation["price_per_hour"],
+                "instances_needed": instances,
+                "free_instances": recommendation["available_instances"],
+                "bookable": recommendation["bookable"],
+                "quote": recommendation["quote"]
+            }
+            if recommendation["bookable"]:
+                option["gpu_ids"] = self.free_instances(recommendation["model"], start_time, end_time)[:instances]
+            for field in ("predicted_occupancy_pct", "capacity_warning", "suggested_window"):
+                if field in recommendation:
+                    option[field] = recommendation[field]
+            options.append(option)
+        
+        return {
+            "success": True,
+            "workload": result["workload"],
+            "required_vram_gb": result["required_vram_gb"],
+            "start_time": start_time,
+            "end_time": end_time,
+            "duration_hours": round(duration_hours, 2),
+            "options": options
+        }
+
+    def forecast_gpu_demand(self, model: str = None, start_time: str = None, end_time: str = None,
+                            bucket: str = "day") -> Dict:
+        """Predicted occupancy per GPU model over a window"""
+        try:
+            return forecast_demand(self.store, self.gpu_data, model=model, start_time=start_time,
+                                   end_time=end_time, bucket=bucket)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
 
     def create_booking(self, gpu_model: str, gpu_id: str = None, user_name: str = None, user_email: str = None,
                       start_time: str = None, end_time: str = None, storage_gb: int = 128, 
@@ -445,19 +634,7 @@ class HPC_ChatBot:
         if gpu_model not in self.gpu_data["gpu_models"]:
             return {"success": False, "message": f"GPU model '{gpu_model}' not found in inventory"}
         
-        # Auto-select GPU ID if not provided
-        if not gpu_id:
-            gpu_id = self.get_available_gpu_id(gpu_model, start_time, end_time)
-            if not gpu_id:
-                return {"success": False, "message": f"No available {gpu_model} GPUs found for the requested time period"}
-        else:
-            # Validate provided GPU ID exists for this model
-            gpu_info = self.gpu_data["gpu_models"][gpu_model]
-            valid_gpu_ids = [instance["id"] for instance in gpu_info["instances"]]
-            if gpu_id not in valid_gpu_ids:
-                return {"success": False, "message": f"GPU ID '{gpu_id}' not found for model '{gpu_model}'"}
-        
-        # Validate time format and logic
+        # Validate time format and logic before looking for a free instance
         try:
             start_dt = datetime.datetime.fromisoformat(start_time.replace('Z', '+00:00'))
             end_dt = datetime.datetime.fromisoformat(end_time.replace('Z', '+00:00'))
@@ -471,25 +648,24 @@ class HPC_ChatBot:
         except ValueError:
             return {"success": False, "message": "Invalid time format. Please use ISO format (e.g., '2025-07-23T10:00:00Z')"}
         
-        # Check if GPU is available during the requested time
-        for booking in self.bookings:
-            if (booking["gpu_id"] == gpu_id and 
-                booking["status"] in ["active", "scheduled"]):
-                booking_start = datetime.datetime.fromisoformat(booking["start_time"].replace('Z', '+00:00'))
-                booking_end = datetime.datetime.fromisoformat(booking["end_time"].replace('Z', '+00:00'))
-                
-                if (start_dt < booking_end and end_dt > booking_start):
-                    return {"success": False, "message": f"GPU {gpu_id} is not available during the requested time period"}
+        # Auto-select GPU ID if not provided
+        if not gpu_id:
+            gpu_id = self.get_available_gpu_id(gpu_model, start_time, end_time)
+            if not gpu_id:
+                return {"success": False, "message": f"No available {gpu_model} GPUs found for the requested time period"}
+        else:
+            # Validate provided GPU ID exists for this model
+            gpu_info = self.gpu_data["gpu_models"][gpu_model]
+            valid_gpu_ids = [instance["id"] for instance in gpu_info["instances"]]
+            if gpu_id not in valid_gpu_ids:
+                return {"success": False, "message": f"GPU ID '{gpu_id}' not found for model '{gpu_model}'"}
         
         # Generate booking ID and hash
-        booking_id = f"book_{len(self.bookings) + 1:03d}"
+        booking_id = self.store.next_booking_id()
         booking_hash = hashlib.md5(f"{booking_id}{user_email}{start_time}".encode()).hexdigest()
         
-        # Calculate cost
-        gpu_info = self.gpu_data["gpu_models"][gpu_model]
-        duration_hours = (end_dt - start_dt).total_seconds() / 3600
-        duration_slots = duration_hours * 2  # 30-minute slots
-        total_cost = duration_slots * gpu_info["price_per_30min"]
+        # Calculate cost (minimum booking time, whole time units)
+        total_cost = self.pricing.quote(gpu_model, start_dt, end_dt)["total_cost"]
         
         # Create booking
         new_booking = {
@@ -511,11 +687,10 @@ class HPC_ChatBot:
             "overtime_cost": 0.00
         }
         
-        self.bookings.append(new_booking)
-        
-        # Save to file
-        with open('bookings.json', 'w') as f:
-            json.dump(self.bookings, f, indent=2)
+        # Add to the store (saved to file); the availability check is atomic with the insert,
+        # since another session may book the same instance at the same time
+        if self.store.add_booking_if_free(new_booking) is None:
+            return {"success": False, "message": f"GPU {gpu_id} is no longer available during the requested time period"}
         
         # Display booking card
         self.display_booking_card(new_booking, is_cancelled=False)
@@ -525,15 +700,23 @@ class HPC_ChatBot:
     def query_booking_info(self, booking_hash: str = None, user_email: str = None, 
                           booking_id: str = None) -> Dict:
         """Query booking information"""
-        matching_bookings = []
+        def matches(booking):
+            return ((booking_hash and booking["booking_hash"] == booking_hash) or
+                    (user_email and booking["user_email"] == user_email) or
+                    (booking_id and booking["booking_id"] == booking_id))
+        
+        matching_bookings = [booking for booking in self.bookings if matches(booking)]
+        
+        # Fan out to the cold archive only when needed: email queries cover the
+        # user's full history, hash/ID lookups only when the hot partition misses
+        if user_email:
+            months = self.store.cold_partitions(user_email=user_email)
+        elif (booking_hash or booking_id) and not matching_bookings:
+            months = self.store.cold_partitions()
+        else:
+            months = []
         
-        for booking in self.bookings:
-            if booking_hash and booking["booking_hash"] == booking_hash:
-                matching_bookings.append(booking)
-            elif user_email and booking["user_email"] == user_email:
-                matching_bookings.append(booking)
-            elif booking_id and booking["booking_id"] == booking_id:
-                matching_bookings.append(booking)
+        matching_bookings.extend(booking for booking in self.store.iter_archived(months) if matches(booking))
         
         return {"bookings": matching_bookings}
 
@@ -585,14 +768,20 @@ class HPC_ChatBot:
         
         user_prompt = f"Generate booking card data for: {json.dumps(booking)}"
         
+        # Within the request deadline, or not at all
+        deadline = self._deadline
+        if deadline is not None and not deadline.allows_call():
+            get_deadline_stats().count("calls_skipped")
+            return self._manual_card_data(booking, is_cancelled)
+        
         try:
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
+            response = self.backend.complete(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                response_format={'type': 'json_object'}
+                response_format={'type': 'json_object'},
+                timeout=deadline.timeout(CARD_TIMEOUT) if deadline is not None else CARD_TIMEOUT
             )
             
             card_data = json.loads(response.choices[0].message.content)
@@ -914,22 +1103,20 @@ class HPC_ChatBot:
         if "@" not in user_email or "." not in user_email:
             return {"success": False, "message": "Invalid email format"}
         
-        for i, booking in enumerate(self.bookings):
-            if (booking["booking_hash"] == booking_hash and 
-                booking["user_email"].lower().strip() == user_email.lower().strip()):
-                if booking["status"] in ["scheduled", "active"]:
-                    self.bookings[i]["status"] = "cancelled"
-                    
-                    # Save to file
-                    with open('bookings.json', 'w') as f:
-                        json.dump(self.bookings, f, indent=2)
-                    
-                    # Display cancellation card
-                    self.display_booking_card(self.bookings[i], is_cancelled=True)
-                    
-                    return {"success": True, "message": "Booking cancelled successfully"}
-                else:
-                    return {"success": False, "message": "Booking cannot be cancelled (already completed or cancelled)"}
+        booking = self.store.get(booking_hash) or self.store.find_archived(booking_hash=booking_hash)
+        if booking and booking["user_email"].lower().strip() == user_email.lower().strip():
+            if booking["status"] in ["scheduled", "active"]:
+                self.store.update_booking(booking_hash, status="cancelled")
+                
+                # Save to file
+                self.store.save()
+                
+                # Display cancellation card
+                self.display_booking_card(booking, is_cancelled=True)
+                
+                return {"success": True, "message": "Booking cancelled successfully"}
+            else:
+                return {"success": False, "message": "Booking cannot be cancelled (already completed or cancelled)"}
         
         return {"success": False, "message": "Booking not found or email/hash combination is incorrect"}
 
@@ -940,7 +1127,10 @@ class HPC_ChatBot:
         total_cost = 0
         total_overtime_cost = 0
         
-        for booking in self.bookings:
+        # Only open cold partitions that hold this user's bookings in the billing period
+        cold_months = self.store.cold_partitions(user_email=user_email, created_from=start_date, created_to=end_date)
+        
+        for booking in itertools.chain(self.bookings, self.store.iter_archived(cold_months)):
             if booking["user_email"] != user_email:
                 continue
             
@@ -1012,13 +1202,7 @@ class HPC_ChatBot:
         if gpu_model not in self.gpu_data["gpu_models"]:
             return {"success": False, "message": f"GPU model '{gpu_model}' not found in inventory"}
         
-        # Auto-select GPU ID if not provided
-        if not gpu_id:
-            gpu_id = self.get_available_gpu_id(gpu_model, start_time, end_time)
-            if not gpu_id:
-                return {"success": False, "message": f"No available {gpu_model} GPUs found for the requested time period"}
-        
-        # Validate time format and logic
+        # Validate time format and logic before looking for a free instance
         try:
             start_dt = datetime.datetime.fromisoformat(start_time.replace('Z', '+00:00'))
             end_dt = datetime.datetime.fromisoformat(end_time.replace('Z', '+00:00'))
@@ -1032,11 +1216,17 @@ class HPC_ChatBot:
         except ValueError:
             return {"success": False, "message": "Invalid time format. Please use ISO format (e.g., '2025-07-23T10:00:00Z')"}
         
-        # Calculate cost
+        # Auto-select GPU ID if not provided
+        if not gpu_id:
+            gpu_id = self.get_available_gpu_id(gpu_model, start_time, end_time)
+            if not gpu_id:
+                return {"success": False, "message": f"No available {gpu_model} GPUs found for the requested time period"}
+        
+        # Calculate cost (minimum booking time, whole time units)
         gpu_info = self.gpu_data["gpu_models"][gpu_model]
         duration_hours = (end_dt - start_dt).total_seconds() / 3600
-        duration_slots = duration_hours * 2  # 30-minute slots
-        total_cost = duration_slots * gpu_info["price_per_30min"]
+        quote = self.pricing.quote(gpu_model, start_dt, end_dt)
+        total_cost = quote["total_cost"]
         
         # Store pending operation data
         self.pending_operation = "booking"
@@ -1079,6 +1269,7 @@ Please review the following booking details carefully:
 
 ### 💰 **Billing**
 - **Rate:** ${gpu_info['price_per_30min']:.2f} per 30 minutes
+- **Billed Time:** {quote['billed_minutes']} minutes ({quote['units']} × {quote['unit_minutes']}-minute units, minimum {quote['min_booking_time']} minutes)
 - **Total Cost:** **${total_cost:.2f}**
 
 ---
@@ -1089,6 +1280,7 @@ Please review the following booking details carefully:
         return {
             "success": True,
             "confirmation_needed": True,
+            "user_facing": True,
             "markdown_summary": confirmation_markdown
         }
 
@@ -1111,6 +1303,12 @@ Please review the following booking details carefully:
                 booking_found = booking
                 break
         
+        # Finished bookings may already have moved to the cold archive
+        if not booking_found:
+            archived = self.store.find_archived(booking_hash=booking_hash)
+            if archived and archived["user_email"].lower().strip() == user_email.lower().strip():
+                booking_found = archived
+        
         if not booking_found:
             return {"success": False, "message": "Booking not found or email/hash combination is incorrect"}
         
@@ -1164,6 +1362,7 @@ Please review the booking you want to cancel:
         return {
             "success": True,
             "confirmation_needed": True,
+            "user_facing": True,
             "markdown_summary": confirmation_markdown
         }
 
@@ -1203,7 +1402,7 @@ Please review the booking you want to cancel:
         data = self.pending_data
         
         # Generate booking ID and hash
-        booking_id = f"book_{len(self.bookings) + 1:03d}"
+        booking_id = self.store.next_booking_id()
         booking_hash = hashlib.md5(f"{booking_id}{data['user_email']}{data['start_time']}".encode()).hexdigest()
         
         # Create booking
@@ -1226,11 +1425,13 @@ Please review the booking you want to cancel:
             "overtime_cost": 0.00
         }
         
-        self.bookings.append(new_booking)
-        
-        # Save to file
-        with open('bookings.json', 'w') as f:
-            json.dump(self.bookings, f, indent=2)
+        # Add to the store (saved to file), unless another session took the instance since the summary
+        if self.store.add_booking_if_free(new_booking) is None:
+            return {
+                "success": False,
+                "message": f"Sorry, {data['gpu_model']} {data['gpu_id']} is no longer available for that time; "
+                           f"it was booked while you were confirming. Please search again for another GPU or time."
+            }
         
         # Display booking card
         self.display_booking_card(new_booking, is_cancelled=False)
@@ -1249,23 +1450,21 @@ Please review the booking you want to cancel:
         user_email = data["user_email"]
         
         # Find and cancel the booking
-        for i, booking in enumerate(self.bookings):
-            if (booking["booking_hash"] == booking_hash and 
-                booking["user_email"] == user_email):
-                self.bookings[i]["status"] = "cancelled"
-                
-                # Save to file
-                with open('bookings.json', 'w') as f:
-                    json.dump(self.bookings, f, indent=2)
-                
-                # Display cancellation card
-                self.display_booking_card(self.bookings[i], is_cancelled=True)
-                
-                return {
-                    "success": True,
-                    "message": "Booking cancelled successfully! A cancellation card has been generated and opened in your browser.",
-                    "clear_history": True
-                }
+        booking = self.store.get(booking_hash)
+        if booking and booking["user_email"] == user_email:
+            self.store.update_booking(booking_hash, status="cancelled")
+            
+            # Save to file
+            self.store.save()
+            
+            # Display cancellation card
+            self.display_booking_card(booking, is_cancelled=True)
+            
+            return {
+                "success": True,
+                "message": "Booking cancelled successfully! A cancellation card has been generated and opened in your browser.",
+                "clear_history": True
+            }
         
         return {"success": False, "message": "Booking not found during cancellation"}
 
@@ -1327,6 +1526,8 @@ Please review the booking you want to cancel:
         function_map = {
             "search_available_gpus": self.search_available_gpus,
             "get_gpu_recommendations": self.get_gpu_recommendations,
+            "recommend_and_check_availability": self.recommend_and_check_availability,
+            "forecast_gpu_demand": self.forecast_gpu_demand,
             "create_booking": self.create_booking,
             "query_booking_info": self.query_booking_info,
             "cancel_booking": self.cancel_booking,
@@ -1341,7 +1542,13 @@ Please review the booking you want to cancel:
         if function_name in function_map:
             try:
                 print(f"Executing function: {function_name} with parameters: {parameters}")
-                result = function_map[function_name](**parameters)
+                function = function_map[function_name]
+                if function_name in CACHEABLE_TOOLS:
+                    # Shared across sessions and turns until a booking changes
+                    result = get_tool_cache().get_or_compute(function_name, parameters, self.store.version_tag(),
+                                                             lambda: function(**parameters))
+                else:
+                    result = function(**parameters)
                 print(f"Function {function_name} completed successfully")
                 return result
             except Exception as e:
@@ -1352,8 +1559,16 @@ Please review the booking you want to cancel:
             print(f"Unknown function: {function_name}")
             return {"error": f"Unknown function: {function_name}"}
 
-    def send_message_to_ai(self, user_message: str) -> str:
-        """Send message to AI and get response with retry mechanism for empty responses"""
+    def send_message_to_ai(self, user_message: str, deadline: Deadline = None) -> str:
+        """Send message to AI and get a response, answering before the request deadline if one is given"""
+        self._deadline = deadline
+        try:
+            return self._answer_message(user_message, deadline)
+        finally:
+            self._deadline = None
+
+    def _answer_message(self, user_message: str, deadline: Deadline = None) -> str:
+        """Commands, fast paths and the FAQ cache first, then the LLM"""
         
         # Handle special commands
         if user_message.strip() == "/clear":
@@ -1371,15 +1586,90 @@ Please review the booking you want to cancel:
                 last_user_message = self.conversation_history[-2]["content"]
                 # Remove the "/again" from history and resend last message
                 self.conversation_history = self.conversation_history[:-1]
-                return self.send_message_to_ai(last_user_message)
+                return self.send_message_to_ai(last_user_message, deadline)
             else:
                 return "No previous message to resend. Please type your question again."
         
+        # A plain yes/no to a pending booking or cancellation needs no LLM round trip
+        if self.pending_operation:
+            routed = get_router().route_confirmation(self, user_message)
+            if routed is not None:
+                print(f"Fast path executed confirm_operation(confirmed={routed['parameters']['confirmed']})")
+                self._log_fast_path_tool_call(user_message, routed)
+                if routed["result"].get("clear_history"):
+                    self.clear_conversation_history()
+                return routed["markdown"]
+        
+        # Answer simple, high-confidence requests directly without the LLM
+        if not user_message.strip().startswith("/") and not self.pending_operation:
+            routed = get_router().route(self, user_message)
+            if routed is not None:
+                print(f"Fast path answered intent '{routed['intent']}' with {routed['tool']}")
+                self.conversation_history.append({"role": "user", "content": user_message})
+                self.conversation_history.append({"role": "assistant", "content": routed["markdown"]})
+                return routed["markdown"]
+        
+        # Generic questions answered before, for the same inventory, need no new completion
+        cache_answer = False
+        models = list(self.gpu_data["gpu_models"])
+        if not self.pending_operation and faq_cacheable(user_message, models):
+            cached = get_faq_cache().lookup(user_message, models, self.inventory_version)
+            if cached is not None:
+                print(f"FAQ cache hit (similarity {cached['similarity']}): {cached['question']}")
+                self.conversation_history.append({"role": "user", "content": user_message})
+                self.conversation_history.append({"role": "assistant", "content": cached["answer"]})
+                return cached["answer"]
+            # Only answers given without earlier context can be reused elsewhere
+            cache_answer = not self.conversation_history
+        
+        started = time.perf_counter()
+        try:
+            return self._send_to_llm(user_message, cache_answer=cache_answer, deadline=deadline)
+        finally:
+            get_router().record_llm_turn(time.perf_counter() - started)
+
+    def _log_fast_path_tool_call(self, user_message: str, routed: Dict):
+        """Record a fast-path exchange as the tool call the LLM would have made, so later turns see it"""
+        call_id = f"fast_path_{uuid.uuid4().hex[:12]}"
+        self.conversation_history.append({"role": "user", "content": user_message})
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [{
+                "id": call_id,
+                "type": "function",
+                "function": {"name": routed["tool"], "arguments": json.dumps(routed["parameters"])}
+            }]
+        })
+        self.conversation_history.append({"role": "tool", "tool_call_id": call_id, "content": json.dumps(routed["result"])})
+        self.conversation_history.append({"role": "assistant", "content": routed["markdown"]})
+
+    def _tools_for_next_call(self) -> List[Dict]:
+        """Only the tools that make sense in the current conversation state"""
+        state = conversation_state(self.pending_operation, self.conversation_history)
+        tools = get_tool_registry(self.tools).tools_for(state)
+        print(f"Conversation state '{state}': sending {len(tools)} of {len(self.tools)} tools")
+        return tools
+
+    def _user_facing_markdown(self, results: List) -> Optional[str]:
+        """Markdown from tool results flagged user_facing, to be returned to the user verbatim"""
+        summaries = [result["markdown_summary"].strip() for result in results
+                     if isinstance(result, dict) and result.get("user_facing") and result.get("markdown_summary")]
+        if summaries:
+            print(f"Passing {len(summaries)} user-facing tool result(s) through without a final LLM call")
+        return "\n\n".join(summaries) or None
+
+    def _send_to_llm(self, user_message: str, cache_answer: bool = False, deadline: Deadline = None) -> str:
+        """Run one turn through the LLM, executing any tool calls it makes"""
+        
         # Add user message to conversation history (except for /clear and /again commands)
         if user_message.strip() not in ["/clear", "/again"]:
             if user_message.strip() != "/shane":
                 self.conversation_history.append({"role": "user", "content": user_message})
         
+        # Start the read-only lookups the model is likely to ask for while it is thinking
+        speculation = get_speculator().start(self, user_message)
+        
         # Prepare system message
         base_system_content = """You are an AI assistant for SK (Shame Kitten) HPC Services, a company that provides high-performance computing GPU rental services.
 
@@ -1459,7 +1749,10 @@ CRITICAL FUNCTION CALLING RULES:
   * "how many 3080 available"
   * "are RTX-4090s available"
   * "check availability for July 22-25"
-  * "what GPUs are free this week" """
+  * "what GPUs are free this week"
+- Call forecast_gpu_demand for questions about future busyness ("will H100s be busy next week", "when is a good time to book")
+- When the user gives both a use case and a time window, call recommend_and_check_availability ONCE; it already includes live availability and the price, so do not follow it with get_gpu_recommendations or search_available_gpus
+- If an option shows capacity_warning or is not bookable, mention its suggested_window or a less busy alternative"""
         
         # Add shane mode if requested
         shane_mode_addition = ""
@@ -1471,224 +1764,13 @@ CRITICAL FUNCTION CALLING RULES:
             "content": base_system_content + shane_mode_addition
         }
         
-        # Prepare messages for API call
-        messages = [system_message] + self.conversation_history
-        
-        # Retry mechanism for API calls
-        max_retries = 3
-        retry_delay = 2  # seconds
-        
-        for attempt in range(max_retries):
-            try:
-                print("Making API call to DeepSeek...")  # Debug log
-                response = self.client.chat.completions.create(
-                    model="deepseek-chat",
-                    messages=messages,
-                    tools=self.tools,
-                    tool_choice="auto",
-                    timeout=45  # Increased timeout to 45 seconds
-                )
-                print("API call successful!")  # Debug log
-                
-                message = response.choices[0].message
-                
-                # Check if the response is empty or None
-                if not message.content and not message.tool_calls:
-                    print(f"Empty response received on attempt {attempt + 1}")
-                    if attempt < max_retries - 1:
-                        print(f"Retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                        continue
-                    else:
-                        return "I apologize, but I'm having trouble generating a response right now. Please try asking your question again, or contact support at nailfec17@gmail.com for assistance."
-                
-                # Handle function calls
-                if message.tool_calls:
-                    print(f"Processing {len(message.tool_calls)} tool calls...")
-                    
-                    # Add assistant message with tool calls to history
-                    assistant_message = {
-                        "role": "assistant",
-                        "content": message.content,
-                        "tool_calls": [
-                            {
-                                "id": tool_call.id,
-                                "type": "function",
-                                "function": {
-                                    "name": tool_call.function.name,
-                                    "arguments": tool_call.function.arguments
-                                }
-                            } for tool_call in message.tool_calls
-                        ]
-                    }
-                    self.conversation_history.append(assistant_message)
-                    
-                    # Execute function calls and add results
-                    should_clear_history = False
-                    for i, tool_call in enumerate(message.tool_calls):
-                        function_name = tool_call.function.name
-                        parameters = json.loads(tool_call.function.arguments)
-                        print(f"Executing function {i+1}/{len(message.tool_calls)}: {function_name}")
-                        
-                        result = self.execute_function(function_name, parameters)
-                        print(f"Function {function_name} completed with result type: {type(result)}")
-                        
-                        # Check if we should clear history after this operation
-                        if isinstance(result, dict) and result.get("clear_history"):
-                            should_clear_history = True
-                        
-                        # Add function result to conversation
-                        self.conversation_history.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps(result)
-                        })
-                    
-                    # Get final response after function execution with retry
-                    final_response_content = None
-                    for final_attempt in range(max_retries):
-                        try:
-                            print(f"Getting final response after function execution (attempt {final_attempt + 1})...")
-                            final_response = self.client.chat.completions.create(
-                                model="deepseek-chat",
-                                messages=[system_message] + self.conversation_history,
-                                tools=self.tools,
-                                tool_choice="auto",
-                                timeout=45
-                            )
-                            
-                            final_message = final_response.choices[0].message
-                            print(f"Final response received: {final_message.content[:100] if final_message.content else 'None'}...")
-                            
-                            # Handle additional tool calls in final response
-                            if final_message.tool_calls:
-                                print(f"Final response contains {len(final_message.tool_calls)} additional tool calls, executing them...")
-                                
-                                # Add the assistant message with tool calls
-                                if final_message.content:
-                                    self.conversation_history.append({
-                                        "role": "assistant",
-                                        "content": final_message.content,
-                                        "tool_calls": [
-                                            {
-                                                "id": tc.id,
-                                                "type": "function",
-                                                "function": {
-                                                    "name": tc.function.name,
-                                                    "arguments": tc.function.arguments
-                                                }
-                                            } for tc in final_message.tool_calls
-                                        ]
-                                    })
-                                
-                                # Execute additional tool calls
-                                for tc in final_message.tool_calls:
-                                    try:
-                                        func_name = tc.function.name
-                                        func_params = json.loads(tc.function.arguments)
-                                        func_result = self.execute_function(func_name, func_params)
-                                        
-                                        self.conversation_history.append({
-                                            "role": "tool",
-                                            "tool_call_id": tc.id,
-                                            "content": json.dumps(func_result)
-                                        })
-                                    except Exception as tc_e:
-                                        print(f"Error in additional tool call {func_name}: {str(tc_e)}")
-                                        self.conversation_history.append({
-                                            "role": "tool",
-                                            "tool_call_id": tc.id,
-                                            "content": json.dumps({"error": str(tc_e)})
-                                        })
-                                
-                                # Get another response after additional tool calls
-                                if final_attempt < max_retries - 1:
-                                    continue
-                                else:
-                                    final_response_content = "I've completed the function calls, but need to generate a final response. Please ask me again if you need more information."
-                                    break
-                            
-                            # Check if final response is empty
-                            elif not final_message.content or final_message.content.strip() == "":
-                                print(f"Empty final response on attempt {final_attempt + 1}")
-                                if final_attempt < max_retries - 1:
-                                    print(f"Retrying final response in {retry_delay} seconds...")
-                                    time.sleep(retry_delay)
-                                    continue
-                                else:
-                                    # Force a non-empty response
-                                    final_response_content = "I've processed your request successfully. If you need more information, please let me know!"
-                                    break
-                            else:
-                                final_response_content = final_message.content
-                                break
-                            
-                        except Exception as final_e:
-                            print(f"Final response API error on attempt {final_attempt + 1}: {str(final_e)}")
-                            if final_attempt < max_retries - 1:
-                                print(f"Retrying in {retry_delay} seconds...")
-                                time.sleep(retry_delay)
-                                continue
-                            else:
-                                final_response_content = f"I've processed your request, but encountered an error generating the response: {str(final_e)}. Please try again or contact support at nailfec17@gmail.com."
-                                break
-                    
-                    # Ensure we always have a response
-                    if not final_response_content:
-                        final_response_content = "I've processed your request successfully. Please let me know if you need anything else!"
-                    
-                    # Add final response to history
-                    final_assistant_message = {
-                        "role": "assistant",
-                        "content": final_response_content
-                    }
-                    self.conversation_history.append(final_assistant_message)
-                    
-                    # Clear history if requested (after successful booking/cancellation)
-                    if should_clear_history:
-                        self.clear_conversation_history()
-                    
-                    print(f"Returning final response: {final_response_content[:100]}...")
-                    return final_response_content
-                
-                else:
-                    # No function calls, check for empty content
-                    if not message.content or message.content.strip() == "":
-                        print(f"Empty direct response on attempt {attempt + 1}")
-                        if attempt < max_retries - 1:
-                            print(f"Retrying in {retry_delay} seconds...")
-                            time.sleep(retry_delay)
-                            continue
-                        else:
-                            return "I apologize, but I'm having trouble generating a response right now. Please try rephrasing your question or contact support at nailfec17@gmail.com for assistance."
-                    
-                    # Add response to history
-                    assistant_message = {
-                        "role": "assistant",
-                        "content": message.content
-                    }
-                    self.conversation_history.append(assistant_message)
-                    return message.content
-                    
-            except Exception as e:
-                print(f"AI API Error on attempt {attempt + 1}: {str(e)}")
-                if attempt < max_retries - 1:
-                    print(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    continue
-                else:
-                    traceback.print_exc()  # Print full error stack for last attempt
-                    
-                    # Provide fallback response
-                    if "timeout" in str(e).lower() or "connection" in str(e).lower():
-                        return "AI service is responding slowly at the moment, please try again later. You can also email nailfec17@gmail.com for human assistance."
-                    elif "api" in str(e).lower() or "key" in str(e).lower():
-                        return "AI service configuration issue, please contact administrator. Email: nailfec17@gmail.com"
-                    else:
-                        return f"Sorry, I encountered a technical issue: {str(e)}. Please try again later or contact support team: nailfec17@gmail.com"
-        
-        # This should never be reached, but added as a safety net
-        return "I'm experiencing technical difficulties. Please try again or contact support at nailfec17@gmail.com."
+        loop = AgentLoop(self, speculation=speculation, deadline=deadline)
+        reply = loop.run(system_message)
+        # Answered from the prompt alone, so it only depends on the inventory
+        if cache_answer and loop.turn["outcome"] == "answered" and not loop.turn["tool_calls"]:
+            get_faq_cache().store(user_message, reply, list(self.gpu_data["gpu_models"]),
+                                  self.inventory_version, loop.turn["seconds"])
+        return reply
 
     def chat(self):
         """Main chat loop"""
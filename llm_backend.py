@@ -0,0 +1,146 @@
+import json
+import time
+import itertools
+import threading
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+
+class CompletionBackend:
+    """
+    What the chat engine needs from an LLM: chat completions
+    complete(**request) takes the OpenAI chat.completions.create arguments (messages, tools,
+    tool_choice, timeout, response_format, ...) except the model, which is the backend's
+    choice, and returns a response shaped like the OpenAI SDK's.
+    """
+
+    def complete(self, **request):
+        raise NotImplementedError
+
+    def hedge(self, **request):
+        """A duplicate of a slow request; backends with several upstreams send it to another one"""
+        return self.complete(**request)
+
+    def get_stats(self) -> Dict:
+        return {}
+
+
+class Step:
+    """One scripted completion: a response or an error, after some simulated latency"""
+
+    def __init__(self, response=None, error: Exception = None, latency: float = 0.0):
+        self.response = response
+        self.error = error
+        self.latency = latency
+
+
+def _response(content: Optional[str], calls: Optional[List], prompt_tokens: int, completion_tokens: int):
+    message = SimpleNamespace(role="assistant", content=content, tool_calls=calls)
+    usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                            total_tokens=prompt_tokens + completion_tokens)
+    finish_reason = "tool_calls" if calls else "stop"
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+                           usage=usage)
+
+
+_call_ids = itertools.count(1)
+
+
+def text(content: str, latency: float = 0.0, prompt_tokens: int = 0, completion_tokens: int = 0) -> Step:
+    """A step that answers in text"""
+    return Step(_response(content, None, prompt_tokens, completion_tokens), latency=latency)
+
+
+def tool_calls(*calls, latency: float = 0.0, content: str = None) -> Step:
+    """A step that asks for tools; each call is (name, arguments)"""
+    made = [SimpleNamespace(id=f"call_fake_{next(_call_ids)}", type="function",
+                            function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+            for name, arguments in calls]
+    return Step(_response(content, made, 0, 0), latency=latency)
+
+
+def tool_call(name: str, latency: float = 0.0, **arguments) -> Step:
+    """A step that asks for a single tool"""
+    return tool_calls((name, arguments), latency=latency)
+
+
+def failure(error: Exception, latency: float = 0.0) -> Step:
+    """A step that raises after its latency"""
+    return Step(error=error, latency=latency)
+
+
+class FakeTimeout(TimeoutError):
+    """Raised when a step's latency is longer than the request's timeout"""
+
+
+class FakeBackend(CompletionBackend):
+    """
+    Scriptable in-process backend for offline tests and benchmarks
+    Each completion takes the next scripted step, or asks `responder(request)` once the
+    script is used up, or answers `default`. Latency is simulated with `sleep`, and a
+    step slower than the request's timeout raises FakeTimeout after the timeout.
+    Every request is recorded.
+    """
+
+    def __init__(self, script: List[Step] = None, responder: Callable[[Dict], Step] = None,
+                 default: str = "OK", sleep: Callable[[float], None] = time.sleep):
+        self.script = list(script or [])
+        self.responder = responder
+        self.default = default
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.requests = []
+        self.stats = {"completions": 0, "tool_call_responses": 0, "errors": 0, "timeouts": 0,
+                      "simulated_seconds": 0.0}
+
+    def complete(self, **request):
+        with self.lock:
+            self.requests.append(dict(request, messages=list(request.get("messages", []))))
+            step = self.script.pop(0) if self.script else None
+        if step is None:
+            step = (self.responder(request) if self.responder else None) or text(self.default)
+
+        timeout = request.get("timeout")
+        timed_out = timeout is not None and step.latency > timeout
+        latency = timeout if timed_out else step.latency
+        if latency:
+            self.sleep(latency)
+        with self.lock:
+            self.stats["completions"] += 1
+            self.stats["simulated_seconds"] += latency
+            if timed_out:
+                self.stats["timeouts"] += 1
+            elif step.error is not None:
+                self.stats["errors"] += 1
+            elif step.response.choices[0].message.tool_calls:
+                self.stats["tool_call_responses"] += 1
+        if timed_out:
+            raise FakeTimeout(f"Request timed out after {timeout:.1f}s")
+        if step.error is not None:
+            raise step.error
+        return step.response
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return dict(self.stats, backend="fake", requests=len(self.requests), scripted_left=len(self.script))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def set_backend(backend: Optional[CompletionBackend]):
+    """Install the process-wide backend (e.g. a FakeBackend); None goes back to the LLM router"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def get_backend() -> CompletionBackend:
+    """Process-wide completion backend, by default the router over the configured endpoints"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            from llm_router import get_llm_router
+            _backend = get_llm_router()
+        return _backend
@@ -0,0 +1,89 @@
+import threading
+import importlib.util
+from typing import Dict
+
+import openai
+from openai import OpenAI
+
+
+BASE_URL = "https://api.deepseek.com"
+
+# Per-request timeout used when a call does not pass its own
+CLIENT_TIMEOUT = 30.0
+
+# Retries are left to retry_policy.py rather than stacked on top of the SDK's own
+SDK_MAX_RETRIES = 0
+
+# Keep-alive pool shared by every session; idle connections are kept long enough
+# to be reused by the next message instead of paying a new TCP+TLS handshake
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 120.0
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class PoolStats:
+    """
+    Requests, new connections and TLS handshakes seen by a pooled HTTP client
+    Connection events come from the transport's trace extension, so a request that
+    rides an existing keep-alive connection counts as reused.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "responses": 0, "new_connections": 0, "tls_handshakes": 0}
+        self.http_versions = {}
+
+    def _trace(self, name: str, info: Dict):
+        if name.endswith("connect_tcp.complete"):
+            with self.lock:
+                self.stats["new_connections"] += 1
+        elif name.endswith("start_tls.complete"):
+            with self.lock:
+                self.stats["tls_handshakes"] += 1
+
+    def on_request(self, request):
+        request.extensions["trace"] = self._trace
+        with self.lock:
+            self.stats["requests"] += 1
+
+    def on_response(self, response):
+        with self.lock:
+            self.stats["responses"] += 1
+            self.http_versions[response.http_version] = self.http_versions.get(response.http_version, 0) + 1
+
+    def get_stats(self) -> Dict:
+        """Counts plus the share of answered requests that reused a pooled connection"""
+        with self.lock:
+            stats = dict(self.stats, http_versions=dict(self.http_versions))
+        # Over answered requests only; a request that never connected reused nothing
+        stats["reused_connections"] = max(stats["responses"] - stats["new_connections"], 0)
+        stats["reuse_rate"] = round(stats["reused_connections"] / stats["responses"], 3) if stats["responses"] else 0.0
+        return stats
+
+
+def create_llm_client(api_key: str, base_url: str = BASE_URL, timeout: float = CLIENT_TIMEOUT,
+                      max_connections: int = MAX_CONNECTIONS,
+                      max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+                      keepalive_expiry: float = KEEPALIVE_EXPIRY, http2: bool = None,
+                      stats: PoolStats = None) -> OpenAI:
+    """OpenAI client on a keep-alive connection pool, using HTTP/2 when h2 is installed"""
+    # The SDK's own HTTP client class, so its defaults apply whichever httpx it is built on
+    limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry
+    )
+    stats = stats or PoolStats()
+    http_client = openai.DefaultHttpxClient(
+        limits=limits,
+        http2=http2_available() if http2 is None else http2,
+        event_hooks={"request": [stats.on_request], "response": [stats.on_response]}
+    )
+    return OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=SDK_MAX_RETRIES,
+                  http_client=http_client)
+
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, List
+
+from llm_backend import CompletionBackend
+from llm_client import BASE_URL, PoolStats, create_llm_client, http2_available
+from retry_policy import classify
+from deadline import MIN_CALL_SECONDS
+
+
+# Optional list of OpenAI-compatible endpoints, in order of preference:
+# [{"name": ..., "base_url": ..., "model": ..., "api_key": ...}]; api_key defaults to nailfec.api_key
+LLM_ENDPOINTS_FILE = "llm_endpoints.json"
+
+DEFAULT_ENDPOINTS = [{"name": "deepseek", "base_url": BASE_URL, "model": "deepseek-chat"}]
+
+# Weight of the newest observation in the latency and error-rate averages
+EWMA_ALPHA = 0.3
+
+# A latency average older than this counts as unknown again: the endpoint gets one probe call,
+# so a single slow sample (a cold start, say) does not starve it of traffic for good
+LATENCY_STALE_SECONDS = 60.0
+
+# An endpoint whose error rate goes above this is skipped for UNHEALTHY_SECONDS, then tried again
+UNHEALTHY_ERROR_RATE = 0.5
+UNHEALTHY_SECONDS = 30.0
+
+# Errors that say more about the endpoint than about the request (bad key, unknown model)
+ENDPOINT_FAULT_STATUS = (401, 403, 404)
+
+
+def load_endpoints(path: str = LLM_ENDPOINTS_FILE) -> List[Dict]:
+    """Endpoint configuration from the JSON file, or the public DeepSeek API if there is none"""
+    if not os.path.exists(path):
+        return [dict(endpoint) for endpoint in DEFAULT_ENDPOINTS]
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class Endpoint:
+    """One OpenAI-compatible API with its own connection pool and health averages"""
+
+    def __init__(self, name: str, base_url: str, model: str, client, pool_stats: PoolStats = None):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.client = client
+        self.pool_stats = pool_stats
+        self.latency = None
+        self.measured_at = 0.0
+        # A probe's sample replaces the stale average instead of being blended into it
+        self.probing = False
+        self.error_rate = 0.0
+        self.unhealthy_until = 0.0
+        self.stats = {"calls": 0, "errors": 0, "failovers": 0, "probes": 0}
+
+
+class LLMRouter(CompletionBackend):
+    """
+    Routes each completion to the best healthy endpoint
+    Endpoints are ranked by their moving-average latency (untried ones first, then the
+    configured order); an average not refreshed for a minute is probed again, and
+    endpoints with a high recent error rate sit out for a while. A call
+    that fails on one endpoint is sent to the next within the same timeout, so a turn
+    carries on against another endpoint; a hedged duplicate starts at the second-best
+    endpoint. The endpoint decides the model.
+    """
+
+    def __init__(self, endpoints: List[Endpoint], clock=time.monotonic):
+        if not endpoints:
+            raise ValueError("At least one LLM endpoint is required")
+        self.endpoints = endpoints
+        self.clock = clock
+        self.lock = threading.Lock()
+
+    def ranked(self) -> List[Endpoint]:
+        """Healthy endpoints fastest first, then unhealthy ones by when they may be tried again"""
+        now = self.clock()
+        with self.lock:
+            order = {endpoint.name: i for i, endpoint in enumerate(self.endpoints)}
+            probes = set()
+            for endpoint in self.endpoints:
+                if endpoint.latency is not None and endpoint.unhealthy_until <= now and \
+                        now - endpoint.measured_at > LATENCY_STALE_SECONDS:
+                    # This call re-measures it; restarting the clock keeps other calls off it meanwhile
+                    endpoint.measured_at = now
+                    endpoint.probing = True
+                    endpoint.stats["probes"] += 1
+                    probes.add(endpoint.name)
+            healthy = sorted((e for e in self.endpoints if e.unhealthy_until <= now),
+                             key=lambda e: (e.latency is not None and e.name not in probes, e.latency or 0.0,
+                                            order[e.name]))
+            unhealthy = sorted((e for e in self.endpoints if e.unhealthy_until > now),
+                               key=lambda e: e.unhealthy_until)
+        return healthy + unhealthy
+
+    def _record(self, endpoint: Endpoint, seconds: float = None, failed: bool = False):
+        with self.lock:
+            endpoint.stats["calls"] += 1
+            endpoint.error_rate += EWMA_ALPHA * (float(failed) - endpoint.error_rate)
+            if failed:
+                endpoint.stats["errors"] += 1
+                if endpoint.error_rate > UNHEALTHY_ERROR_RATE:
+                    endpoint.unhealthy_until = self.clock() + UNHEALTHY_SECONDS
+            elif seconds is not None:
+                endpoint.latency = seconds if endpoint.latency is None or endpoint.probing else \
+                    endpoint.latency + EWMA_ALPHA * (seconds - endpoint.latency)
+                endpoint.measured_at = self.clock()
+            endpoint.probing = False
+
+    def complete(self, **request):
+        """chat.completions.create on the best endpoint, failing over to the others"""
+        return self._complete(self.ranked(), request)
+
+    def hedge(self, **request):
+        """A hedged duplicate goes to the next-best healthy endpoint first, not the one already slow"""
+        endpoints = self.ranked()
+        if len(endpoints) > 1 and endpoints[1].unhealthy_until <= self.clock():
+            endpoints = [endpoints[1], endpoints[0]] + endpoints[2:]
+        return self._complete(endpoints, request)
+
+    def _complete(self, endpoints: List[Endpoint], request: Dict):
+        timeout = request.get("timeout")
+        started = self.clock()
+        error = None
+        for endpoint in endpoints:
+            if error is not None:
+                if timeout is not None:
+                    request["timeout"] = timeout - (self.clock() - started)
+                    if request["timeout"] < MIN_CALL_SECONDS:
+                        break
+                print(f"Failing over to LLM endpoint '{endpoint.name}'")
+                with self.lock:
+                    endpoint.stats["failovers"] += 1
+            request["model"] = endpoint.model
+            call_started = self.clock()
+            try:
+                response = endpoint.client.chat.completions.create(**request)
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                endpoint_fault = classify(e) == "retryable" or status in ENDPOINT_FAULT_STATUS
+                self._record(endpoint, failed=endpoint_fault)
+                if not endpoint_fault:
+                    # The request itself is bad; another endpoint would refuse it too
+                    raise
+                print(f"LLM endpoint '{endpoint.name}' failed: {str(e)}")
+                error = e
+                continue
+            self._record(endpoint, self.clock() - call_started)
+            return response
+        raise error
+
+    def get_stats(self) -> Dict:
+        """Per-endpoint latency, error rate, health and connection reuse"""
+        now = self.clock()
+        stats = {"backend": "router", "http2": http2_available(), "endpoints": []}
+        with self.lock:
+            for endpoint in self.endpoints:
+                stats["endpoints"].append(dict(
+                    endpoint.stats, name=endpoint.name, base_url=endpoint.base_url, model=endpoint.model,
+                    ewma_latency=round(endpoint.latency, 3) if endpoint.latency is not None else None,
+                    error_rate=round(endpoint.error_rate, 3), healthy=endpoint.unhealthy_until <= now,
+                    pool=endpoint.pool_stats.get_stats() if endpoint.pool_stats else None))
+        return stats
+
+
+def build_router(configs: List[Dict], default_api_key: str = None) -> LLMRouter:
+    """Router with a pooled client per configured endpoint"""
+    endpoints = []
+    for config in configs:
+        pool_stats = PoolStats()
+        client = create_llm_client(config.get("api_key") or default_api_key, base_url=config["base_url"],
+                                   stats=pool_stats)
+        endpoints.append(Endpoint(config.get("name") or config["base_url"], config["base_url"], config["model"],
+                                  client, pool_stats))
+    return LLMRouter(endpoints)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_llm_router() -> LLMRouter:
+    """Process-wide LLM router (shared by every session and request)"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            configs = load_endpoints()
+            default_api_key = None
+            if any(not config.get("api_key") for config in configs):
+                import nailfec
+                default_api_key = nailfec.api_key
+            _router = build_router(configs, default_api_key)
+            print(f"LLM endpoints: {', '.join(e.name for e in _router.endpoints)}")
+        return _router
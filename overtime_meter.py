@@ -0,0 +1,215 @@
+import json
+import math
+import time
+import random
+import socket
+import heapq
+import argparse
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from booking_store import BookingStore, get_store, to_epoch, LIVE_STATUSES
+from pricing import PricingEngine
+
+
+def read_jsonl_events(path: str) -> Iterator[Dict]:
+    """Stream usage events from a JSONL file, skipping blank or malformed lines"""
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping malformed event line: {line[:80]}")
+
+
+def read_socket_events(host: str, port: int) -> Iterator[Dict]:
+    """Stream newline-delimited JSON usage events from a TCP socket until it closes"""
+    with socket.create_connection((host, port)) as sock:
+        with sock.makefile('r', encoding='utf-8') as stream:
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping malformed event line: {line[:80]}")
+
+
+def generate_usage_events(bookings: List[Dict], overrun_probability: float = 0.3,
+                          max_overrun_minutes: int = 90, seed: int = None) -> Iterator[Dict]:
+    """
+    Generate time-ordered session start/stop events for live bookings
+    Some sessions run past the booking end to exercise overtime metering
+    """
+    rng = random.Random(seed)
+    live = sorted((b for b in bookings if b["status"] in LIVE_STATUSES),
+                  key=lambda b: to_epoch(b["start_time"]))
+    pending_stops = []
+
+    for n, booking in enumerate(live):
+        start = to_epoch(booking["start_time"]) + rng.randint(0, 300)
+        end = to_epoch(booking["end_time"])
+        if rng.random() < overrun_probability:
+            end += rng.randint(1, max_overrun_minutes) * 60
+        else:
+            end -= rng.randint(0, 600)
+
+        # Emit any stops that happen before this session starts
+        while pending_stops and pending_stops[0][0] <= start:
+            yield heapq.heappop(pending_stops)[1]
+
+        session_id = f"sess_{n:06d}"
+        yield {"event": "session_start", "session_id": session_id,
+               "gpu_id": booking["gpu_id"], "timestamp": start}
+        heapq.heappush(pending_stops, (end, {"event": "session_stop", "session_id": session_id,
+                                             "gpu_id": booking["gpu_id"], "timestamp": end}))
+
+    while pending_stops:
+        yield heapq.heappop(pending_stops)[1]
+
+
+class OvertimeMeter:
+    """
+    Streaming overtime metering engine
+    Matches GPU usage sessions to bookings and fills overtime_minutes / overtime_cost
+    """
+
+    def __init__(self, store: BookingStore = None, gpu_data: Dict = None,
+                 batch_size: int = 1000, max_open_sessions: int = 10000):
+        self.store = store or get_store()
+        if gpu_data is None:
+            with open('gpu_inventory.json', 'r') as f:
+                gpu_data = json.load(f)
+        self.pricing = PricingEngine(gpu_data)
+        self.batch_size = batch_size
+        self.max_open_sessions = max_open_sessions
+
+        # session_id -> (booking_hash, start epoch); bounded so memory stays flat
+        self.open_sessions = OrderedDict()
+
+        self.stats = {
+            "events": 0,
+            "batches": 0,
+            "sessions_matched": 0,
+            "sessions_unmatched": 0,
+            "sessions_dropped": 0,
+            "bookings_updated": 0,
+            "seconds": 0.0
+        }
+
+    def _observe(self, booking_hash: str, until: float, changed: Dict):
+        """Record usage up to an epoch timestamp, raising the booking's overtime if needed"""
+        booking = self.store.get(booking_hash)
+        if booking is None:
+            return
+        overtime_minutes = math.ceil(max(0.0, until - to_epoch(booking["end_time"])) / 60)
+        current = changed.get(booking_hash, booking.get("overtime_minutes", 0))
+        if overtime_minutes > current:
+            changed[booking_hash] = overtime_minutes
+
+    def process_batch(self, events: List[Dict]) -> int:
+        """Apply one batch of usage events; returns the number of bookings updated"""
+        changed = {}
+        watermark = None
+
+        for event in events:
+            ts = to_epoch(event["timestamp"])
+            watermark = ts if watermark is None else max(watermark, ts)
+            session_id = event.get("session_id")
+            kind = event.get("event")
+
+            if kind == "session_start":
+                booking = self.store.find_live_booking(event["gpu_id"], ts)
+                if booking is None:
+                    self.stats["sessions_unmatched"] += 1
+                    continue
+                self.stats["sessions_matched"] += 1
+                self.open_sessions[session_id] = (booking["booking_hash"], ts)
+                if len(self.open_sessions) > self.max_open_sessions:
+                    self.open_sessions.popitem(last=False)
+                    self.stats["sessions_dropped"] += 1
+
+            elif kind == "session_stop":
+                session = self.open_sessions.pop(session_id, None)
+                if session is None:
+                    # Stop without a known start: attribute to the booking running at the stop
+                    booking = self.store.find_live_booking(event["gpu_id"], ts)
+                    if booking is None:
+                        self.stats["sessions_unmatched"] += 1
+                        continue
+                    session = (booking["booking_hash"], ts)
+                self._observe(session[0], ts, changed)
+
+        # Sessions still running have used their GPU at least up to the batch watermark
+        if watermark is not None:
+            for booking_hash, _ in self.open_sessions.values():
+                self._observe(booking_hash, watermark, changed)
+
+        # Price every changed booking in one call
+        hashes = list(changed)
+        costs = self.pricing.overtime_costs([self.store.get(h)["gpu_model"] for h in hashes],
+                                            [changed[h] for h in hashes]).tolist() if hashes else []
+        for booking_hash, overtime_cost in zip(hashes, costs):
+            self.store.update_booking(
+                booking_hash,
+                overtime_minutes=changed[booking_hash],
+                overtime_cost=overtime_cost
+            )
+
+        self.stats["events"] += len(events)
+        self.stats["batches"] += 1
+        self.stats["bookings_updated"] += len(changed)
+        return len(changed)
+
+    def run(self, events: Iterable[Dict], save: bool = True) -> Dict:
+        """Consume an event stream batch by batch, saving the store after each changed batch"""
+        started = time.perf_counter()
+        iterator = iter(events)
+
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                break
+            if self.process_batch(batch) and save:
+                self.store.save()
+
+        self.stats["seconds"] += time.perf_counter() - started
+        return self.get_stats()
+
+    def get_stats(self) -> Dict:
+        """Metering counters plus throughput"""
+        stats = dict(self.stats)
+        stats["open_sessions"] = len(self.open_sessions)
+        stats["events_per_second"] = round(stats["events"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meter GPU overtime from session usage events")
+    parser.add_argument("--jsonl", help="Path to a JSONL file of usage events")
+    parser.add_argument("--socket", help="host:port streaming newline-delimited JSON events")
+    parser.add_argument("--generate", action="store_true", help="Use locally generated events for live bookings")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Do not write bookings.json")
+    args = parser.parse_args()
+
+    meter = OvertimeMeter(batch_size=args.batch_size)
+
+    if args.jsonl:
+        events = read_jsonl_events(args.jsonl)
+    elif args.socket:
+        host, port = args.socket.rsplit(':', 1)
+        events = read_socket_events(host, int(port))
+    else:
+        events = generate_usage_events(meter.store.bookings, seed=42)
+
+    print(json.dumps(meter.run(events, save=not args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
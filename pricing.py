@@ -0,0 +1,81 @@
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+from booking_store import to_epoch
+
+
+# Tolerance for float noise when rounding billed minutes up to whole time units
+UNIT_EPSILON = 1e-9
+
+
+class PricingEngine:
+    """
+    Central pricing for GPU bookings
+    Bookings are billed in whole time_unit blocks, never less than min_booking_time,
+    at price_per_30min scaled to the unit; overtime adds overtime_multiplier on top.
+    Quotes are computed for arrays of candidates in one vectorised call.
+    """
+
+    def __init__(self, gpu_data: Dict):
+        self.models = list(gpu_data["gpu_models"])
+        self.index = {model: i for i, model in enumerate(self.models)}
+        infos = list(gpu_data["gpu_models"].values())
+        self.price_per_30min = np.array([info["price_per_30min"] for info in infos], dtype=np.float64)
+        self.min_booking_time = np.array([info.get("min_booking_time", 30) for info in infos], dtype=np.float64)
+        self.time_unit = np.array([info.get("time_unit", 30) for info in infos], dtype=np.float64)
+        self.overtime_multiplier = np.array([info.get("overtime_multiplier", 1.0) for info in infos],
+                                            dtype=np.float64)
+        self.unit_price = self.price_per_30min * self.time_unit / 30
+
+    def _codes(self, models: Sequence[str]) -> np.ndarray:
+        try:
+            return np.array([self.index[model] for model in models], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"GPU model {e} not found in inventory")
+
+    def _units(self, codes: np.ndarray, minutes: np.ndarray, minimum: np.ndarray) -> np.ndarray:
+        billed = np.maximum(minutes, minimum)
+        units = np.ceil(billed / self.time_unit[codes] - UNIT_EPSILON)
+        return np.where(minutes > 0, units, 0)
+
+    def quote_many(self, models: Sequence[str], starts: Sequence, ends: Sequence,
+                   instances: Union[int, Sequence[int]] = 1) -> Dict[str, np.ndarray]:
+        """
+        Quote many (model, start, end) candidates at once
+        Starts and ends may be ISO strings, datetimes or epoch seconds. Returns arrays of
+        duration_minutes, billed_minutes, units and total_cost aligned with the input.
+        """
+        codes = self._codes(models)
+        start = np.array([to_epoch(value) for value in starts], dtype=np.float64)
+        end = np.array([to_epoch(value) for value in ends], dtype=np.float64)
+        minutes = np.maximum(end - start, 0) / 60
+        units = self._units(codes, minutes, self.min_booking_time[codes])
+        cost = units * self.unit_price[codes] * np.asarray(instances, dtype=np.float64)
+        return {
+            "duration_minutes": minutes,
+            "billed_minutes": units * self.time_unit[codes],
+            "units": units.astype(np.int64),
+            "total_cost": np.round(cost, 2)
+        }
+
+    def quote(self, model: str, start, end, instances: int = 1) -> Dict:
+        """Quote a single booking"""
+        quoted = self.quote_many([model], [start], [end], instances)
+        return {
+            "gpu_model": model,
+            "duration_hours": round(float(quoted["duration_minutes"][0]) / 60, 2),
+            "billed_minutes": int(quoted["billed_minutes"][0]),
+            "units": int(quoted["units"][0]),
+            "unit_minutes": int(self.time_unit[self.index[model]]),
+            "min_booking_time": int(self.min_booking_time[self.index[model]]),
+            "total_cost": float(quoted["total_cost"][0])
+        }
+
+    def overtime_costs(self, models: Sequence[str], overtime_minutes: Sequence[float]) -> np.ndarray:
+        """Overtime charges: started time units at the unit price times overtime_multiplier"""
+        codes = self._codes(models)
+        minutes = np.asarray(overtime_minutes, dtype=np.float64)
+        # Overtime has no minimum; any started unit is billed
+        units = self._units(codes, minutes, np.zeros(len(codes)))
+        return np.round(units * self.unit_price[codes] * self.overtime_multiplier[codes], 2)
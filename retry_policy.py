@@ -0,0 +1,155 @@
+import time
+import random
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import openai
+
+
+# Capped exponential backoff: retry n waits a random time in [0, min(MAX_DELAY, BASE_DELAY * 2**(n-1))]
+BASE_DELAY = 0.5
+MAX_DELAY = 8.0
+
+# Retry budget shared by every session: each first attempt earns RETRY_RATIO of a retry,
+# so under a sustained outage retries add at most ~10% extra calls beyond a small burst
+RETRY_RATIO = 0.1
+RETRY_BURST = 10.0
+
+# Circuit breaker: opens when at least BREAKER_FAILURE_RATE of the calls in the last
+# BREAKER_WINDOW seconds failed (and there were at least BREAKER_MIN_CALLS of them),
+# then rejects calls for BREAKER_OPEN_SECONDS before letting one probe call through
+BREAKER_WINDOW = 30.0
+BREAKER_MIN_CALLS = 10
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_OPEN_SECONDS = 30.0
+
+# Status codes worth retrying; other 4xx errors fail the same way every time
+RETRYABLE_STATUS = (408, 409, 429)
+
+
+def classify(error: Optional[Exception]) -> str:
+    """'retryable' for timeouts, connection failures, rate limits, 5xx and empty replies; else 'fatal'"""
+    if error is None:
+        return "retryable"
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return "retryable" if status in RETRYABLE_STATUS or status >= 500 else "fatal"
+    if isinstance(error, (openai.APIConnectionError, TimeoutError, ConnectionError)):
+        return "retryable"
+    return "fatal"
+
+
+class RetryPolicy:
+    """
+    Process-wide retry decisions for LLM calls
+    Backoff uses full jitter so threads that failed together do not retry together.
+    Retries draw from a shared budget, and a circuit breaker rejects calls outright
+    while the upstream error rate is high instead of piling more load onto it.
+    """
+
+    def __init__(self, base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY,
+                 retry_ratio: float = RETRY_RATIO, retry_burst: float = RETRY_BURST,
+                 window: float = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_rate: float = BREAKER_FAILURE_RATE, open_seconds: float = BREAKER_OPEN_SECONDS,
+                 clock=time.monotonic, rng: random.Random = None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_ratio = retry_ratio
+        self.retry_burst = retry_burst
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.lock = threading.Lock()
+        self.tokens = retry_burst
+        self.outcomes = deque()
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.stats = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "budget_denied": 0,
+                      "not_retryable": 0, "rejected": 0, "breaker_opened": 0}
+
+    def allow_call(self) -> bool:
+        """False while the breaker is open; half-open lets a single probe call through"""
+        with self.lock:
+            if self.state == "open" and self.clock() - self.opened_at >= self.open_seconds:
+                self.state = "half_open"
+            if self.state == "open" or (self.state == "half_open" and self.probe_in_flight):
+                self.stats["rejected"] += 1
+                return False
+            if self.state == "half_open":
+                self.probe_in_flight = True
+            self.stats["calls"] += 1
+            return True
+
+    def record(self, error: Optional[Exception] = None, first_attempt: bool = True):
+        """Outcome of a call; only retryable errors count as upstream failures"""
+        failed = error is not None and classify(error) == "retryable"
+        with self.lock:
+            now = self.clock()
+            if first_attempt:
+                self.tokens = min(self.tokens + self.retry_ratio, self.retry_burst)
+            self.stats["failures" if failed else "successes"] += 1
+            if self.state == "half_open":
+                self.probe_in_flight = False
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = "closed"
+                    self.outcomes.clear()
+                return
+            self.outcomes.append((now, failed))
+            while self.outcomes and now - self.outcomes[0][0] > self.window:
+                self.outcomes.popleft()
+            failures = sum(1 for _, f in self.outcomes if f)
+            if (self.state == "closed" and len(self.outcomes) >= self.min_calls
+                    and failures >= self.failure_rate * len(self.outcomes)):
+                self._open(now)
+
+    def _open(self, now: float):
+        print(f"Circuit breaker opened; rejecting LLM calls for {self.open_seconds:.0f} seconds")
+        self.state = "open"
+        self.opened_at = now
+        self.outcomes.clear()
+        self.stats["breaker_opened"] += 1
+
+    def next_delay(self, attempt: int, error: Optional[Exception] = None) -> Optional[float]:
+        """Seconds to wait before retry number `attempt` (1-based), or None if it should not be retried"""
+        with self.lock:
+            if classify(error) != "retryable":
+                self.stats["not_retryable"] += 1
+                return None
+            # Tolerance for the sum of fractional deposits
+            if self.tokens < 1 - 1e-9:
+                self.stats["budget_denied"] += 1
+                return None
+            self.tokens -= 1
+            self.stats["retries"] += 1
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return self.rng.uniform(0, cap)
+
+    def get_stats(self) -> Dict:
+        """Breaker state, retry counts and the budget left"""
+        with self.lock:
+            stats = dict(self.stats, state=self.state, budget_tokens=round(self.tokens, 2))
+            recent = len(self.outcomes)
+            failures = sum(1 for _, f in self.outcomes if f)
+        stats["recent_failure_rate"] = round(failures / recent, 3) if recent else 0.0
+        stats["retry_rate"] = round(stats["retries"] / stats["calls"], 3) if stats["calls"] else 0.0
+        return stats
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Process-wide retry policy (the budget and breaker cover every session)"""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = RetryPolicy()
+        return _policy
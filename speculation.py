@@ -0,0 +1,143 @@
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from fast_path import EMAIL_PATTERN, HASH_PATTERN, INTENT_PATTERNS, _iso, extract_window, model_aliases
+from tool_cache import argument_key
+
+
+# Tools that only read state, and are therefore safe to run before the model asks for them
+SPECULATIVE_TOOLS = ("search_available_gpus", "query_booking_info", "calculate_billing")
+
+# Worker threads shared by every session
+MAX_WORKERS = 4
+
+
+def predict_tool_calls(text: str, models: List[str], now: datetime.datetime) -> List[Tuple[str, Dict]]:
+    """(tool, parameters) the model is likely to request first for a message"""
+    text = text.strip()
+    if not text or text.startswith('/'):
+        return []
+    mentioned = [model for model, pattern in model_aliases(models).items() if pattern.search(text)]
+    # Kept as written: the model echoes them back unchanged and argument_key compares them exactly
+    emails = sorted(set(EMAIL_PATTERN.findall(text)))
+    hashes = sorted(set(HASH_PATTERN.findall(text)))
+    window, understood = extract_window(text, now)
+
+    calls = []
+    # Availability: one model and/or a window the rules resolved
+    if understood and len(mentioned) <= 1 and (mentioned or window):
+        parameters = {"model": mentioned[0] if mentioned else None}
+        if window:
+            parameters.update(start_time=_iso(window[0]), end_time=_iso(window[1]))
+        calls.append(("search_available_gpus", parameters))
+    if len(emails) == 1:
+        if INTENT_PATTERNS["billing"].search(text):
+            calls.append(("calculate_billing", {"user_email": emails[0]}))
+        else:
+            calls.append(("query_booking_info", {"user_email": emails[0]}))
+    if len(hashes) == 1:
+        calls.append(("query_booking_info", {"booking_hash": hashes[0]}))
+    return [(tool, {k: v for k, v in parameters.items() if v is not None}) for tool, parameters in calls]
+
+
+class Speculation:
+    """Read-only tool calls started for one user turn, waiting to be claimed by the model"""
+
+    def __init__(self, executor: "SpeculativeExecutor", chatbot, version: str):
+        self.executor = executor
+        self.chatbot = chatbot
+        self.version = version
+        self.pending = {}
+
+    def take(self, tool: str, parameters: Dict):
+        """The speculative result for this call, or None to execute it normally"""
+        future = self.pending.pop(argument_key(tool, parameters), None)
+        if future is None:
+            if tool in SPECULATIVE_TOOLS:
+                self.executor._count("misses")
+            return None
+        # Still queued behind other sessions' speculation: running it inline is sooner
+        if future.cancel():
+            self.executor._count("misses")
+            return None
+        try:
+            # Still running means it started earlier than a fresh call would
+            result, seconds = future.result()
+        except Exception as e:
+            print(f"Speculative {tool} failed, running it again: {str(e)}")
+            self.executor._count("errors")
+            return None
+        # A booking was made or changed since; the result may be out of date
+        if self.chatbot.store.version_tag() != self.version:
+            self.executor._count("stale")
+            return None
+        self.executor._count("hits", seconds_saved=seconds)
+        print(f"Speculative {tool} hit ({seconds * 1000:.1f} ms saved)")
+        return result
+
+    def finish(self):
+        """Count speculative calls the model never asked for"""
+        if self.pending:
+            self.executor._count("wasted", len(self.pending))
+        self.pending = {}
+
+
+class SpeculativeExecutor:
+    """
+    Runs likely read-only tool calls while the first LLM call is in flight
+    The model's own tool calls then take the finished result instead of running again.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, clock=None):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-tool")
+        self.clock = clock or (lambda: datetime.datetime.now(datetime.timezone.utc))
+        self.lock = threading.Lock()
+        self.stats = {"turns": 0, "launched": 0, "hits": 0, "misses": 0, "stale": 0, "errors": 0,
+                      "wasted": 0, "seconds_saved": 0.0}
+
+    def _count(self, key: str, n: int = 1, seconds_saved: float = 0.0):
+        with self.lock:
+            self.stats[key] += n
+            self.stats["seconds_saved"] += seconds_saved
+
+    def start(self, chatbot, text: str) -> Speculation:
+        """Launch the predicted calls for a message and return the handle for the turn"""
+        speculation = Speculation(self, chatbot, chatbot.store.version_tag())
+        calls = predict_tool_calls(text, list(chatbot.gpu_data["gpu_models"]), self.clock())
+        for tool, parameters in calls:
+            # Through execute_function, so results land in the shared tool cache too
+            def run(tool=tool, parameters=parameters):
+                started = time.perf_counter()
+                result = chatbot.execute_function(tool, parameters)
+                return result, time.perf_counter() - started
+
+            speculation.pending[argument_key(tool, parameters)] = self.pool.submit(run)
+        with self.lock:
+            self.stats["turns"] += 1
+            self.stats["launched"] += len(calls)
+        return speculation
+
+    def get_stats(self) -> Dict:
+        """Launched, hit, missed, stale and wasted speculative calls and time saved"""
+        with self.lock:
+            stats = dict(self.stats)
+        claimed = stats["hits"] + stats["misses"] + stats["stale"] + stats["errors"]
+        stats["hit_rate"] = round(stats["hits"] / claimed, 3) if claimed else 0.0
+        stats["seconds_saved"] = round(stats["seconds_saved"], 4)
+        return stats
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_speculator() -> SpeculativeExecutor:
+    """Process-wide speculative executor (shared thread pool and metrics)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = SpeculativeExecutor()
+        return _executor
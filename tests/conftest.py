@@ -0,0 +1,48 @@
+"""
+Shared pytest fixtures: sample bookings and booking stores on temporary files
+"""
+
+import itertools
+import json
+
+import pytest
+
+from booking_store import BookingStore
+
+
+@pytest.fixture
+def sample_booking():
+    """Factory for booking n: a scheduled H100 booking for Alice, with any field overridden"""
+    def make(n=1, **overrides):
+        booking = {
+            "booking_id": f"book_{n:03d}",
+            "booking_hash": f"hash{n:03d}",
+            "user_name": "Alice Johnson",
+            "user_email": "alice@example.com",
+            "gpu_model": "H100",
+            "gpu_id": "H100-001",
+            "start_time": "2025-07-20T10:00:00Z",
+            "end_time": "2025-07-20T18:00:00Z",
+            "status": "scheduled",
+            "total_cost": 128.0,
+            "overtime_minutes": 0,
+            "overtime_cost": 0.0
+        }
+        booking.update(overrides)
+        booking.setdefault("created_at", booking["start_time"])
+        return booking
+    return make
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    """Factory for a BookingStore over the given bookings, each in its own directory under tmp_path"""
+    directories = itertools.count(1)
+
+    def make(bookings):
+        directory = tmp_path / f"store{next(directories)}"
+        directory.mkdir()
+        path = directory / "bookings.json"
+        path.write_text(json.dumps(bookings))
+        return BookingStore(str(path))
+    return make
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded tool-use loop
+"""
+
+import json
+from types import SimpleNamespace
+
+from agent_loop import AgentLoop, get_turn_stats
+from retry_policy import RetryPolicy
+from deadline import Deadline
+from hpc_chatbot import HPC_ChatBot
+import llm_backend
+
+SYSTEM = {"role": "system", "content": "You are a test assistant."}
+
+# Far enough ahead that no booking in bookings.json overlaps it
+START = "2030-01-07T10:00:00Z"
+END = "2030-01-07T14:00:00Z"
+
+
+def text(content, prompt_tokens=100, completion_tokens=10):
+    message = SimpleNamespace(content=content, tool_calls=None)
+    usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def tool_call(name, call_id="call_1", content=None, **arguments):
+    call = SimpleNamespace(id=call_id, type="function",
+                           function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+    message = SimpleNamespace(content=content, tool_calls=[call])
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class ScriptedChatBot:
+    """Chatbot surface the loop uses, answering LLM calls from a script"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = []
+        self.conversation_history = [{"role": "user", "content": "hello"}]
+        self.backend = SimpleNamespace(complete=self._create, hedge=self._create)
+
+    def _create(self, **request):
+        self.requests.append(dict(request, messages=list(request["messages"])))
+        step = self.script.pop(0) if self.script else text("")
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+    def _tools_for_next_call(self):
+        return []
+
+    def execute_function(self, name, parameters):
+        return {"success": True, "tool": name, "parameters": parameters}
+
+    def _user_facing_markdown(self, results):
+        return None
+
+    def clear_conversation_history(self):
+        self.conversation_history = []
+
+
+def test_tool_round_is_threaded():
+    """Tool calls with empty content still get their assistant message before the results"""
+    chatbot = ScriptedChatBot([tool_call("search_available_gpus", model="H100"), text("Two H100s are free.", 120, 8)])
+    reply = AgentLoop(chatbot, retry_policy=RetryPolicy(base_delay=0)).run(SYSTEM)
+
+    assert reply == "Two H100s are free."
+    assert [m["role"] for m in chatbot.conversation_history] == ["user", "assistant", "tool", "assistant"]
+    call_message, result = chatbot.conversation_history[1], chatbot.conversation_history[2]
+    assert call_message["content"] == ""
+    assert result["tool_call_id"] == call_message["tool_calls"][0]["id"]
+    # The second call sees the tool result
+    assert chatbot.requests[1]["messages"][-1]["role"] == "tool"
+    assert get_turn_stats().summary()["last_turn"]["prompt_tokens"] == 120
+
+
+def test_llm_calls_are_bounded():
+    """A model that keeps calling tools is forced to answer on the last call"""
+    chatbot = ScriptedChatBot([tool_call("get_current_datetime", call_id=f"call_{n}") for n in range(10)])
+    reply = AgentLoop(chatbot, max_llm_calls=3, retry_policy=RetryPolicy(base_delay=0)).run(SYSTEM)
+
+    assert len(chatbot.requests) == 3
+    assert [r["tool_choice"] for r in chatbot.requests] == ["auto", "auto", "none"]
+    assert reply.startswith("I've processed your request")
+    last = get_turn_stats().summary()["last_turn"]
+    assert last["rounds"] == 2 and last["outcome"] == "exhausted"
+
+
+def test_errors_and_empty_replies_share_the_budget():
+    """Retries count against the same budget and end in a fallback answer"""
+    chatbot = ScriptedChatBot([ConnectionError("connection reset"), text(""), ConnectionError("connection reset")])
+    reply = AgentLoop(chatbot, max_llm_calls=3, retry_policy=RetryPolicy(base_delay=0)).run(SYSTEM)
+
+    assert len(chatbot.requests) == 3
+    assert "responding slowly" in reply
+    # Nothing was answered, so only the user's message is in the history
+    assert [m["role"] for m in chatbot.conversation_history] == ["user"]
+    last = get_turn_stats().summary()["last_turn"]
+    assert last["retries"] == 2 and last["outcome"] == "error"
+
+
+def test_wall_clock_budget():
+    """No call starts after the deadline and each call's timeout fits in what is left"""
+    now = [0.0]
+
+    def clock():
+        return now[0]
+
+    chatbot = ScriptedChatBot([tool_call("get_current_datetime"), text("done")])
+    original = chatbot._create
+
+    def slow_create(**request):
+        now[0] += 7.0
+        return original(**request)
+
+    chatbot.backend.complete = slow_create
+    reply = AgentLoop(chatbot, max_seconds=10.0, call_timeout=45.0, retry_policy=RetryPolicy(base_delay=0),
+                      clock=clock).run(SYSTEM)
+
+    assert [r["timeout"] for r in chatbot.requests] == [10.0, 3.0]
+    assert reply == "done"
+
+
+def test_request_deadline_stops_retries():
+    """A request deadline shorter than the turn budget caps the calls and ends in a fallback"""
+    now = [0.0]
+
+    def clock():
+        return now[0]
+
+    chatbot = ScriptedChatBot([])
+
+    def timing_out(**request):
+        chatbot.requests.append(request)
+        now[0] += request["timeout"]
+        raise TimeoutError("request timed out")
+
+    chatbot.backend.complete = timing_out
+    deadline = Deadline(12.0, clock=clock)
+    reply = AgentLoop(chatbot, max_seconds=60.0, call_timeout=8.0, retry_policy=RetryPolicy(base_delay=0),
+                      clock=clock, deadline=deadline).run(SYSTEM)
+
+    # 8 s, then the 4 s left; no retry starts once there is no time to finish it
+    assert [r["timeout"] for r in chatbot.requests] == [8.0, 4.0]
+    assert "taking longer than expected" in reply and deadline.exceeded
+    assert get_turn_stats().summary()["last_turn"]["outcome"] == "timeout"
+
+
+def test_fatal_errors_and_open_breaker_fail_fast():
+    """A 4xx error is not retried, and an open breaker skips the LLM entirely"""
+    bad_request = Exception("invalid request")
+    bad_request.status_code = 400
+    chatbot = ScriptedChatBot([bad_request, text("never reached")])
+    AgentLoop(chatbot, retry_policy=RetryPolicy(base_delay=0)).run(SYSTEM)
+    assert len(chatbot.requests) == 1
+    assert get_turn_stats().summary()["last_turn"]["outcome"] == "error"
+
+    policy = RetryPolicy(base_delay=0, min_calls=2)
+    for _ in range(2):
+        policy.record(TimeoutError("timed out"))
+    chatbot = ScriptedChatBot([text("never reached")])
+    reply = AgentLoop(chatbot, retry_policy=policy).run(SYSTEM)
+    assert chatbot.requests == [] and "try again in a minute" in reply
+    assert get_turn_stats().summary()["last_turn"]["outcome"] == "unavailable"
+
+
+def test_user_facing_summary_is_passed_through():
+    """A user_facing markdown_summary is the reply, word for word, without a second LLM call"""
+    fake = llm_backend.FakeBackend([llm_backend.tool_call(
+        "prepare_booking_confirmation", gpu_model="H100", user_name="Ann Lee", user_email="ann@example.com",
+        start_time=START, end_time=END)])
+    chatbot = HPC_ChatBot(backend=fake)
+    reply = chatbot.send_message_to_ai("Please book an H100 for Ann Lee, ann@example.com, on my usual day")
+
+    result = json.loads(chatbot.conversation_history[-2]["content"])
+    assert result["user_facing"] and reply == result["markdown_summary"].strip()
+    assert len(fake.requests) == 1
+    assert get_turn_stats().summary()["last_turn"]["outcome"] == "passthrough"
+
+
+def test_other_tool_results_go_back_to_the_model():
+    """Results without the flag are sent back to the model, which writes the reply"""
+    fake = llm_backend.FakeBackend([
+        llm_backend.tool_call("search_available_gpus", model="H100", start_time=START, end_time=END),
+        llm_backend.text("Yes, H100s are free then.")])
+    chatbot = HPC_ChatBot(backend=fake)
+    reply = chatbot.send_message_to_ai("Is an H100 free on 2030-01-07 from 10:00 to 14:00 for my team?")
+
+    assert reply == "Yes, H100s are free then." and len(fake.requests) == 2
+    assert fake.requests[1]["messages"][-1]["role"] == "tool"
+    # Only flagged results with a summary are passed through
+    assert chatbot._user_facing_markdown([{"markdown_summary": "not flagged"}, "text", {"user_facing": True}]) is None
+    assert chatbot._user_facing_markdown([{"user_facing": True, "markdown_summary": " shown \n"},
+                                          {"markdown_summary": "hidden"}]) == "shown"
+
+
+if __name__ == "__main__":
+    test_tool_round_is_threaded()
+    test_llm_calls_are_bounded()
+    test_errors_and_empty_replies_share_the_budget()
+    test_wall_clock_budget()
+    test_request_deadline_stops_retries()
+    test_fatal_errors_and_open_breaker_fail_fast()
+    test_user_facing_summary_is_passed_through()
+    test_other_tool_results_go_back_to_the_model()
+    print("All agent loop tests passed!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for columnar booking analytics
+"""
+
+from analytics import BookingColumns, bucket_edges, report, utilization
+from booking_store import to_epoch
+
+import numpy as np
+import pytest
+
+GPU_DATA = {
+    "gpu_models": {
+        "H100": {"instances": [{"id": "H100-001"}, {"id": "H100-002"}]},
+        "A100": {"instances": [{"id": "A100-001"}]}
+    }
+}
+
+
+def as_bookings(sample_booking, rows):
+    """Completed bookings from (gpu_model, gpu_id, start_time, end_time, total_cost[, status]) rows"""
+    return [sample_booking(n, gpu_model=row[0], gpu_id=row[1], start_time=row[2], end_time=row[3],
+                           total_cost=row[4], status=row[5] if len(row) > 5 else "completed")
+            for n, row in enumerate(rows, 1)]
+
+
+def test_bucket_edges_align_to_utc_boundaries():
+    """Day buckets start at midnight UTC and week buckets on Monday"""
+    edges = bucket_edges("2025-07-20T10:30:00Z", "2025-07-22T01:00:00Z", "day")
+    assert edges[0] == to_epoch("2025-07-20T00:00:00Z")
+    assert edges[-1] == to_epoch("2025-07-23T00:00:00Z")
+
+    weeks = bucket_edges("2025-07-23T00:00:00Z", "2025-07-24T00:00:00Z", "week")
+    assert weeks[0] == to_epoch("2025-07-21T00:00:00Z")
+
+
+def test_utilization_splits_bookings_across_buckets(sample_booking):
+    """A booking spanning midnight is split between days, pro-rating its revenue"""
+    columns = BookingColumns(as_bookings(sample_booking, [
+        ("H100", "H100-001", "2025-07-20T20:00:00Z", "2025-07-21T04:00:00Z", 80.0),
+        ("H100", "H100-002", "2025-07-21T10:00:00Z", "2025-07-21T12:00:00Z", 20.0),
+        ("A100", "A100-001", "2025-07-21T10:00:00Z", "2025-07-21T12:00:00Z", 20.0, "cancelled"),
+    ]))
+    report = utilization(columns, GPU_DATA, "2025-07-20T00:00:00Z", "2025-07-22T00:00:00Z", "day")
+
+    h100 = report["models"]["H100"]
+    assert h100["booked_gpu_hours"] == [4.0, 6.0]
+    assert h100["revenue"] == [40.0, 60.0]
+    assert h100["occupancy_pct"] == [round(4 / 48 * 100, 2), round(6 / 48 * 100, 2)]
+
+    # Cancelled bookings do not occupy capacity
+    assert report["models"]["A100"]["totals"]["booked_gpu_hours"] == 0.0
+    assert report["instances"]["H100-002"]["booked_gpu_hours"] == [0.0, 2.0]
+    assert report["overall"]["totals"]["instances"] == 3
+
+
+def test_report_groups_by_model_and_week(sample_booking):
+    """Revenue by model per week sums each group and skips filtered statuses"""
+    columns = BookingColumns(iter(as_bookings(sample_booking, [
+        ("H100", "H100-001", "2025-07-20T20:00:00Z", "2025-07-21T04:00:00Z", 80.0),
+        ("H100", "H100-002", "2025-07-21T10:00:00Z", "2025-07-21T12:00:00Z", 20.0),
+        ("H100", "H100-001", "2025-07-22T10:00:00Z", "2025-07-22T12:00:00Z", 30.0),
+        ("A100", "A100-001", "2025-07-21T10:00:00Z", "2025-07-21T12:00:00Z", 20.0, "cancelled"),
+    ])))
+    rows = report(columns, ["model", "week"], "revenue", "sum", statuses=["completed"])
+    assert rows == [
+        {"model": "H100", "week": "2025-07-14", "revenue_sum": 80.0, "bookings": 1},
+        {"model": "H100", "week": "2025-07-21", "revenue_sum": 50.0, "bookings": 2},
+    ]
+
+    months = report(columns, ["month"], "bookings")
+    assert months == [{"month": "2025-07", "bookings": 4}]
+
+
+def test_report_percentiles_match_numpy(sample_booking):
+    """Per-group percentiles agree with numpy.percentile"""
+    rng = np.random.default_rng(7)
+    bookings = []
+    for n in range(500):
+        start = 1752969600 + int(rng.integers(0, 1000)) * 1800
+        hours = int(rng.integers(1, 48))
+        domain = ["uni.edu", "corp.com", "lab.org"][n % 3]
+        bookings.append(sample_booking(n, start_time=start, end_time=start + hours * 3600, total_cost=10.0,
+                                       status="completed", user_email=f"user{n}@{domain}"))
+    columns = BookingColumns(bookings)
+
+    rows = report(columns, ["domain"], "duration_hours", "p95")
+    durations = columns.duration_hours
+    for row in rows:
+        code = columns.categories["domain"].index(row["domain"])
+        expected = np.percentile(durations[columns.codes["domain"] == code], 95)
+        assert row["duration_hours_p95"] == round(float(expected), 2)
+    assert sum(row["bookings"] for row in rows) == 500
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
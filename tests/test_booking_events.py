@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for server-sent booking deltas
+"""
+
+import json
+
+import pytest
+
+from booking_events import BookingEventBroadcaster
+
+
+def parse_event(text):
+    """Split one SSE message into (event, data)"""
+    fields = dict(line.split(": ", 1) for line in text.strip().split("\n"))
+    return fields["event"], json.loads(fields["data"]), fields.get("id")
+
+
+def test_stream_sends_snapshot_then_deltas(make_store, sample_booking):
+    """A client first gets the store version, then created and cancelled deltas"""
+    store = make_store([sample_booking(1)])
+    broadcaster = BookingEventBroadcaster(store)
+    stream = broadcaster.stream()
+
+    event, data, _ = parse_event(next(stream))
+    assert event == "snapshot" and data["version"] == store.version_tag()
+
+    store.add_booking(sample_booking(2))
+    event, data, _ = parse_event(next(stream))
+    assert event == "created" and data["booking"]["booking_id"] == "book_002"
+    assert "user_email" not in data["booking"]
+
+    store.update_booking("hash001", status="cancelled")
+    event, data, _ = parse_event(next(stream))
+    assert event == "cancelled" and data["old_status"] == "scheduled"
+
+    stream.close()
+    assert broadcaster.get_stats()["clients"] == 0
+
+
+def test_reconnect_replays_missed_deltas(make_store, sample_booking):
+    """A client reconnecting with Last-Event-ID only receives what it missed"""
+    store = make_store([sample_booking(1)])
+    broadcaster = BookingEventBroadcaster(store)
+
+    store.update_booking("hash001", status="active")
+    last_seen = store.version_tag()
+    store.update_booking("hash001", status="completed")
+
+    stream = broadcaster.stream(last_event_id=last_seen)
+    event, data, _ = parse_event(next(stream))
+    assert event == "status_changed" and data["booking"]["status"] == "completed"
+    stream.close()
+
+    # An ID from another server generation falls back to a snapshot
+    stream = broadcaster.stream(last_event_id="deadbeef.1")
+    assert parse_event(next(stream))[0] == "snapshot"
+    stream.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
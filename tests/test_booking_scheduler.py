@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the booking lifecycle scheduler
+"""
+
+import json
+
+import pytest
+
+from booking_store import to_epoch
+from booking_scheduler import BookingScheduler
+
+
+def test_transitions_follow_start_and_end_times(make_store, sample_booking):
+    """A scheduled booking becomes active at start_time and completed at end_time"""
+    store = make_store([sample_booking()])
+    scheduler = BookingScheduler(store)
+    events = []
+    store.subscribe(events.append)
+
+    assert scheduler.run_due(to_epoch("2025-07-20T09:59:00Z")) == []
+    scheduler.run_due(to_epoch("2025-07-20T10:00:00Z"))
+    assert store.get("hash001")["status"] == "active"
+    assert store.has_conflict("H100-001", "2025-07-20T12:00:00Z", "2025-07-20T13:00:00Z")
+
+    scheduler.run_due(to_epoch("2025-07-20T18:00:00Z"))
+    assert store.get("hash001")["status"] == "completed"
+    # Finished bookings are pruned from the availability index
+    assert not store.has_conflict("H100-001", "2025-07-20T12:00:00Z", "2025-07-20T13:00:00Z")
+
+    assert [(e["old_status"], e["new_status"]) for e in events] == [("scheduled", "active"), ("active", "completed")]
+    scheduler.stop()
+
+
+def test_overdue_bookings_catch_up(make_store, sample_booking):
+    """Bookings whose window already passed go straight through to completed"""
+    store = make_store([sample_booking()])
+    scheduler = BookingScheduler(store)
+    applied = scheduler.run_due(to_epoch("2025-08-01T00:00:00Z"))
+
+    assert [a["new_status"] for a in applied] == ["active", "completed"]
+    with open(store.path) as f:
+        assert json.load(f)[0]["status"] == "completed"
+    scheduler.stop()
+
+
+def test_cancelled_bookings_are_skipped(make_store, sample_booking):
+    """Stale heap entries for cancelled bookings are dropped without a transition"""
+    store = make_store([sample_booking()])
+    scheduler = BookingScheduler(store)
+    store.update_booking("hash001", status="cancelled")
+
+    assert scheduler.run_due(to_epoch("2025-08-01T00:00:00Z")) == []
+    assert store.get("hash001")["status"] == "cancelled"
+    scheduler.stop()
+
+
+def test_new_bookings_are_scheduled(make_store, sample_booking):
+    """Bookings added to the store after start-up are picked up automatically"""
+    store = make_store([])
+    scheduler = BookingScheduler(store)
+    store.add_booking(sample_booking(2, start_time="2025-07-21T10:00:00Z", end_time="2025-07-21T12:00:00Z"))
+
+    assert scheduler.next_due() == to_epoch("2025-07-21T10:00:00Z")
+    scheduler.stop()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
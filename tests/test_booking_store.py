@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for booking store hot/cold partitioning
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from booking_store import BookingStore, to_epoch
+
+
+def test_finished_bookings_move_to_monthly_partitions(make_store, sample_booking):
+    """Old completed/cancelled bookings leave the hot file; live ones stay"""
+    store = make_store([
+        sample_booking(1, status="completed", start_time="2025-05-03T10:00:00Z", end_time="2025-05-03T12:00:00Z"),
+        sample_booking(2, status="cancelled", start_time="2025-06-10T10:00:00Z", end_time="2025-06-10T12:00:00Z",
+                       user_email="bob@example.com"),
+        sample_booking(3, status="scheduled", start_time="2025-09-01T10:00:00Z", end_time="2025-09-01T12:00:00Z"),
+    ])
+    archived = store.archive_finished(now=to_epoch("2025-08-01T00:00:00Z"))
+
+    assert archived == 2
+    assert [b["booking_id"] for b in store.bookings] == ["book_003"]
+    with open(store.path) as f:
+        assert len(json.load(f)) == 1
+    assert sorted(os.listdir(store.archive_dir)) == [
+        "bookings-2025-05.json.gz", "bookings-2025-06.json.gz", "manifest.json"]
+
+    # A reopened store sees the same partitions and keeps IDs increasing
+    reopened = BookingStore(store.path)
+    assert reopened.find_archived(booking_hash="hash002")["user_email"] == "bob@example.com"
+    assert reopened.next_booking_id() == "book_004"
+
+
+def test_recent_finished_bookings_stay_hot(make_store, sample_booking):
+    """Finished bookings inside the retention window are not archived"""
+    store = make_store([sample_booking(1, status="completed", start_time="2025-07-20T10:00:00Z",
+                                       end_time="2025-07-20T12:00:00Z")])
+
+    assert store.archive_finished(now=to_epoch("2025-07-25T00:00:00Z")) == 0
+    assert len(store.bookings) == 1
+
+
+def test_cold_partitions_are_pruned_by_user_and_period(make_store, sample_booking):
+    """Only partitions holding the user's bookings in the requested period are opened"""
+    store = make_store([
+        sample_booking(1, status="completed", start_time="2025-04-03T10:00:00Z", end_time="2025-04-03T12:00:00Z"),
+        sample_booking(2, status="completed", start_time="2025-05-03T10:00:00Z", end_time="2025-05-03T12:00:00Z"),
+        sample_booking(3, status="completed", start_time="2025-06-03T10:00:00Z", end_time="2025-06-03T12:00:00Z",
+                       user_email="bob@example.com"),
+    ])
+    store.archive_finished(now=to_epoch("2025-08-01T00:00:00Z"))
+
+    assert store.cold_partitions() == ["2025-06", "2025-05", "2025-04"]
+    assert store.cold_partitions(user_email="alice@example.com") == ["2025-05", "2025-04"]
+    assert store.cold_partitions(user_email="alice@example.com", created_from="2025-05-01T00:00:00Z") == ["2025-05"]
+    assert store.cold_partitions(user_email="carol@example.com") == []
+
+
+def test_query_window_reads_cold_partitions_and_pages(make_store, sample_booking):
+    """Windowed queries include archived bookings from the months they touch, in stable pages"""
+    store = make_store([
+        sample_booking(1, status="completed", start_time="2025-05-03T10:00:00Z", end_time="2025-05-03T12:00:00Z"),
+        sample_booking(2, status="completed", start_time="2025-05-04T10:00:00Z", end_time="2025-05-04T12:00:00Z"),
+        sample_booking(3, status="scheduled", start_time="2025-05-05T10:00:00Z", end_time="2025-05-05T12:00:00Z"),
+        sample_booking(4, status="scheduled", start_time="2025-09-01T10:00:00Z", end_time="2025-09-01T12:00:00Z"),
+    ])
+    store.archive_finished(now=to_epoch("2025-08-01T00:00:00Z"))
+
+    window = dict(start_time="2025-05-01T00:00:00Z", end_time="2025-06-01T00:00:00Z")
+    assert [b["booking_id"] for b in store.query(**window)] == ["book_001", "book_002", "book_003"]
+    assert [b["booking_id"] for b in store.query(statuses=["scheduled"], **window)] == ["book_003"]
+
+    first_page = store.query(limit=2, **window)
+    last = first_page[-1]
+    second_page = store.query(after=(to_epoch(last["start_time"]), last["booking_id"]), **window)
+    assert [b["booking_id"] for b in first_page + second_page] == ["book_001", "book_002", "book_003"]
+
+    # Without a window only the hot partition is searched
+    assert [b["booking_id"] for b in store.query()] == ["book_003", "book_004"]
+
+
+def test_add_booking_if_free_is_atomic(make_store, sample_booking):
+    """Of several sessions booking the same instance and window at once, exactly one succeeds"""
+    store = make_store([])
+    attempts = [sample_booking(n, start_time="2030-01-07T10:00:00Z", end_time="2030-01-07T14:00:00Z")
+                for n in range(1, 9)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        added = [b for b in pool.map(store.add_booking_if_free, attempts) if b is not None]
+
+    assert len(added) == 1 and len(store.bookings) == 1
+    later = sample_booking(9, start_time="2030-01-07T14:00:00Z", end_time="2030-01-07T16:00:00Z")
+    assert store.add_booking_if_free(later) is later
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
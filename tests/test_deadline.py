@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for request deadlines
+"""
+
+from deadline import MIN_CALL_SECONDS, Deadline, DeadlineStats
+from hpc_chatbot import CARD_TIMEOUT, HPC_ChatBot
+from llm_backend import FakeBackend
+
+BOOKING = {"booking_hash": "abc123", "user_name": "Ann Lee", "user_email": "ann@example.com",
+           "gpu_model": "H100", "gpu_id": "H100-001", "start_time": "2030-01-07T10:00:00Z",
+           "end_time": "2030-01-07T14:00:00Z", "total_cost": 64.0}
+
+
+def test_call_timeouts_shrink_with_the_deadline():
+    """Each call gets what is left of the deadline, capped, and none starts without time to finish"""
+    now = [0.0]
+    deadline = Deadline(25.0, clock=lambda: now[0])
+    assert deadline.timeout(45.0) == 25.0 and deadline.timeout(10.0) == 10.0
+    now[0] = 20.0
+    assert deadline.timeout(45.0) == 5.0 and deadline.allows_call()
+    now[0] = 25.0 - MIN_CALL_SECONDS / 2
+    assert not deadline.allows_call() and deadline.exceeded and not deadline.expired()
+
+
+def test_exceeded_and_late_requests_are_counted():
+    """Requests cut short and requests answered after their deadline both count as exceeded"""
+    now = [0.0]
+    stats = DeadlineStats()
+    on_time, cut_short, late = (Deadline(10.0, clock=lambda: now[0]) for _ in range(3))
+    stats.record_request(on_time)
+    cut_short.exceeded = True
+    stats.record_request(cut_short)
+    now[0] = 11.0
+    stats.record_request(late)
+    result = stats.get_stats()
+    assert (result["requests"], result["exceeded"], result["late"]) == (3, 2, 1)
+    assert result["exceeded_rate"] == round(2 / 3, 3)
+
+
+def test_booking_card_call_stays_within_the_deadline():
+    """The card request made from inside a booking tool is capped by, or skipped for, the request deadline"""
+    now = [0.0]
+    fake = FakeBackend()
+    chatbot = HPC_ChatBot(backend=fake)
+
+    chatbot._deadline = Deadline(25.0, clock=lambda: now[0])
+    now[0] = 20.0
+    card = chatbot.generate_booking_card_data(BOOKING)
+    assert fake.requests[-1]["timeout"] == 5.0 and card["booking_hash"] == "abc123"
+
+    now[0] = 25.0 - MIN_CALL_SECONDS / 2
+    card = chatbot.generate_booking_card_data(BOOKING)
+    assert len(fake.requests) == 1 and card["status"] == "CONFIRMED"
+    assert chatbot._deadline.exceeded
+
+    chatbot._deadline = None
+    chatbot.generate_booking_card_data(BOOKING)
+    assert fake.requests[-1]["timeout"] == CARD_TIMEOUT
+
+
+if __name__ == "__main__":
+    test_call_timeouts_shrink_with_the_deadline()
+    test_exceeded_and_late_requests_are_counted()
+    test_booking_card_call_stays_within_the_deadline()
+    print("All deadline tests passed!")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the semantic FAQ response cache
+"""
+
+import datetime
+
+from faq_cache import FAQCache, faq_cacheable, inventory_version, normalize
+
+NOW = datetime.datetime(2025, 7, 21, 8, 30, tzinfo=datetime.timezone.utc)
+MODELS = ["RTX-4090", "RTX-4080", "H100", "A100"]
+
+
+def test_only_generic_questions_are_cacheable():
+    """Personal, time-dependent and availability questions always go to the LLM"""
+    for question in ["What GPUs do you have?", "What's the price of a 4090?", "How do I cancel a booking?"]:
+        assert faq_cacheable(question, MODELS, NOW), question
+    for question in ["What is my bill?", "Is an H100 free tomorrow?", "bookings for ann@example.com",
+                     "How much is it?", "what can I book on July 30", "/clear"]:
+        assert not faq_cacheable(question, MODELS, NOW), question
+    assert normalize("  What's   the PRICE of a 4090?? ") == "what is the price of a 4090"
+
+
+def test_similar_questions_share_an_answer():
+    """Rephrasings above the threshold hit; a different model or number never does"""
+    cache = FAQCache()
+    cache.store("What is the price of a 4090?", "The RTX-4090 costs $2.50 per 30 minutes.", MODELS, "inv1", 3.0)
+    cache.store("How do I cancel a booking?", "Give me your booking hash and email.", MODELS, "inv1", 2.0)
+
+    assert cache.lookup("what is the price of a 4090", MODELS, "inv1")["similarity"] == 1.0
+    hit = cache.lookup("How can I cancel a booking?", MODELS, "inv1")
+    assert hit["answer"] == "Give me your booking hash and email." and hit["similarity"] >= cache.threshold
+    assert cache.lookup("What is the price of a 4080?", MODELS, "inv1") is None
+    assert cache.lookup("How do I book a GPU?", MODELS, "inv1") is None
+
+    stats = cache.get_stats()
+    assert (stats["exact_hits"], stats["similar_hits"], stats["misses"]) == (1, 1, 2)
+    assert stats["seconds_saved"] == 5.0
+
+
+def test_longer_or_reordered_questions_miss():
+    """Extra words, a negation or swapped models are different questions; only equal text is exact"""
+    cache = FAQCache()
+    cache.store("How do I cancel a booking?", "Give me your booking hash and email.", MODELS, "inv1")
+    cache.store("What GPUs do you have?", "RTX-4090, RTX-4080, H100 and A100.", MODELS, "inv1")
+    cache.store("Is H100 better than A100?", "Yes, for large models.", MODELS, "inv1")
+
+    assert cache.lookup("How do I not cancel a booking?", MODELS, "inv1") is None
+    assert cache.lookup("What GPUs do you have in Frankfurt with InfiniBand networking?", MODELS, "inv1") is None
+    assert cache.lookup("Is A100 better than H100?", MODELS, "inv1") is None
+    assert cache.lookup("How can I cancel a booking?", MODELS, "inv1")["similarity"] < 1.0
+
+    stats = cache.get_stats()
+    assert (stats["exact_hits"], stats["similar_hits"], stats["misses"]) == (0, 1, 3)
+
+
+def test_inventory_change_drops_answers():
+    """Answers are keyed to the inventory they were given for"""
+    inventory = {"gpu_models": {"H100": {"price_per_30min": 8.0}}}
+    old = inventory_version(inventory)
+    cache = FAQCache()
+    cache.store("What GPUs do you have?", "Just the H100.", ["H100"], old)
+
+    inventory["gpu_models"]["A100"] = {"price_per_30min": 5.0}
+    new = inventory_version(inventory)
+    assert new != old
+    assert cache.lookup("What GPUs do you have?", ["H100", "A100"], new) is None
+    assert cache.get_stats()["entries"] == 0 and cache.get_stats()["invalidations"] == 1
+
+
+if __name__ == "__main__":
+    test_only_generic_questions_are_cacheable()
+    test_similar_questions_share_an_answer()
+    test_longer_or_reordered_questions_miss()
+    test_inventory_change_drops_answers()
+    print("All FAQ cache tests passed!")
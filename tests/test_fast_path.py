@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the rule-based fast-path router
+"""
+
+import datetime
+
+from fast_path import FastPathRouter, confirmation_reply, extract_window
+from gpu_specs import build_spec_table
+
+# A Monday morning
+NOW = datetime.datetime(2025, 7, 21, 8, 30, tzinfo=datetime.timezone.utc)
+MODELS = ["H100", "A100", "RTX-4090"]
+
+
+def utc(day, hour, minute=0):
+    return datetime.datetime(2025, 7, day, hour, minute, tzinfo=datetime.timezone.utc)
+
+
+class InventoryOnly:
+    """Just enough of a chatbot for the availability template"""
+
+    def __init__(self):
+        instances = lambda prefix, n: [{"id": f"{prefix}-{i:03d}", "status": "available"} for i in range(n)]
+        self.gpu_data = {"gpu_models": {
+            "H100": {"name": "NVIDIA H100", "memory": "80GB HBM3", "description": "H100",
+                     "price_per_30min": 8.0, "cuda_cores": 16896, "instances": instances("H100", 3)},
+            "A100": {"name": "NVIDIA A100", "memory": "40GB HBM2e", "description": "A100",
+                     "price_per_30min": 5.0, "cuda_cores": 6912, "instances": instances("A100", 4)}
+        }}
+        self.gpu_specs = build_spec_table(self.gpu_data)
+        self.searches = []
+
+    def search_available_gpus(self, model=None, start_time=None, end_time=None):
+        self.searches.append((model, start_time, end_time))
+        return {"available_gpus": [{"model": "H100", "id": "H100-001"}, {"model": "H100", "id": "H100-002"}]}
+
+
+class PendingBooking:
+    """Just enough of a chatbot with a booking awaiting confirmation"""
+
+    def __init__(self):
+        self.pending_operation = "booking"
+        self.pending_data = {"gpu_model": "H100"}
+        self.calls = []
+
+    def confirm_operation(self, confirmed):
+        self.calls.append(confirmed)
+        self.pending_operation = None
+        if not confirmed:
+            return {"success": True, "message": "Booking cancelled by user request.", "cancelled": True}
+        booking = {"booking_id": "book_100", "booking_hash": "a" * 32, "gpu_model": "H100", "gpu_id": "H100-001",
+                   "start_time": "2030-01-07T10:00:00Z", "end_time": "2030-01-07T12:00:00Z", "total_cost": 32.0}
+        return {"success": True, "booking": booking, "message": "Booking created successfully!", "clear_history": True}
+
+
+def test_window_extraction():
+    """Relative days, weekdays, dates and hour ranges resolve to UTC windows"""
+    assert extract_window("free tomorrow 9-5?", NOW) == ((utc(22, 9), utc(22, 17)), True)
+    assert extract_window("any H100 on friday 2-5pm", NOW) == ((utc(25, 14), utc(25, 17)), True)
+    assert extract_window("july 30", NOW) == ((utc(30, 0), utc(31, 0)), True)
+    assert extract_window("h100 price", NOW) == (None, True)
+    # Something date-like that the rules cannot pin down is not understood
+    assert extract_window("is an a100 free at 3pm", NOW)[1] is False
+
+
+def test_only_simple_requests_match():
+    """Lookups match; bookings, cancellations and comparisons go to the LLM"""
+    router = FastPathRouter(clock=lambda: NOW)
+    matched = router.match("how many H100s are free tomorrow 9–5?", MODELS)
+    assert matched["intent"] == "availability"
+    assert matched["slots"]["model"] == "H100"
+    assert matched["slots"]["window"] == (utc(22, 9), utc(22, 17))
+
+    assert router.match("show my bookings for alice@example.com", MODELS)["intent"] == "booking_lookup"
+    assert router.match("what's the bill for alice@example.com", MODELS)["intent"] == "billing"
+    assert router.match("how much is an A100?", MODELS)["intent"] == "price"
+
+    for message in ["book an H100 tomorrow 9-5", "cancel my booking for alice@example.com",
+                    "H100 vs A100 price?", "are H100 or A100 free tomorrow", "/clear",
+                    "which gpu is best for training?"]:
+        assert router.match(message, MODELS) is None, message
+
+
+def test_route_answers_and_counts_hits():
+    """A hit calls the tool once and renders Markdown; stats track hits and misses"""
+    router = FastPathRouter(clock=lambda: NOW)
+    chatbot = InventoryOnly()
+    answer = router.route(chatbot, "how many H100s are free tomorrow 9-5?")
+    assert answer["tool"] == "search_available_gpus"
+    assert chatbot.searches == [("H100", "2025-07-22T09:00:00Z", "2025-07-22T17:00:00Z")]
+    assert "| **H100** | 2 of 3 |" in answer["markdown"]
+
+    assert router.route(chatbot, "book an H100 tomorrow") is None
+    router.record_llm_turn(3.0)
+    stats = router.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["by_intent"] == {"availability": 1}
+    assert 0 < stats["estimated_seconds_saved"] <= 3.0
+
+
+def test_confirmation_replies():
+    """Only whole-message yes/no replies execute a pending operation"""
+    assert confirmation_reply("Yes please!") is True
+    assert confirmation_reply("confirm") is True
+    assert confirmation_reply("No thanks.") is False
+    assert confirmation_reply("cancel") is None
+    assert confirmation_reply("yes, but make it 5pm") is None
+
+    router = FastPathRouter(clock=lambda: NOW)
+    chatbot = PendingBooking()
+    assert router.route_confirmation(chatbot, "yes but on an A100") is None
+    assert chatbot.calls == []
+
+    answer = router.route_confirmation(chatbot, "yes")
+    assert chatbot.calls == [True]
+    assert answer["tool"] == "confirm_operation" and answer["parameters"] == {"confirmed": True}
+    assert "`" + "a" * 32 + "`" in answer["markdown"]
+    # Nothing pending any more, so a second "yes" goes to the LLM
+    assert router.route_confirmation(chatbot, "yes") is None
+
+    declined = PendingBooking()
+    assert "not made" in router.route_confirmation(declined, "nope")["markdown"]
+    assert declined.calls == [False]
+    assert router.get_stats()["by_intent"] == {"confirm": 1, "decline": 1}
+
+
+if __name__ == "__main__":
+    test_window_extraction()
+    test_only_simple_requests_match()
+    test_route_answers_and_counts_hits()
+    test_confirmation_replies()
+    print("All fast-path tests passed!")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for per-model demand forecasting
+"""
+
+import datetime
+
+import pytest
+
+from booking_store import to_epoch
+from forecasting import DemandModel, forecast_demand, quietest_window
+
+GPU_DATA = {
+    "gpu_models": {
+        "H100": {"instances": [{"id": "H100-001"}, {"id": "H100-002"}]},
+        "A100": {"instances": [{"id": "A100-001"}]}
+    }
+}
+
+# Fit time: Monday 2025-09-01 00:00 UTC
+NOW = to_epoch("2025-09-01T00:00:00Z")
+
+
+def weekly_bookings(sample_booking, weeks=8, status="completed"):
+    """Both H100s booked every Monday 10:00-14:00 UTC for the weeks before NOW"""
+    bookings = []
+    for week in range(1, weeks + 1):
+        day = datetime.datetime(2025, 9, 1, tzinfo=datetime.timezone.utc) - datetime.timedelta(weeks=week)
+        for n, gpu_id in enumerate(("H100-001", "H100-002")):
+            start = day.replace(hour=10)
+            bookings.append(sample_booking(
+                week * 10 + n, gpu_id=gpu_id, status=status, total_cost=40.0,
+                start_time=start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                end_time=(start + datetime.timedelta(hours=4)).strftime('%Y-%m-%dT%H:%M:%SZ')))
+    return bookings
+
+
+def test_forecast_learns_weekly_seasonality(make_store, sample_booking):
+    """A recurring Monday peak is predicted for the next Monday and not for Tuesday"""
+    store = make_store(weekly_bookings(sample_booking))
+    forecast = forecast_demand(store, GPU_DATA, start_time="2025-09-01T00:00:00Z",
+                               end_time="2025-09-03T00:00:00Z", bucket="hour", now=NOW)
+
+    h100 = forecast["models"]["H100"]
+    monday_peak = h100["predicted_occupancy_pct"][10:14]
+    tuesday = h100["predicted_occupancy_pct"][24:48]
+    assert min(monday_peak) > 90
+    assert max(tuesday) < 10
+    assert h100["capacity_warning"] is True
+    assert h100["peak_hour"].startswith("2025-09-01T1")
+    assert forecast["models"]["A100"]["peak_occupancy_pct"] == 0.0
+
+
+def test_quietest_window_avoids_peak_and_respects_existing_bookings(make_store, sample_booking):
+    """Suggested windows skip the predicted peak; future bookings raise the forecast"""
+    store = make_store(weekly_bookings(sample_booking))
+    demand = DemandModel(store, GPU_DATA, now=NOW)
+    window = quietest_window(demand, "H100", 4, NOW + 8 * 3600, horizon_days=1)
+    assert not (to_epoch(window["start_time"]) < NOW + 14 * 3600 and to_epoch(window["end_time"]) > NOW + 10 * 3600)
+
+    booked = store.add_booking(dict(weekly_bookings(sample_booking, 1, status="scheduled")[0],
+                                    booking_id="book_999", booking_hash="hash999",
+                                    start_time="2025-09-02T10:00:00Z", end_time="2025-09-02T12:00:00Z"))
+    assert booked["status"] == "scheduled"
+    forecast = forecast_demand(store, GPU_DATA, model="H100", start_time="2025-09-02T10:00:00Z",
+                               end_time="2025-09-02T12:00:00Z", bucket="hour", now=NOW)
+    # One of two instances is already booked, so at least 50% is predicted
+    assert min(forecast["models"]["H100"]["predicted_occupancy_pct"]) >= 50.0
+    assert forecast["models"]["H100"]["already_booked_pct"] == 50.0
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the GPU spec table and workload-driven recommender
+"""
+
+from gpu_specs import build_spec_table, estimate_requirements, parse_vram_gb, score_models
+
+
+def inventory_model(name, memory, price_per_30min, cuda_cores, instances):
+    return {
+        "name": name,
+        "memory": memory,
+        "description": name,
+        "price_per_30min": price_per_30min,
+        "cuda_cores": cuda_cores,
+        "instances": [{"id": f"{name}-{n:03d}", "status": "available"} for n in range(instances)]
+    }
+
+
+GPU_DATA = {
+    "gpu_models": {
+        "RTX-4090": inventory_model("NVIDIA GeForce RTX 4090", "24GB GDDR6X", 2.5, 16384, 5),
+        "RTX-3080": inventory_model("NVIDIA GeForce RTX 3080", "10GB GDDR6X", 1.3, 8704, 12),
+        "V100": inventory_model("NVIDIA Tesla V100", "32GB HBM2", 3.0, 5120, 6),
+        "H100": inventory_model("NVIDIA H100 Tensor Core", "80GB HBM3", 8.0, 16896, 3)
+    }
+}
+
+
+def test_spec_table_parses_inventory_once():
+    """VRAM, hourly price and datacenter flag are parsed into the table"""
+    specs = build_spec_table(GPU_DATA)
+    assert parse_vram_gb("24GB GDDR6X") == 24.0
+    assert specs["by_model"]["H100"]["vram_gb"] == 80.0
+    assert specs["by_model"]["RTX-3080"]["price_per_hour"] == 2.6
+    assert specs["by_model"]["V100"]["datacenter"] is True
+    assert specs["by_model"]["RTX-4090"]["datacenter"] is False
+    assert list(specs["vram_gb"]) == [24.0, 10.0, 32.0, 80.0]
+
+
+def test_llm_requirements_follow_model_size():
+    """VRAM scales with the parameter count; big models span several GPUs"""
+    specs = build_spec_table(GPU_DATA)
+
+    small = estimate_requirements("LLaMA 8B training")
+    assert small["workload"] == "llm_training"
+    ranked = score_models(specs, small)
+    assert ranked[0]["model"] == "RTX-4090"
+    assert "RTX-3080" not in [r["model"] for r in ranked if r["instances_needed"] == 1]
+
+    medium = estimate_requirements("llama 13b fine-tuning")
+    assert score_models(specs, medium)[0]["model"] == "V100"
+
+    large = score_models(specs, estimate_requirements("LLaMA 70B inference"))
+    assert large[0]["model"] == "H100"
+    assert large[0]["instances_needed"] == 3
+
+    # An explicit memory requirement overrides the estimate (e.g. quantised models)
+    assert estimate_requirements("LLaMA 70B inference", memory_requirement=40)["required_vram_gb"] == 40
+
+
+def test_scoring_respects_budget_and_workload():
+    """Budget filters on total hourly price; gaming only gets consumer cards"""
+    specs = build_spec_table(GPU_DATA)
+    gaming = score_models(specs, estimate_requirements("gaming"))
+    assert {r["model"] for r in gaming} == {"RTX-4090", "RTX-3080"}
+
+    cheap = score_models(specs, estimate_requirements("deep learning training"), budget_per_hour=6.0)
+    assert {r["model"] for r in cheap} == {"RTX-4090", "V100"}
+    assert all(r["price_per_hour"] <= 6.0 for r in cheap)
+
+    # Not enough instances left to split the job across
+    assert score_models(specs, estimate_requirements("LLaMA 70B inference"), max_instances={"H100": 2})[0]["model"] != "H100"
+
+
+if __name__ == "__main__":
+    test_spec_table_parses_inventory_once()
+    test_llm_requirements_follow_model_size()
+    test_scoring_respects_budget_and_workload()
+    print("All GPU spec tests passed!")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged LLM requests against a local stub server with injected latency
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hedging import Hedger
+from llm_client import PoolStats, create_llm_client
+
+
+class SlowCompletionHandler(BaseHTTPRequestHandler):
+    """Answers chat completions, sleeping for the next injected delay first"""
+    protocol_version = "HTTP/1.1"
+    delays = []
+    served = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        number = len(self.served) + 1
+        self.served.append(number)
+        time.sleep(self.delays.pop(0) if self.delays else 0.0)
+        body = json.dumps({
+            "id": f"chatcmpl-{number}", "object": "chat.completion", "created": 0, "model": "deepseek-chat",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"answer {number}"}}]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_against_stub(delays, hedger, calls):
+    """Make `calls` completions through the hedger; returns (contents, seconds of the last call)"""
+    SlowCompletionHandler.delays = list(delays)
+    SlowCompletionHandler.served = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowCompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = create_llm_client("test", base_url=f"http://127.0.0.1:{server.server_port}", http2=False,
+                               stats=PoolStats())
+    contents = []
+    try:
+        for _ in range(calls):
+            started = time.monotonic()
+            response = hedger.create(client.chat.completions.create, model="deepseek-chat",
+                                     messages=[{"role": "user", "content": "ping"}], timeout=10.0)
+            contents.append(response.choices[0].message.content)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return contents, time.monotonic() - started
+
+
+def test_slow_completion_is_hedged():
+    """A completion stuck past the threshold loses to its duplicate"""
+    hedger = Hedger(min_samples=5, min_delay=0.2, max_hedge_rate=0.5)
+    # Five quick warm-up calls, then one that would take 3 seconds
+    contents, seconds = run_against_stub([0.01] * 5 + [3.0], hedger, calls=6)
+
+    assert seconds < 1.5
+    assert contents[-1] == "answer 7"
+    stats = hedger.get_stats()
+    assert (stats["calls"], stats["hedged"], stats["hedge_wins"], stats["abandoned"]) == (6, 1, 1, 1)
+    assert stats["threshold_seconds"] >= 0.2
+
+
+def test_hedge_rate_cap():
+    """Once the cap is reached slow completions are waited out instead of duplicated"""
+    hedger = Hedger(min_samples=5, min_delay=0.2, max_hedge_rate=0.1)
+    contents, seconds = run_against_stub([0.01] * 5 + [0.6], hedger, calls=6)
+
+    assert seconds >= 0.6 and contents[-1] == "answer 6"
+    stats = hedger.get_stats()
+    assert stats["hedged"] == 0 and stats["capped"] == 1
+
+
+def test_disabled_or_warming_up():
+    """No duplicate is sent while hedging is off or too few latencies are known"""
+    for hedger in (Hedger(enabled=False, min_samples=0), Hedger(min_samples=50)):
+        calls = []
+        hedger.create(lambda **request: calls.append(request) or "done", timeout=5.0)
+        assert len(calls) == 1 and hedger.get_stats()["hedged"] == 0
+
+
+def test_concurrent_calls_do_not_queue_into_hedges():
+    """Many concurrent completions each run at once, so none waits past the threshold and gets hedged"""
+    hedger = Hedger(min_samples=5, min_delay=0.5, max_hedge_rate=1.0)
+    for _ in range(5):
+        hedger.create(lambda **request: "warm", timeout=5.0)
+    threads = [threading.Thread(target=hedger.create, args=(lambda **request: time.sleep(0.2),), kwargs={"timeout": 5.0})
+               for _ in range(80)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = hedger.get_stats()
+    assert stats["calls"] == 85 and stats["hedged"] == 0
+
+
+def test_hedge_goes_through_hedge_create():
+    """The duplicate is sent with hedge_create, so a router can send it to another endpoint"""
+    hedger = Hedger(min_samples=5, min_delay=0.2, max_hedge_rate=0.5)
+    for _ in range(5):
+        hedger.create(lambda **request: "warm", timeout=5.0)
+    response = hedger.create(lambda **request: time.sleep(2.0) or "slow", hedge_create=lambda **request: "elsewhere",
+                             timeout=5.0)
+    assert response == "elsewhere" and hedger.get_stats()["hedge_wins"] == 1
+
+
+if __name__ == "__main__":
+    test_slow_completion_is_hedged()
+    test_hedge_rate_cap()
+    test_disabled_or_warming_up()
+    test_concurrent_calls_do_not_queue_into_hedges()
+    test_hedge_goes_through_hedge_create()
+    print("All hedging tests passed!")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the completion-backend interface and the in-process fake backend,
+driving the tool loop and the Flask chat path without a network
+"""
+
+import itertools
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from hpc_chatbot import HPC_ChatBot
+from llm_backend import FakeBackend, FakeTimeout, failure, text, tool_call
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Far enough ahead that no booking in bookings.json overlaps it
+START = "2030-01-07T10:00:00Z"
+END = "2030-01-07T14:00:00Z"
+
+
+def test_fake_backend_script():
+    """Scripted steps come back in order with simulated latency; slow steps time out"""
+    slept = []
+    fake = FakeBackend([text("hello", latency=0.5), failure(ConnectionError("reset")),
+                        tool_call("get_current_datetime", latency=9.0)], sleep=slept.append)
+
+    assert fake.complete(messages=[]).choices[0].message.content == "hello"
+    for expected in (ConnectionError, FakeTimeout):
+        try:
+            fake.complete(messages=[], timeout=2.0)
+            assert False, "expected an error"
+        except expected:
+            pass
+    assert fake.complete(messages=[]).choices[0].message.content == "OK"
+    assert slept == [0.5, 2.0]
+    stats = fake.get_stats()
+    assert (stats["completions"], stats["errors"], stats["timeouts"]) == (4, 1, 1)
+
+
+def test_tool_loop_offline():
+    """A full LLM turn with a real tool call runs against the fake, and the session still pickles"""
+    fake = FakeBackend([tool_call("search_available_gpus", model="H100", start_time=START, end_time=END),
+                        text("Yes, H100s are free then.", prompt_tokens=900, completion_tokens=8)])
+    chatbot = HPC_ChatBot(backend=fake)
+    reply = chatbot.send_message_to_ai("My team needs an H100 on 2030-01-07 from 10:00 to 14:00, is that ok?")
+
+    assert reply == "Yes, H100s are free then."
+    assert len(fake.requests) == 2 and "model" not in fake.requests[0]
+    tool_message = fake.requests[1]["messages"][-1]
+    assert tool_message["role"] == "tool" and json.loads(tool_message["content"])["available_gpus"]
+    assert [m["role"] for m in chatbot.conversation_history] == ["user", "assistant", "tool", "assistant"]
+
+    restored = pickle.loads(pickle.dumps(chatbot))
+    assert restored.conversation_history == chatbot.conversation_history and restored._backend is None
+
+
+FLASK_SCRIPT = r"""
+import itertools
+import json
+import threading
+from llm_backend import FakeBackend, set_backend, tool_call
+
+set_backend(FakeBackend([tool_call("prepare_booking_confirmation", gpu_model="H100", user_name="Ann Lee",
+                                   user_email="ann@example.com", start_time="%(start)s", end_time="%(end)s")]))
+import app
+
+# Only `python app.py` starts the scheduler; importing app (as the reloader's parent does) must not
+scheduler_threads = [t.name for t in threading.enumerate() if t.name == 'booking-scheduler']
+client = app.app.test_client()
+first = client.post('/api/chat', json={'message': 'Please book an H100 for Ann Lee, ann@example.com, on my usual day'})
+second = client.post('/api/chat', json={'message': 'yes'})
+with open('bookings.json') as f:
+    saved = [b for b in json.load(f) if b.get('user_email') == 'ann@example.com']
+metrics = client.get('/debug/metrics').json
+print("RESULT " + json.dumps({'first': first.json, 'second': second.json, 'saved': saved,
+                             'backend': metrics['llm_backend'],
+                             'scheduler_threads': scheduler_threads}))
+""" % {"start": START, "end": END}
+
+
+def test_flask_booking_offline():
+    """A booking made through /api/chat is confirmed and saved, with the fake standing in for the LLM"""
+    # The app's scheduler and store write next to their working directory, so run on a copy
+    directory = tempfile.mkdtemp()
+    try:
+        for name in ("bookings.json", "gpu_inventory.json"):
+            shutil.copy(os.path.join(REPO, name), directory)
+        env = dict(os.environ, PYTHONPATH=REPO)
+        output = subprocess.run([sys.executable, "-c", FLASK_SCRIPT], cwd=directory, env=env,
+                                capture_output=True, text=True, timeout=120)
+        assert output.returncode == 0, output.stderr
+        result = json.loads(output.stdout.split("RESULT ", 1)[1])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    # The confirmation summary is passed through, then "yes" goes through the fast path
+    assert "H100" in result["first"]["response"]
+    assert len(result["saved"]) == 1 and result["saved"][0]["start_time"] == START
+    # The tool call, then the booking card request (its non-JSON answer falls back to the manual card)
+    assert result["backend"]["backend"] == "fake" and result["backend"]["completions"] == 2
+    assert result["scheduler_threads"] == []
+
+
+def test_chat_path_benchmark():
+    """Engine overhead per LLM turn (tool round included) with a zero-latency backend"""
+    sizes = itertools.count(7)
+
+    def responder(request):
+        if request["messages"][-1]["role"] == "tool":
+            return text("Here is what I found.")
+        # A new use case each turn, so every tool call runs instead of hitting the tool cache
+        return tool_call("get_gpu_recommendations", use_case=f"LLaMA {next(sizes)}B fine-tuning")
+
+    chatbot = HPC_ChatBot(backend=FakeBackend(responder=responder))
+    turns = 20
+    started = time.perf_counter()
+    replies = [chatbot.send_message_to_ai(f"Which GPU suits my project number {n}?") for n in range(turns)]
+    per_turn = (time.perf_counter() - started) / turns
+    # Timing is only reported; how fast a shared CI machine runs is not a test failure
+    print(f"Chat path: {per_turn * 1000:.1f} ms per turn (2 completions, 1 tool call)")
+    assert replies == ["Here is what I found."] * turns
+
+if __name__ == "__main__":
+    test_fake_backend_script()
+    test_tool_loop_offline()
+    test_flask_booking_offline()
+    test_chat_path_benchmark()
+    print("All LLM backend tests passed!")
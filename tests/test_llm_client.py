@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared, pooled LLM client
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_client import PoolStats, create_llm_client
+
+COMPLETION = {
+    "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "deepseek-chat",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "pong"}}],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6}
+}
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """Answers every chat completion with 'pong' over a keep-alive HTTP/1.1 connection"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(COMPLETION).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_requests_reuse_one_connection():
+    """Sequential calls on the pooled client share a single keep-alive connection"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        stats = PoolStats()
+        client = create_llm_client("test", base_url=f"http://127.0.0.1:{server.server_port}",
+                                   http2=False, stats=stats)
+        for _ in range(3):
+            response = client.chat.completions.create(model="deepseek-chat",
+                                                      messages=[{"role": "user", "content": "ping"}])
+            assert response.choices[0].message.content == "pong"
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    result = stats.get_stats()
+    assert (result["requests"], result["responses"], result["new_connections"]) == (3, 3, 1)
+    assert result["reused_connections"] == 2 and result["reuse_rate"] == round(2 / 3, 3)
+    assert result["http_versions"] == {"HTTP/1.1": 3} and result["tls_handshakes"] == 0
+
+
+if __name__ == "__main__":
+    test_requests_reuse_one_connection()
+    print("All LLM client tests passed!")
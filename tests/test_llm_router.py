@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for the multi-endpoint LLM router against local stub endpoints
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from types import SimpleNamespace
+
+from llm_router import LATENCY_STALE_SECONDS, Endpoint, LLMRouter, build_router
+
+
+def stub_endpoint(name, delay=0.0, status=200):
+    """Local OpenAI-compatible endpoint answering with its name after `delay` seconds"""
+    models = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            models.append(request["model"])
+            time.sleep(delay)
+            if status == 200:
+                body = {"id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": request["model"],
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": name}}]}
+            else:
+                body = {"error": {"message": "overloaded", "type": "server_error"}}
+            body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = {"name": name, "base_url": f"http://127.0.0.1:{server.server_port}", "model": f"{name}-model",
+              "api_key": "test"}
+    return server, config, models
+
+
+def ask(router):
+    response = router.complete(messages=[{"role": "user", "content": "ping"}], timeout=10.0)
+    return response.choices[0].message.content
+
+
+def test_routes_to_the_fastest_endpoint():
+    """Both endpoints are tried once, then calls go to the one with the lower average latency; hedges to the other"""
+    slow, slow_config, slow_models = stub_endpoint("self-hosted", delay=0.2)
+    fast, fast_config, fast_models = stub_endpoint("public", delay=0.0)
+    try:
+        router = build_router([slow_config, fast_config])
+        answers = [ask(router) for _ in range(5)]
+        # A hedged duplicate avoids the endpoint the slow request most likely went to
+        hedged = router.hedge(messages=[{"role": "user", "content": "ping"}], timeout=10.0)
+    finally:
+        for server in (slow, fast):
+            server.shutdown()
+            server.server_close()
+
+    assert answers == ["self-hosted", "public", "public", "public", "public"]
+    assert hedged.choices[0].message.content == "self-hosted"
+    # Each endpoint is asked for its own model
+    assert slow_models == ["self-hosted-model"] * 2 and set(fast_models) == {"public-model"}
+    endpoints = {e["name"]: e for e in router.get_stats()["endpoints"]}
+    assert endpoints["self-hosted"]["ewma_latency"] > endpoints["public"]["ewma_latency"]
+
+
+def test_failover_and_unhealthy_endpoint():
+    """A failing endpoint's call is retried on the next one, and it is skipped after repeated errors"""
+    broken, broken_config, broken_models = stub_endpoint("self-hosted", status=503)
+    backup, backup_config, _ = stub_endpoint("public")
+    try:
+        router = build_router([broken_config, backup_config])
+        answers = [ask(router) for _ in range(4)]
+    finally:
+        for server in (broken, backup):
+            server.shutdown()
+            server.server_close()
+
+    assert answers == ["public"] * 4
+    # Tried first while untried, and once more before its error rate marked it unhealthy
+    assert len(broken_models) == 2
+    endpoints = {e["name"]: e for e in router.get_stats()["endpoints"]}
+    assert not endpoints["self-hosted"]["healthy"] and endpoints["public"]["healthy"]
+    assert endpoints["public"]["failovers"] == 2 and endpoints["public"]["errors"] == 0
+
+
+def test_slow_sample_is_probed_again():
+    """One cold-start sample does not starve an endpoint: once its average is stale it gets a probe call"""
+    now = [0.0]
+    latencies = {"self-hosted": [5.0, 0.1, 0.1, 0.1], "public": [0.5] * 10}
+    served = []
+
+    def endpoint(name):
+        def create(**request):
+            served.append(name)
+            now[0] += latencies[name].pop(0)
+            return name
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        return Endpoint(name, f"http://{name}", f"{name}-model", client)
+
+    router = LLMRouter([endpoint("self-hosted"), endpoint("public")], clock=lambda: now[0])
+    for _ in range(4):
+        router.complete(messages=[])
+    assert served == ["self-hosted", "public", "public", "public"]
+
+    # Stale for the endpoint measured only at the start, not for the one in use since
+    now[0] += LATENCY_STALE_SECONDS - 1.0
+    assert [router.complete(messages=[]) for _ in range(3)] == ["self-hosted", "self-hosted", "self-hosted"]
+    stats = {e["name"]: e for e in router.get_stats()["endpoints"]}
+    assert stats["self-hosted"]["probes"] == 1 and stats["self-hosted"]["ewma_latency"] == 0.1
+
+
+if __name__ == "__main__":
+    test_routes_to_the_fastest_endpoint()
+    test_failover_and_unhealthy_endpoint()
+    test_slow_sample_is_probed_again()
+    print("All LLM router tests passed!")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for overtime metering
+"""
+
+import json
+
+import pytest
+
+from overtime_meter import OvertimeMeter, generate_usage_events
+
+GPU_DATA = {
+    "gpu_models": {
+        "H100": {"price_per_30min": 8.00, "overtime_multiplier": 2.0, "time_unit": 30, "instances": [{"id": "H100-001"}]}
+    }
+}
+
+
+
+
+
+
+def test_overtime_billed_in_time_units(make_store, sample_booking):
+    """A session running 40 minutes past the end is billed as two 30-minute units at the overtime rate"""
+    store = make_store([sample_booking(status="active")])
+    meter = OvertimeMeter(store=store, gpu_data=GPU_DATA, batch_size=1)
+    meter.run([
+        {"event": "session_start", "session_id": "s1", "gpu_id": "H100-001", "timestamp": "2025-07-20T10:05:00Z"},
+        {"event": "session_stop", "session_id": "s1", "gpu_id": "H100-001", "timestamp": "2025-07-20T18:40:00Z"},
+    ])
+
+    booking = store.get("hash001")
+    assert booking["overtime_minutes"] == 40
+    assert booking["overtime_cost"] == 2 * 8.00 * 2.0
+
+    with open(store.path) as f:
+        assert json.load(f)[0]["overtime_minutes"] == 40
+
+
+def test_on_time_session_has_no_overtime(make_store, sample_booking):
+    """Sessions ending before the booking end leave overtime at zero"""
+    store = make_store([sample_booking(status="active")])
+    meter = OvertimeMeter(store=store, gpu_data=GPU_DATA)
+    meter.run([
+        {"event": "session_start", "session_id": "s1", "gpu_id": "H100-001", "timestamp": "2025-07-20T10:00:00Z"},
+        {"event": "session_stop", "session_id": "s1", "gpu_id": "H100-001", "timestamp": "2025-07-20T17:30:00Z"},
+    ], save=False)
+
+    assert store.get("hash001")["overtime_minutes"] == 0
+    assert meter.get_stats()["sessions_matched"] == 1
+
+
+def test_open_sessions_are_bounded(make_store, sample_booking):
+    """The open-session table never grows past its cap"""
+    store = make_store([sample_booking(status="active")])
+    meter = OvertimeMeter(store=store, gpu_data=GPU_DATA, max_open_sessions=5)
+    events = [{"event": "session_start", "session_id": f"s{i}", "gpu_id": "H100-001",
+               "timestamp": "2025-07-20T11:00:00Z"} for i in range(20)]
+    meter.run(events, save=False)
+
+    stats = meter.get_stats()
+    assert stats["open_sessions"] == 5
+    assert stats["sessions_dropped"] == 15
+
+
+def test_generated_events_are_time_ordered(sample_booking):
+    """The local generator emits a start and a stop per live booking in timestamp order"""
+    bookings = [sample_booking(i, status="active", start_time=f"2025-07-2{i}T10:00:00Z",
+                               end_time=f"2025-07-2{i}T12:00:00Z") for i in range(5)]
+    events = list(generate_usage_events(bookings, seed=1))
+
+    assert len(events) == 10
+    timestamps = [e["timestamp"] for e in events]
+    assert timestamps == sorted(timestamps)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(["-q", __file__]))
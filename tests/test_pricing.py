@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the central pricing engine
+"""
+
+from hpc_chatbot import HPC_ChatBot
+from llm_backend import FakeBackend
+from pricing import PricingEngine
+
+GPU_DATA = {
+    "gpu_models": {
+        "H100": {"price_per_30min": 8.0, "min_booking_time": 60, "time_unit": 30, "overtime_multiplier": 2.0},
+        "RTX-4090": {"price_per_30min": 2.5, "min_booking_time": 30, "time_unit": 15, "overtime_multiplier": 1.5}
+    }
+}
+
+
+def test_quotes_apply_minimum_and_unit_rounding():
+    """Short bookings pay the minimum; partial units round up"""
+    pricing = PricingEngine(GPU_DATA)
+
+    # 20 minutes on an H100 is billed as the 60-minute minimum
+    short = pricing.quote("H100", "2025-07-21T10:00:00Z", "2025-07-21T10:20:00Z")
+    assert short["billed_minutes"] == 60
+    assert short["total_cost"] == 16.0
+
+    # 100 minutes in 15-minute units is 7 units = 105 minutes at $1.25 per unit
+    rounded = pricing.quote("RTX-4090", "2025-07-21T10:00:00Z", "2025-07-21T11:40:00Z")
+    assert rounded["units"] == 7
+    assert rounded["total_cost"] == 8.75
+
+    # Exact multiples are not rounded up
+    assert pricing.quote("H100", "2025-07-21T10:00:00Z", "2025-07-21T18:00:00Z")["total_cost"] == 128.0
+
+
+def test_quote_many_matches_single_quotes():
+    """The vectorised call gives the same prices as quoting candidates one by one"""
+    pricing = PricingEngine(GPU_DATA)
+    candidates = [
+        {"gpu_model": model, "start_time": "2025-07-21T10:00:00Z", "end_time": f"2025-07-21T{10 + hours:02d}:10:00Z",
+         "instances": instances}
+        for model in ("H100", "RTX-4090") for hours in range(0, 6) for instances in (1, 3)
+    ]
+    bulk = pricing.quote_many([c["gpu_model"] for c in candidates], [c["start_time"] for c in candidates],
+                              [c["end_time"] for c in candidates], [c["instances"] for c in candidates])
+    bulk = bulk["total_cost"].tolist()
+    single = [pricing.quote(c["gpu_model"], c["start_time"], c["end_time"], c["instances"])["total_cost"]
+              for c in candidates]
+    assert bulk == single
+    assert bulk[0] == 16.0 and bulk[1] == 48.0
+
+
+def test_overtime_uses_multiplier_without_minimum():
+    """Overtime bills every started unit at the overtime multiplier"""
+    pricing = PricingEngine(GPU_DATA)
+    assert list(pricing.overtime_costs(["H100", "H100"], [0, 1])) == [0.0, 16.0]
+    assert list(pricing.overtime_costs(["RTX-4090", "RTX-4090"], [15, 16])) == [1.88, 3.75]
+
+
+def test_unparsed_times_get_the_format_message():
+    """Times are validated before an instance is picked, so free text gets the prepared message"""
+    chatbot = HPC_ChatBot(backend=FakeBackend())
+    for gpu_id in (None, "H100-001"):
+        result = chatbot.prepare_booking_confirmation("H100", gpu_id=gpu_id, user_name="Ann Lee",
+                                                      user_email="ann@example.com", start_time="tomorrow 9am",
+                                                      end_time="tomorrow 5pm")
+        assert not result["success"] and result["message"].startswith("Invalid time format"), result
+    assert chatbot.pending_operation is None
+
+
+if __name__ == "__main__":
+    test_quotes_apply_minimum_and_unit_rounding()
+    test_quote_many_matches_single_quotes()
+    test_overtime_uses_multiplier_without_minimum()
+    test_unparsed_times_get_the_format_message()
+    print("All pricing tests passed!")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test script for the combined recommend-and-check-availability tool
+"""
+
+from hpc_chatbot import HPC_ChatBot
+
+# Far enough ahead that no booking in bookings.json overlaps it
+START = "2030-01-07T10:00:00Z"
+END = "2030-01-07T14:00:00Z"
+
+
+def test_options_include_free_instances_and_quote():
+    """One call returns ranked models, free instance IDs and the price for the window"""
+    chatbot = HPC_ChatBot()
+    result = chatbot.recommend_and_check_availability("LLaMA 8B training", START, END)
+
+    assert result["success"] is True
+    assert result["workload"] == "llm_training"
+    assert result["duration_hours"] == 4.0
+    assert result["options"], "expected at least one option"
+
+    best = result["options"][0]
+    spec = chatbot.gpu_specs["by_model"][best["model"]]
+    assert best["bookable"] is True
+    assert best["free_instances"] == len(spec["instance_ids"])
+    assert len(best["gpu_ids"]) == best["instances_needed"]
+    assert best["quote"] == round(4 * 2 * spec["price_per_30min"] * best["instances_needed"], 2)
+
+
+def test_invalid_window_is_rejected():
+    """Reversed or malformed windows return an error instead of options"""
+    chatbot = HPC_ChatBot()
+    assert chatbot.recommend_and_check_availability("gaming", END, START)["success"] is False
+    assert chatbot.recommend_and_check_availability("gaming", "tomorrow", END)["success"] is False
+
+
+if __name__ == "__main__":
+    test_options_include_free_instances_and_quote()
+    test_invalid_window_is_rejected()
+    print("All recommend-and-check tests passed!")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM retry policy: backoff, retry budget and circuit breaker
+"""
+
+import random
+
+from retry_policy import RetryPolicy, classify
+
+
+def status_error(status):
+    error = Exception(f"HTTP {status}")
+    error.status_code = status
+    return error
+
+
+def test_error_classification():
+    """Timeouts, connection failures, 429 and 5xx are retried; other 4xx errors are not"""
+    for error in (None, TimeoutError("timed out"), ConnectionError("reset"), status_error(429), status_error(503)):
+        assert classify(error) == "retryable", error
+    for error in (status_error(400), status_error(401), ValueError("bad arguments")):
+        assert classify(error) == "fatal", error
+
+
+def test_full_jitter_backoff():
+    """Delays are spread over [0, cap] and the cap doubles up to the maximum"""
+    policy = RetryPolicy(base_delay=0.5, max_delay=4.0, retry_burst=1000, rng=random.Random(7))
+    for attempt, cap in ((1, 0.5), (2, 1.0), (3, 2.0), (4, 4.0), (8, 4.0)):
+        delays = [policy.next_delay(attempt, TimeoutError()) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert max(delays) > 0.8 * cap and min(delays) < 0.2 * cap
+    assert policy.next_delay(1, status_error(400)) is None
+
+
+def test_retry_budget():
+    """Beyond the burst, retries are limited to a fraction of first attempts"""
+    policy = RetryPolicy(retry_ratio=0.1, retry_burst=2, min_calls=10 ** 6)
+    assert [policy.next_delay(1, TimeoutError()) is not None for _ in range(3)] == [True, True, False]
+    for _ in range(10):
+        policy.record()
+    assert policy.next_delay(1, TimeoutError()) is not None
+    assert policy.next_delay(1, TimeoutError()) is None
+    stats = policy.get_stats()
+    assert stats["retries"] == 3 and stats["budget_denied"] == 2
+
+
+def test_circuit_breaker():
+    """The breaker opens on a high failure rate, rejects calls, then closes after a good probe"""
+    now = [0.0]
+    policy = RetryPolicy(min_calls=4, failure_rate=0.5, open_seconds=30, clock=lambda: now[0])
+    for error in (None, TimeoutError(), None, status_error(400)):
+        assert policy.allow_call()
+        policy.record(error)
+    assert policy.get_stats()["state"] == "closed"
+    policy.record(status_error(502))
+    policy.record(TimeoutError())
+    assert policy.get_stats()["state"] == "open"
+    assert not policy.allow_call()
+
+    now[0] = 31
+    assert policy.allow_call()
+    # Only one probe at a time while half-open
+    assert not policy.allow_call()
+    policy.record(TimeoutError())
+    assert policy.get_stats()["state"] == "open"
+
+    now[0] = 62
+    assert policy.allow_call()
+    policy.record()
+    stats = policy.get_stats()
+    assert stats["state"] == "closed" and stats["breaker_opened"] == 2 and stats["rejected"] == 2
+
+
+if __name__ == "__main__":
+    test_error_classification()
+    test_full_jitter_backoff()
+    test_retry_budget()
+    test_circuit_breaker()
+    print("All retry policy tests passed!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for speculative read-only tool execution
+"""
+
+import datetime
+import threading
+from concurrent.futures import wait
+
+from speculation import SpeculativeExecutor, argument_key, predict_tool_calls
+
+NOW = datetime.datetime(2025, 7, 21, 8, 30, tzinfo=datetime.timezone.utc)
+MODELS = ["H100", "A100", "RTX-4090"]
+
+
+class Store:
+    def __init__(self):
+        self.version = 0
+
+    def version_tag(self):
+        return f"test.{self.version}"
+
+
+class LookupChatBot:
+    """Chatbot surface the speculator uses, counting real tool executions"""
+
+    def __init__(self):
+        self.gpu_data = {"gpu_models": {model: {} for model in MODELS}}
+        self.store = Store()
+        self.executed = []
+
+    def search_available_gpus(self, model=None, start_time=None, end_time=None):
+        self.executed.append(("search_available_gpus", model))
+        return {"available_gpus": [{"model": model, "id": f"{model}-001"}]}
+
+    def query_booking_info(self, user_email=None, booking_hash=None):
+        self.executed.append(("query_booking_info", user_email))
+        return {"bookings": []}
+
+    def execute_function(self, name, parameters):
+        return getattr(self, name)(**parameters)
+
+
+def started(speculation):
+    """Wait for the speculative calls to finish, so that take() does not find them still queued"""
+    wait(speculation.pending.values())
+    return speculation
+
+
+def test_predictions_from_message():
+    """Models, windows, emails and hashes turn into read-only tool calls"""
+    calls = predict_tool_calls("book an H100 tomorrow 9-5 for ann@example.com", MODELS, NOW)
+    assert calls == [
+        ("search_available_gpus", {"model": "H100", "start_time": "2025-07-22T09:00:00Z",
+                                   "end_time": "2025-07-22T17:00:00Z"}),
+        ("query_booking_info", {"user_email": "ann@example.com"})
+    ]
+    assert predict_tool_calls("what's my bill? ann@example.com", MODELS, NOW) == \
+        [("calculate_billing", {"user_email": "ann@example.com"})]
+    assert predict_tool_calls("hello there", MODELS, NOW) == []
+    # Two models: the model could ask for either, so nothing is guessed
+    assert predict_tool_calls("H100 or A100 tomorrow?", MODELS, NOW) == []
+
+
+def test_argument_key_normalises():
+    """Model case, time zone spelling and empty arguments do not matter; email case does"""
+    ours = argument_key("search_available_gpus", {"model": "H100", "start_time": "2025-07-22T09:00:00Z"})
+    theirs = argument_key("search_available_gpus",
+                          {"model": "h100", "start_time": "2025-07-22T09:00:00+00:00", "min_memory": None})
+    assert ours == theirs
+    assert ours != argument_key("search_available_gpus", {"model": "A100", "start_time": "2025-07-22T09:00:00Z"})
+    # The booking tools match emails and hashes exactly, so their case is kept
+    assert argument_key("query_booking_info", {"user_email": "Ann@X.com"}) != \
+        argument_key("query_booking_info", {"user_email": "ann@x.com"})
+
+
+def test_hits_misses_and_stale_results():
+    """Matching calls reuse the result; other calls, and results from before a write, run again"""
+    executor = SpeculativeExecutor(clock=lambda: NOW)
+    chatbot = LookupChatBot()
+
+    speculation = started(executor.start(chatbot, "is an H100 free tomorrow 9-5?"))
+    result = speculation.take("search_available_gpus", {"model": "h100", "start_time": "2025-07-22T09:00:00+00:00",
+                                                        "end_time": "2025-07-22T17:00:00Z"})
+    assert result == {"available_gpus": [{"model": "H100", "id": "H100-001"}]}
+    assert speculation.take("search_available_gpus", {"model": "A100"}) is None
+    speculation.finish()
+    assert chatbot.executed == [("search_available_gpus", "H100")]
+
+    speculation = started(executor.start(chatbot, "show bookings for ann@example.com"))
+    chatbot.store.version += 1
+    assert speculation.take("query_booking_info", {"user_email": "ann@example.com"}) is None
+
+    executor.start(chatbot, "A100 price").finish()
+    stats = executor.get_stats()
+    assert (stats["hits"], stats["misses"], stats["stale"], stats["wasted"]) == (1, 1, 1, 1)
+    assert stats["launched"] == 3 and stats["hit_rate"] == round(1 / 3, 3)
+
+
+def test_mixed_case_email_is_a_hit():
+    """An email typed in mixed case is looked up as written, so the model's echo of it is a hit"""
+    executor = SpeculativeExecutor(clock=lambda: NOW)
+    chatbot = LookupChatBot()
+    speculation = started(executor.start(chatbot, "show bookings for Ann.Lee@Example.com"))
+
+    assert speculation.take("query_booking_info", {"user_email": "Ann.Lee@Example.com"}) == {"bookings": []}
+    speculation.finish()
+    assert chatbot.executed == [("query_booking_info", "Ann.Lee@Example.com")]
+    stats = executor.get_stats()
+    assert (stats["hits"], stats["wasted"]) == (1, 0)
+
+
+def test_queued_speculation_is_cancelled():
+    """A call still queued behind other sessions' work is cancelled and run inline instead of waited for"""
+    executor = SpeculativeExecutor(max_workers=1, clock=lambda: NOW)
+    release = threading.Event()
+    busy = LookupChatBot()
+    search = busy.search_available_gpus
+
+    def blocked_search(**parameters):
+        release.wait(5)
+        return search(**parameters)
+
+    busy.search_available_gpus = blocked_search
+    other = LookupChatBot()
+
+    executor.start(busy, "is an H100 free tomorrow 9-5?")
+    speculation = executor.start(other, "show bookings for ann@example.com")
+    assert speculation.take("query_booking_info", {"user_email": "ann@example.com"}) is None
+    release.set()
+    executor.pool.shutdown(wait=True)
+
+    assert other.executed == []
+    assert executor.get_stats()["misses"] == 1
+
+
+if __name__ == "__main__":
+    test_predictions_from_message()
+    test_argument_key_normalises()
+    test_hits_misses_and_stale_results()
+    test_mixed_case_email_is_a_hit()
+    test_queued_speculation_is_cancelled()
+    print("All speculation tests passed!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the version-stamped tool result cache
+"""
+
+import threading
+import time
+
+from tool_cache import ToolResultCache
+
+
+def counting(result):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return result
+    return compute, calls
+
+
+def test_hits_and_version_invalidation():
+    """Equivalent arguments hit; a newer store version drops every older entry"""
+    cache = ToolResultCache()
+    compute, calls = counting({"available_gpus": ["H100-001"]})
+    first = cache.get_or_compute("search_available_gpus", {"model": "H100", "start_time": "2030-01-07T10:00:00Z"},
+                                 "gen.1", compute)
+    second = cache.get_or_compute("search_available_gpus",
+                                  {"model": "h100", "start_time": "2030-01-07T10:00:00+00:00", "end_time": None},
+                                  "gen.1", compute)
+    assert first == second and len(calls) == 1
+    # Callers get their own copy
+    second["available_gpus"].append("mutated")
+    assert cache.get_or_compute("search_available_gpus", {"model": "H100", "start_time": "2030-01-07T10:00:00Z"},
+                                "gen.1", compute) == {"available_gpus": ["H100-001"]}
+
+    cache.get_or_compute("search_available_gpus", {"model": "H100", "start_time": "2030-01-07T10:00:00Z"},
+                         "gen.2", compute)
+    assert len(calls) == 2
+    # A caller still holding the older version neither hits nor evicts the newer entry
+    cache.get_or_compute("search_available_gpus", {"model": "H100"}, "gen.1", compute)
+    stats = cache.get_stats()
+    assert stats["version"] == "gen.2" and stats["entries"] == 1 and stats["invalidations"] == 1
+
+
+def test_lru_memory_cap_and_ttl():
+    """Least recently used entries are evicted to stay under the byte cap; old entries expire"""
+    now = [0.0]
+    cache = ToolResultCache(max_bytes=250, ttl=60, clock=lambda: now[0])
+    booking = lambda: {"bookings": ["x" * 80]}
+    for email in ("user0@example.com", "user1@example.com"):
+        cache.get_or_compute("query_booking_info", {"user_email": email}, "gen.1", booking)
+    compute, calls = counting({"bookings": []})
+    # user0 is used again, so user1 becomes the least recently used
+    cache.get_or_compute("query_booking_info", {"user_email": "user0@example.com"}, "gen.1", compute)
+    cache.get_or_compute("query_booking_info", {"user_email": "user2@example.com"}, "gen.1", booking)
+    stats = cache.get_stats()
+    assert stats["bytes"] <= 250 and stats["entries"] == 2 and stats["evictions"] == 1
+    cache.get_or_compute("query_booking_info", {"user_email": "user0@example.com"}, "gen.1", compute)
+    assert calls == []
+    cache.get_or_compute("query_booking_info", {"user_email": "user1@example.com"}, "gen.1", compute)
+    assert calls == [1]
+
+    now[0] = 61
+    cache.get_or_compute("query_booking_info", {"user_email": "user0@example.com"}, "gen.1", compute)
+    assert calls == [1, 1] and cache.get_stats()["expired"] == 1
+
+
+def test_concurrent_misses_compute_once():
+    """Simultaneous misses for one key wait for a single computation"""
+    cache = ToolResultCache()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"recommendations": ["H100"]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get_or_compute("get_gpu_recommendations", {"use_case": "LLaMA 70B"}, "gen.1", slow)))
+        for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"recommendations": ["H100"]}] * 8
+    stats = cache.get_stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 7
+
+
+if __name__ == "__main__":
+    test_hits_and_version_invalidation()
+    test_lru_memory_cap_and_ttl()
+    test_concurrent_misses_compute_once()
+    print("All tool cache tests passed!")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for state-based tool subsetting
+"""
+
+import json
+
+from tool_registry import RECENT_USER_MESSAGES, STATE_TOOLS, ToolRegistry, conversation_state
+
+
+def tool(name, description="A tool"):
+    return {"type": "function", "function": {"name": name, "description": description,
+                                             "parameters": {"type": "object", "properties": {}, "required": []}}}
+
+
+# Every tool the states refer to, plus the two that are never exposed
+TOOLS = [tool(name) for name in sorted({n for names in STATE_TOOLS.values() for n in names})]
+TOOLS += [tool("create_booking"), tool("cancel_booking")]
+
+
+def test_conversation_state():
+    """Pending wins; a booking request switches to collecting until the user asks something else"""
+    history = [{"role": "user", "content": "What GPUs do you have?"}]
+    assert conversation_state(None, history) == "browsing"
+
+    history += [{"role": "assistant", "content": "..."}, {"role": "user", "content": "I'd like to book an A100"},
+                {"role": "assistant", "content": "Your name?"}, {"role": "user", "content": "Ann, ann@example.com"}]
+    assert conversation_state(None, history) == "collecting"
+    assert conversation_state("booking", history) == "pending"
+
+    history.append({"role": "user", "content": "actually, what's my bill so far?"})
+    assert conversation_state(None, history) == "browsing"
+    assert conversation_state(None, []) == "browsing"
+
+
+def test_state_follows_recent_turns_only():
+    """An old booking request stops counting once the operation is done or the talk has moved on"""
+    history = [{"role": "user", "content": "I'd like to book an A100"},
+               {"role": "assistant", "content": "Your name?"},
+               {"role": "user", "content": "how much would that cost?"}]
+    assert conversation_state(None, history) == "browsing"
+
+    # A confirmed (or declined) booking ends the request that started collecting
+    history += [{"role": "assistant", "content": "", "tool_calls": [
+                    {"id": "c1", "type": "function", "function": {"name": "confirm_operation", "arguments": "{}"}}]},
+                {"role": "tool", "tool_call_id": "c1", "content": "{}"},
+                {"role": "assistant", "content": "Booked."},
+                {"role": "user", "content": "thanks, and what about tomorrow?"}]
+    assert conversation_state(None, history) == "browsing"
+
+    # Without a confirmation, the request falls out of the window after a few messages
+    history = [{"role": "user", "content": "I'd like to book an A100"}]
+    for n in range(RECENT_USER_MESSAGES - 1):
+        history.append({"role": "user", "content": f"and tomorrow at {n}?"})
+    assert conversation_state(None, history) == "collecting"
+    history.append({"role": "user", "content": "and the day after?"})
+    assert conversation_state(None, history) == "browsing"
+
+
+def test_subsets_are_stable_and_smaller():
+    """Each state always gets the same serialized subset; writes only through confirmation"""
+    registry = ToolRegistry(TOOLS)
+    pending = registry.tools_for("pending")
+    assert registry.tools_for("pending") is pending
+    assert json.dumps(pending, separators=(",", ":")) == registry.serialized["pending"]
+
+    names = {state: [t["function"]["name"] for t in registry.subsets[state]] for state in STATE_TOOLS}
+    assert "confirm_operation" in names["pending"]
+    assert "confirm_operation" not in names["browsing"]
+    assert all("create_booking" not in n and "cancel_booking" not in n for n in names.values())
+
+    report = registry.report()
+    assert report["all_tools"] == len(TOOLS)
+    assert report["states"]["pending"]["calls"] == 2
+    assert all(s["tokens_saved_per_call"] > 0 for s in report["states"].values())
+    assert report["estimated_tokens_saved"] == 2 * report["states"]["pending"]["tokens_saved_per_call"]
+
+
+def test_unanswered_confirmation_keeps_browsing_tools():
+    """A user who leaves a confirmation unanswered can still look up bookings, bills and clear the history"""
+    history = [{"role": "user", "content": "Book an H100 tomorrow for Ann, ann@example.com"},
+               {"role": "assistant", "content": "Shall I book it?"},
+               {"role": "user", "content": "what are my bookings?"}]
+    state = conversation_state("booking", history)
+    assert state == "pending"
+
+    names = [t["function"]["name"] for t in ToolRegistry(TOOLS).tools_for(state)]
+    assert set(STATE_TOOLS["browsing"]) <= set(names)
+    assert "confirm_operation" in names
+
+
+def test_missing_tool_is_rejected():
+    """A state naming a tool that is not defined fails at construction"""
+    try:
+        ToolRegistry(TOOLS[:3])
+    except ValueError as e:
+        assert "not defined" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_conversation_state()
+    test_state_follows_recent_turns_only()
+    test_subsets_are_stable_and_smaller()
+    test_unanswered_confirmation_keeps_browsing_tools()
+    test_missing_tool_is_rejected()
+    print("All tool registry tests passed!")
@@ -0,0 +1,174 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+
+from booking_store import to_epoch
+
+
+# Read-only tools whose result depends only on their arguments, the inventory and the bookings
+CACHEABLE_TOOLS = ("search_available_gpus", "get_gpu_recommendations", "recommend_and_check_availability",
+                   "forecast_gpu_demand", "query_booking_info", "calculate_billing")
+
+# Memory cap on cached results (their JSON size), and an entry cap
+TOOL_CACHE_MAX_BYTES = 32 * 1024 * 1024
+TOOL_CACHE_MAX_ENTRIES = 4096
+
+# Results also expire with time, since forecasts and "is it in the past" checks depend on the clock
+TOOL_CACHE_TTL = 300.0
+
+# Time-valued arguments, compared as instants so '...Z' and '...+00:00' match
+TIME_ARGUMENTS = ("start_time", "end_time", "start_date", "end_date")
+
+# Arguments the tools themselves match case-insensitively; all others (emails, booking
+# hashes and IDs) are compared exactly, so their case must stay part of the key
+CASE_INSENSITIVE_ARGUMENTS = ("model", "use_case")
+
+
+def argument_key(tool: str, parameters: Dict) -> Tuple:
+    """Hashable form of a tool call that ignores time formats, empty arguments and case where the tool does"""
+    items = []
+    for name, value in sorted(parameters.items()):
+        if value is None or value == "":
+            continue
+        if name in TIME_ARGUMENTS:
+            try:
+                value = to_epoch(value)
+            except (TypeError, ValueError):
+                pass
+        elif name in CASE_INSENSITIVE_ARGUMENTS and isinstance(value, str):
+            value = value.strip().lower()
+        items.append((name, value))
+    return (tool, tuple(items))
+
+
+class ToolResultCache:
+    """
+    Shared LRU cache of read-only tool results
+    Keys include the booking store's version tag, so any booking change makes older
+    entries unreachable; they are dropped the first time a newer version is seen.
+    Results are stored as JSON, which caps memory by size and hands every caller its
+    own copy. Concurrent misses for the same key wait for one computation.
+    """
+
+    def __init__(self, max_bytes: int = TOOL_CACHE_MAX_BYTES, max_entries: int = TOOL_CACHE_MAX_ENTRIES,
+                 ttl: float = TOOL_CACHE_TTL, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.bytes = 0
+        self.version = None
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0,
+                      "invalidations": 0, "uncacheable": 0}
+        self.hits_by_tool = {}
+
+    def _drop(self, key):
+        payload, _ = self.entries.pop(key)
+        self.bytes -= len(payload)
+
+    def _observe_version(self, version: str):
+        if version == self.version:
+            return
+        if self.version is not None:
+            generation, _, number = version.rpartition(".")
+            current_generation, _, current_number = self.version.rpartition(".")
+            # A caller that read the version just before a change; newer entries stay
+            if generation == current_generation and int(number) < int(current_number):
+                return
+        if self.entries:
+            self.stats["invalidations"] += 1
+            self.entries.clear()
+            self.bytes = 0
+        self.version = version
+
+    def get_or_compute(self, tool: str, parameters: Dict, version: str, compute: Callable[[], object]):
+        """Cached result for the call at this store version, computing it at most once at a time"""
+        key = (version,) + argument_key(tool, parameters)
+        with self.lock:
+            self._observe_version(version)
+            entry = self.entries.get(key)
+            if entry is not None and self.clock() - entry[1] > self.ttl:
+                self._drop(key)
+                self.stats["expired"] += 1
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                self.hits_by_tool[tool] = self.hits_by_tool.get(tool, 0) + 1
+                return json.loads(entry[0])
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            try:
+                return json.loads(future.result())
+            except Exception:
+                return compute()
+
+        try:
+            result = compute()
+            payload = json.dumps(result)
+        except TypeError:
+            # Not JSON-serialisable: hand it back uncached
+            with self.lock:
+                self.stats["uncacheable"] += 1
+                self.in_flight.pop(key, None)
+            future.set_exception(RuntimeError(f"{tool} result could not be cached"))
+            return result
+        except BaseException as e:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.in_flight.pop(key, None)
+            # Stored only if no booking changed while it was computed
+            if version == self.version and len(payload) <= self.max_bytes:
+                if key in self.entries:
+                    self._drop(key)
+                self.entries[key] = (payload, self.clock())
+                self.bytes += len(payload)
+                while self.bytes > self.max_bytes or len(self.entries) > self.max_entries:
+                    self._drop(next(iter(self.entries)))
+                    self.stats["evictions"] += 1
+        future.set_result(payload)
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Hit rate, coalesced misses, evictions and memory use"""
+        with self.lock:
+            stats = dict(self.stats, entries=len(self.entries), bytes=self.bytes, max_bytes=self.max_bytes,
+                         version=self.version, hits_by_tool=dict(self.hits_by_tool))
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> ToolResultCache:
+    """Process-wide tool result cache (shared by every session)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolResultCache()
+        return _cache
@@ -0,0 +1,146 @@
+import re
+import json
+import threading
+from typing import Dict, List, Optional
+
+
+# Tools exposed to the model in each conversation state, in the order they are defined.
+# create_booking and cancel_booking are never exposed: the prompt routes every write
+# through prepare_*_confirmation and confirm_operation instead.
+STATE_TOOLS = {
+    # Questions about inventory, prices, bookings and bills
+    "browsing": (
+        "search_available_gpus", "get_gpu_recommendations", "recommend_and_check_availability",
+        "forecast_gpu_demand", "query_booking_info", "calculate_billing", "get_current_datetime",
+        "prepare_booking_confirmation", "prepare_cancellation_confirmation", "clear_conversation_history"
+    ),
+    # Gathering name, email, model and times for a booking or cancellation
+    "collecting": (
+        "search_available_gpus", "recommend_and_check_availability", "query_booking_info",
+        "get_current_datetime", "prepare_booking_confirmation", "prepare_cancellation_confirmation"
+    ),
+    # A prepared booking/cancellation is waiting for yes or no (or changed details). Only a
+    # yes/no or /clear ends it, so a user who moves on still needs every browsing tool
+    "pending": (
+        "search_available_gpus", "get_gpu_recommendations", "recommend_and_check_availability",
+        "forecast_gpu_demand", "query_booking_info", "calculate_billing", "get_current_datetime",
+        "prepare_booking_confirmation", "prepare_cancellation_confirmation", "confirm_operation",
+        "clear_conversation_history"
+    ),
+}
+
+# A booking or cancellation has been asked for recently
+COLLECTING_PATTERN = re.compile(r"\b(book|booking it|reserve|rent|cancel)\b", re.IGNORECASE)
+
+# The latest message is back to questions the collecting subset cannot answer
+BROWSING_PATTERN = re.compile(
+    r"\b(bill|billing|invoice|charges|cost|costs|price|prices|pricing|how much|forecast|busy|recommend|"
+    r"suggest|which|compare|vs|spec|specs)\b",
+    re.IGNORECASE)
+
+# Only this many of the latest user messages count towards the state
+RECENT_USER_MESSAGES = 4
+
+# Rough tokens per character of JSON schema; close enough to compare subsets
+CHARS_PER_TOKEN = 4
+
+
+def _recent_user_messages(conversation_history: List[Dict]) -> List[str]:
+    """Latest user messages first, stopping at the last finished (confirmed or declined) operation"""
+    recent = []
+    for message in reversed(conversation_history):
+        calls = message.get("tool_calls") or []
+        if message.get("role") == "assistant" and any(
+                call.get("function", {}).get("name") == "confirm_operation" for call in calls):
+            break
+        if message.get("role") == "user" and isinstance(message.get("content"), str):
+            recent.append(message["content"])
+            if len(recent) == RECENT_USER_MESSAGES:
+                break
+    return recent
+
+
+def conversation_state(pending_operation, conversation_history: List[Dict]) -> str:
+    """'pending', 'collecting' or 'browsing' for the next model call, from the recent turns only"""
+    if pending_operation:
+        return "pending"
+    recent = _recent_user_messages(conversation_history)
+    if not recent or BROWSING_PATTERN.search(recent[0]):
+        return "browsing"
+    if any(COLLECTING_PATTERN.search(message) for message in recent):
+        return "collecting"
+    return "browsing"
+
+
+class ToolRegistry:
+    """
+    Tool schemas grouped into per-state subsets
+    Each subset is built and serialized once, so every call in the same state sends a
+    byte-identical tools block and provider-side prefix caching keeps working.
+    """
+
+    def __init__(self, tools: List[Dict], state_tools: Dict = None):
+        self.state_tools = state_tools or STATE_TOOLS
+        by_name = {tool["function"]["name"]: tool for tool in tools}
+        missing = {name for names in self.state_tools.values() for name in names} - set(by_name)
+        if missing:
+            raise ValueError(f"Tools not defined: {', '.join(sorted(missing))}")
+
+        self.all_tools = list(tools)
+        self.subsets = {}
+        self.serialized = {}
+        for state, names in self.state_tools.items():
+            wanted = set(names)
+            self.subsets[state] = [tool for tool in tools if tool["function"]["name"] in wanted]
+            self.serialized[state] = json.dumps(self.subsets[state], separators=(",", ":"))
+        self.full_tokens = self._tokens(json.dumps(self.all_tools, separators=(",", ":")))
+
+        self.lock = threading.Lock()
+        self.calls = {state: 0 for state in self.state_tools}
+
+    @staticmethod
+    def _tokens(serialized: str) -> int:
+        return len(serialized) // CHARS_PER_TOKEN
+
+    def tools_for(self, state: str) -> List[Dict]:
+        """The tool list for a state (the same list object on every call)"""
+        with self.lock:
+            self.calls[state] += 1
+        return self.subsets[state]
+
+    def report(self) -> Dict:
+        """Tools and estimated prompt tokens per state, and tokens saved against sending every tool"""
+        with self.lock:
+            calls = dict(self.calls)
+        states = {}
+        total_saved = 0
+        for state, serialized in self.serialized.items():
+            tokens = self._tokens(serialized)
+            saved = self.full_tokens - tokens
+            total_saved += saved * calls[state]
+            states[state] = {
+                "tools": [tool["function"]["name"] for tool in self.subsets[state]],
+                "estimated_tokens": tokens,
+                "tokens_saved_per_call": saved,
+                "saved_pct": round(100 * saved / self.full_tokens, 1) if self.full_tokens else 0.0,
+                "calls": calls[state]
+            }
+        return {
+            "all_tools": len(self.all_tools),
+            "all_tools_estimated_tokens": self.full_tokens,
+            "states": states,
+            "estimated_tokens_saved": total_saved
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tool_registry(tools: List[Dict] = None) -> Optional[ToolRegistry]:
+    """Process-wide tool registry, built from the first session's tool definitions (None until then)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None and tools is not None:
+            _registry = ToolRegistry(tools)
+        return _registry